@@ -1,9 +1,26 @@
-
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
 from datetime import date, datetime
-import os, json
+import glob, os, uuid
+from golflog import profiling
+from golflog.tenants import shard_for, clean_user_id
+from golflog.passbuffer import PassBuffer, replay_journals_once
+from golflog.analyses import ingest_upload, recent_analyses
+from golflog.imagecache import cached_image
+from golflog.lmimport import read_export, to_log_rows, club_summary
+from golflog.feedback import trackman_feedback, tip_frequencies
+from golflog.ballflight import flight, in_range, optimal_window, warm as warm_ballflight, IRON_MIN_LAND_ANGLE
+from golflog.metrics import metrics_table, table_from_aggregate, global_metrics, club_overview
+from golflog.recommend import CLUBS, targets_for_profile, recommend_next_session, resolve_coach_mode
+from golflog.videos import ANGLES, ENVIRONMENTS, MISSES, VIDEO_EXT, library_for
+from golflog.export import FORMATS, export_file, file_name
+
+# All logik (lagring, nyckeltal, rekommendationer, feedback) ligger i golflog/ och laddas en gång
+# per process; skriptet här körs om vid varje klick och sköter bara gränssnittet.
+
+# tidsmätning av hela rerun:en (Diagnostik-vyn); "Profilera nästa rerun" slår på cProfile en gång
+profiling.begin_rerun(profile=st.session_state.pop("profile_next", None))
+profiling.phase("uppstart")
 
 st.set_page_config(page_title="Golf Träningslogg", page_icon="⛳", layout="centered")
 
@@ -11,73 +28,43 @@ st.set_page_config(page_title="Golf Träningslogg", page_icon="⛳", layout="cen
 # Paths & constants
 # -----------------------------
 DATA_DIR = "data"
-VIDEO_DIR = os.path.join(DATA_DIR, "videos")
-IMG_DIR = os.path.join(DATA_DIR, "images")
-ANALYTICS_DIR = os.path.join(DATA_DIR, "trackman")
-LOG_PATH = os.path.join(DATA_DIR, "logg.csv")
-VIDEO_META = os.path.join(DATA_DIR, "videos.csv")
-PROFILE_JSON = os.path.join(DATA_DIR, "profile.json")
-os.makedirs(DATA_DIR, exist_ok=True); os.makedirs(VIDEO_DIR, exist_ok=True); os.makedirs(IMG_DIR, exist_ok=True); os.makedirs(ANALYTICS_DIR, exist_ok=True)
-
-COLUMNS = ["datum", "pass", "kategori", "moment", "klubba", "värde", "anteckning"]
-VIDEO_COLUMNS = ["ts","filnamn","storlek_bytes","format","vinkel","klubba","miljo","miss","kommentar"]
-CLUBS = ["LW (60deg)","SW (56deg)","GW (52deg)","PW (48deg)","9i","8i","7i","6i","5i","4i","Hybrid 4","Hybrid 3","Tra-5","Tra-3","Driver"]
-
-# -----------------------------
-# Data helpers
-# -----------------------------
-def init_log():
-    if not os.path.exists(LOG_PATH):
-        pd.DataFrame(columns=COLUMNS).to_csv(LOG_PATH, index=False, encoding="utf-8")
-    if not os.path.exists(VIDEO_META):
-        pd.DataFrame(columns=VIDEO_COLUMNS).to_csv(VIDEO_META, index=False, encoding="utf-8")
-    if not os.path.exists(PROFILE_JSON):
-        with open(PROFILE_JSON, "w", encoding="utf-8") as f:
-            json.dump({"swing_speed_value": 95, "swing_speed_unit": "mph", "shaft_flex": "R",
-                       "hcp": 36, "coach_mode": "Auto", "onboarded": False, "goal":"Balans & träffbild"}, f)
-
-def read_log():
-    init_log()
+IMG_DIR = os.path.join(DATA_DIR, "images")   # drill-bilder, delas av alla golfare
+
+def current_user():
+    # ?user=<namn> i länken eller fältet i sidomenyn; tomt = den delade loggen i data/
+    if "user" not in st.session_state: st.session_state.user = st.query_params.get("user", "")
+    name = st.sidebar.text_input("Golfare", key="user", help="Varje golfare får en egen logg och profil. Dela länken med ?user=namn.")
+    try: user = clean_user_id(name)
+    except ValueError:
+        st.error("Namnet måste innehålla minst en bokstav eller siffra."); st.stop()
+    if user: st.query_params["user"] = user
+    elif "user" in st.query_params: del st.query_params["user"]
+    return user
+
+SHARD = shard_for(DATA_DIR, current_user())   # data/users/<id>/ – egen logg, profil och skrivlås (skapas en gång)
+ANALYTICS_DIR = SHARD.analytics_dir
+JOURNAL_DIR = SHARD.journal_dir
+LOG = SHARD.log   # GOLF_STORAGE=csv (standard), parquet eller sqlite
+STATS = SHARD.stats   # löpande nyckeltal, uppdateras per slag (python -m golflog.accumulators rebuild)
+DAILY = SHARD.daily   # dagliga rollups för 7/30/90-dagarsfönster och trender
+SHOTS = SHARD.shots   # typad LM-slagtabell (shots/), backfillas en gång från LM-raderna
+
+def read_log(columns=None):
     try:
-        df = pd.read_csv(LOG_PATH, encoding="utf-8")
-    except Exception:
-        df = pd.DataFrame(columns=COLUMNS)
-    for c in COLUMNS:
-        if c not in df.columns:
-            df[c] = ""
-    return df
-
-def write_log(df: pd.DataFrame):
-    df.to_csv(LOG_PATH, index=False, encoding="utf-8")
-
-def append_row(row: dict):
-    df = read_log()
-    df = pd.concat([df, pd.DataFrame([row])], ignore_index=True)
-    write_log(df)
-
-def read_profile():
-    init_log()
-    try:
-        with open(PROFILE_JSON, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return {"swing_speed_value": 95, "swing_speed_unit": "mph", "shaft_flex": "R", "hcp":36, "coach_mode":"Auto", "onboarded": False, "goal":"Balans & träffbild"}
-
-def write_profile(p):
-    with open(PROFILE_JSON, "w", encoding="utf-8") as f:
-        json.dump(p, f)
+        return SHARD.read_log(columns)
+    except (pd.errors.ParserError, UnicodeDecodeError, OSError) as e:
+        # ingen tom ersättning – nästa sparning skulle då skriva över hela loggen
+        st.error(f"Kunde inte läsa träningsloggen ({e}). Inget har skrivits över; kontrollera filen eller återställ från backup.")
+        st.stop()
 
 def today_str():
     return date.today().isoformat()
 
-# -----------------------------
-# Coach mode
-# -----------------------------
-def resolve_coach_mode(profile: dict) -> str:
-    mode = profile.get("coach_mode","Auto")
-    if mode != "Auto": return mode
-    hcp = float(profile.get("hcp",36))
-    return "Enkel" if hcp >= 28 else "Avancerad"
+# bollflyktens rutnät laddas/byggs i bakgrunden, inte i första Analyzer-anropet
+warm_ballflight()
+
+# journaler från en krasch/omstart spelas upp en gång per process
+replay_journals_once(JOURNAL_DIR, SHARD.append_rows, LOG)
 
 # -----------------------------
 # Session state
@@ -89,7 +76,7 @@ def ss_get(k, v):
 for k, v in [
     ("toe_count",0), ("heel_count",0), ("thin_count",0), ("fat_count",0),
     ("slice_count",0), ("hook_count",0), ("last_club","7i"), ("last_carry",150),
-    ("pass_active",False), ("pass_rows",[]), ("pass_started_at", None),
+    ("pass_active",False), ("pass_rows",[]), ("pass_started_at", None), ("pass_buffer", None),
     ("counter_date", today_str())
 ]:
     ss_get(k, v)
@@ -106,8 +93,8 @@ def reset_daily_counters():
 def show_slice_tips(mode="Enkel"):
     st.toast("Driver slice – öppna drillen nedan.", icon="⚠️")
     with st.expander("Drill mot slice" + (" (enkel)" if mode=="Enkel" else " (avancerad)")):
-        img_path = os.path.join(IMG_DIR, "slice_grip.png")
-        if os.path.exists(img_path): st.image(img_path, caption="Starkare grepp – rotera händerna lite åt höger.")
+        grip = cached_image(os.path.join(IMG_DIR, "slice_grip.png"), 360)
+        if grip: st.image(grip, caption="Starkare grepp – rotera händerna lite åt höger.")
         if mode=="Enkel":
             st.markdown("- **Grepp:** vrid händerna lite åt **höger** (3–4 knogar).\n- **Tee högt**, slå **uppåt**.\n- Lägg en peg **utanför** bakom bollen – svinga **innanför** peggen (inifrån).")
         else:
@@ -116,125 +103,21 @@ def show_slice_tips(mode="Enkel"):
 def show_hook_tips(mode="Enkel"):
     st.toast("Driver hook – öppna drillen nedan.", icon="⚠️")
     with st.expander("Drill mot hook" + (" (enkel)" if mode=="Enkel" else " (avancerad)")):
-        img_path = os.path.join(IMG_DIR, "hook_grip.png")
-        if os.path.exists(img_path): st.image(img_path, caption="Svagare grepp – rotera händerna lite åt vänster.")
+        grip = cached_image(os.path.join(IMG_DIR, "hook_grip.png"), 360)
+        if grip: st.image(grip, caption="Svagare grepp – rotera händerna lite åt vänster.")
         if mode=="Enkel":
             st.markdown("- **Grepp:** vrid händerna lite **vänster** (1–2 knogar).\n- Starta bollen **rakt/ev. vänster**.\n- **Hold face:** låt klubban **inte** stänga lika mycket.")
         else:
             st.markdown("- **Face/Path:** håll face nära 0° mot path.\n- **Path:** neutralare (mindre inifrån).\n- **Release:** sen/“hold”, handle forward lite genom träffen.")
 
-# -----------------------------
-# Benchmarks (scaled by HCP tier)
-# -----------------------------
-BENCHMARKS_BASE = {
-    "clean_rate": {"Pro":0.65, "Adv":0.50, "Beg":0.35},
-    "driver_slice_rate": {"Pro":0.12, "Adv":0.18, "Beg":0.25},
-    "driver_hook_rate":  {"Pro":0.12, "Adv":0.18, "Beg":0.25},
-    "carry_std_7i": {"Pro":6, "Adv":9, "Beg":13},
-    "carry_std_driver": {"Pro":10, "Adv":15, "Beg":22},
-    "chip_within2_rate": {"Pro":0.60, "Adv":0.45, "Beg":0.30},
-    "short_putt_make": {"Pro":0.90, "Adv":0.80, "Beg":0.60}
-}
-def hcp_tier(hcp: float):
-    if hcp <= 12: return "Pro"
-    if hcp <= 28: return "Adv"
-    return "Beg"
-def targets_for_profile(profile: dict):
-    tier = hcp_tier(float(profile.get("hcp",36)))
-    t = {k: BENCHMARKS_BASE[k][tier] for k in BENCHMARKS_BASE}
-    return tier, t
-
-def compute_metrics(df: pd.DataFrame):
-    res = {"clean_rate":None,"driver_slice_rate":None,"driver_hook_rate":None,
-           "carry_std_7i":None,"carry_std_driver":None,"short_putt_make":None,"chip_within2_rate":None}
-    if df.empty: return res
-    tb = df[(df["pass"]=="Range") & (df["kategori"]=="Träffbild")]
-    if not tb.empty: res["clean_rate"] = (tb["moment"]=="Mitt i").sum()/len(tb)
-    dv = df[(df["pass"]=="Range") & (df["kategori"]=="Driver")]
-    if not dv.empty:
-        res["driver_slice_rate"] = (dv["moment"]=="Slice").sum()/len(dv)
-        res["driver_hook_rate"]  = (dv["moment"]=="Hook").sum()/len(dv)
-    lc = df[(df["pass"]=="Range") & (df["kategori"]=="Längdkontroll") & (df["moment"]=="Carry")].copy()
-    if not lc.empty:
-        lc["värde"] = pd.to_numeric(lc["värde"], errors="coerce")
-        c7 = lc[lc["klubba"]=="7i"]["värde"].dropna()
-        cd = lc[lc["klubba"]=="Driver"]["värde"].dropna()
-        res["carry_std_7i"] = float(c7.std()) if len(c7)>=3 else None
-        res["carry_std_driver"] = float(cd.std()) if len(cd)>=3 else None
-    ch = df[(df["pass"]=="Närspel") & (df["kategori"]=="Chippar")]
-    if not ch.empty: res["chip_within2_rate"] = (ch["moment"]=="Inom 2m").sum()/len(ch)
-    pt = df[(df["kategori"]=="Puttning")]
-    if not pt.empty:
-        makes = (pt["moment"]=="Kortputt i hål").sum()
-        res["short_putt_make"] = None if makes==0 else 1.0
-    return res
-
-# -----------------------------
-# Auto-pass generator (enkelt)
-# -----------------------------
-def recommend_next_session(df: pd.DataFrame, profile: dict):
-    m = compute_metrics(df)
-    tier, t = targets_for_profile(profile)
-    items = []
-    # välj största gap
-    if m["clean_rate"] is None or m["clean_rate"] < t["clean_rate"]:
-        items.append(("Träffbild", "10 min mittträff: startport + mynt 3–5 cm efter bollen"))
-    if m["driver_slice_rate"] not in [None] and m["driver_slice_rate"] > t["driver_slice_rate"]:
-        items.append(("Driver slice", "10 min: starkare grepp, peg utanför bakom (inifrån)"))
-    if m["driver_hook_rate"] not in [None] and m["driver_hook_rate"] > t["driver_hook_rate"]:
-        items.append(("Driver hook", "10 min: svagare grepp, hold face, neutral path"))
-    if m["carry_std_7i"] not in [None] and m["carry_std_7i"] > t["carry_std_7i"]:
-        items.append(("7i-carry spridning", "10 min: samma bollplacering + tempo-metronom"))
-    if m["chip_within2_rate"] is None or m["chip_within2_rate"] < t["chip_within2_rate"]:
-        items.append(("Chip inom 2 m", "10 min: landningspunkt, 10x—räkna inom 2 m"))
-    if not items:
-        items = [("Underhåll", "Valfritt pass 30 min – repetera styrkor")]
-    return items[:3]
-
-# -----------------------------
-# TrackMan Analyzer (form + bild)
-# -----------------------------
-def trackman_feedback(data: dict, club: str, mode: str):
-    bs = data.get("ball_speed") or 0
-    launch = data.get("launch") or 0
-    spin = data.get("spin") or 0
-    h = data.get("height") or 0
-    aoa = data.get("aoa") or 0
-    path = data.get("path") or 0
-    f2p = data.get("face_to_path") or 0
-
-    tips = []
-    if club == "Driver":
-        # mycket grova riktvärden
-        if bs > 0:
-            ideal_launch = 12 if bs < 150 else 14 if bs < 165 else 15.5
-            if launch < ideal_launch-2: tips.append(f"Öka launch: högre tee, boll längre fram, mer tilt (mål ~{ideal_launch}°).")
-            if launch > ideal_launch+3: tips.append(f"Sänk launch något: lägre tee/neutral loft (mål ~{ideal_launch}°).")
-        if spin > 0 and spin > 3000: tips.append("För hög spinn: träffa mer uppåt (+AoA), minska loft/mer fram flytt av vikt.")
-        if spin > 0 and spin < 1600: tips.append("Väldigt låg spinn: risk för dippar – mer loft eller mindre uppåt‑träff.")
-        if aoa < -1: tips.append("AoA negativ: träna slå **uppåt** på bollen (boll längre fram, hög tee).")
-        if path > 2 and f2p > 2: tips.append("Path inifrån + face stängd → risk hook; neutralisera face/release.")
-        if path < -2 and f2p < -2: tips.append("Path utifrån + face öppen → risk slice; starkare grepp, in-to-out.")
-    else:  # järn
-        if launch < 14: tips.append("Låg launch: mer shaft lean kontrollerat, ren bollkontakt efter bollen.")
-        if launch > 22: tips.append("Hög launch: kolla loft/dynamic loft, träffa nedåt genom bollen.")
-        if spin > 0 and spin < 5000: tips.append("Låg spinn för järn: renare träff & rätt bollval/loft.")
-        if h < 18: tips.append("Låg topphöjd: sikta ~25–35 m med 7i – håll tempo och full finish.")
-        if abs(f2p) > 2.5: tips.append("Stor face/path-diff → jobba mot neutralare face till path.")
-
-    if not tips:
-        tips = ["Värdena ser rimliga ut för denna klubba. Fortsätt!"]
-    if mode == "Avancerad":
-        tips.append("Avancerat: filma DTL + FO och jämför release/sekvens med drillen.")
-    return tips
-
 # -----------------------------
 # UI
 # -----------------------------
 st.title("⛳ Golf Träningslogg")
 
+profiling.phase("data")
 df_all = read_log()
-profile = read_profile()
+profile = SHARD.read_profile()
 mode = resolve_coach_mode(profile)
 tier, targets = targets_for_profile(profile)
 
@@ -242,21 +125,39 @@ tier, targets = targets_for_profile(profile)
 if not profile.get("onboarded", False):
     st.header("🎯 Välkommen! Snabb start")
     c0,c1,c2 = st.columns(3)
-    hcp_val = c0.number_input("HCP (0–54)", 0.0, 54.0, float(profile.get("hcp",36.0)), 0.1)
-    coach_mode = st.selectbox("Coach-läge", ["Auto","Enkel","Avancerad"], index=["Auto","Enkel","Avancerad"].index(profile.get("coach_mode","Auto")))
-    goal = st.selectbox("Ditt mål just nu", ["Balans & träffbild","Mindre slice/hook","Bättre närspel","Längre med driver"])
+    hcp_val = c0.number_input("HCP (0–54)", 0.0, 54.0, float(profile.get("hcp",36.0)), 0.1, key="onboard_hcp")
+    coach_mode = st.selectbox("Coach-läge", ["Auto","Enkel","Avancerad"], index=["Auto","Enkel","Avancerad"].index(profile.get("coach_mode","Auto")), key="onboard_coach")
+    goal = st.selectbox("Ditt mål just nu", ["Balans & träffbild","Mindre slice/hook","Bättre närspel","Längre med driver"], key="onboard_goal")
     if st.button("✅ Klart – spara & börja"):
         profile.update({"hcp": hcp_val, "coach_mode": coach_mode, "goal": goal, "onboarded": True})
-        write_profile(profile)
+        SHARD.write_profile(profile)
         st.rerun()
 
+profiling.phase("sidomeny")
 st.sidebar.markdown(f"**Coach-läge:** {mode}  •  **HCP:** {profile.get('hcp',36)}  •  **Målnivå:** {tier}")
-view = st.sidebar.radio("Välj vy", ["Logga pass","TrackMan Analyzer","Benchmark","Profil","Data"])
+# Diagnostik visas bara med ?diag=1 i länken (eller GOLF_DIAG=1)
+DIAG = st.query_params.get("diag") == "1" or os.environ.get("GOLF_DIAG") == "1"
+view = st.sidebar.radio("Välj vy", ["Logga pass","TrackMan Analyzer","Video","Benchmark","Profil","Data"] + (["Diagnostik"] if DIAG else []))
+profiling.set_label(view)
+profiling.phase(f"vy: {view}")
 
 def log_and_track(row):
-    append_row(row)
+    # under aktivt pass buffras slagen och skrivs i batchar (se golflog.passbuffer)
     if st.session_state.pass_active:
+        st.session_state.pass_buffer.add(row)
         st.session_state.pass_rows.append(row)
+    else:
+        SHARD.append_rows([row])
+
+def start_pass():
+    journal = os.path.join(JOURNAL_DIR, f"{uuid.uuid4().hex}.jsonl")
+    st.session_state.update(pass_active=True, pass_rows=[], pass_started_at=datetime.now(),
+                            pass_buffer=PassBuffer(journal, SHARD.append_rows))
+
+def end_pass():
+    if st.session_state.pass_buffer is not None: st.session_state.pass_buffer.close()
+    SHARD.flush()   # passets statistik till disk nu, inte först vid nästa batch
+    st.session_state.update(pass_active=False, pass_buffer=None)
 
 # LOGGA PASS (kortare version – fokus på Analyzer & Benchmark i denna build)
 if view == "Logga pass":
@@ -266,6 +167,17 @@ if view == "Logga pass":
     aktiv_klubba = st.selectbox("Klubba för detta pass", CLUBS, index=CLUBS.index(st.session_state.get("last_club","7i")))
     st.session_state.last_club = aktiv_klubba
 
+    if not st.session_state.pass_active:
+        if st.button("▶️ Starta pass", help="Slagen buffras och sparas i omgångar – snabbare knappar på rangen."):
+            start_pass(); st.rerun()
+    else:
+        buf = st.session_state.pass_buffer
+        st.caption(f"Pass pågår sedan {st.session_state.pass_started_at:%H:%M} – {len(st.session_state.pass_rows)} slag ({buf.pending} väntar på att sparas)")
+        if st.button("⏹️ Avsluta pass"):
+            n = len(st.session_state.pass_rows)
+            end_pass()
+            st.success(f"Pass sparat – {n} slag.")
+
     if pass_typ == "Range":
         st.markdown("### Träffbild")
         c1,c2,c3 = st.columns(3)
@@ -302,64 +214,109 @@ if view == "Logga pass":
         # Rekommenderat nästa pass (direkt, små “chips”)
         st.markdown("---")
         st.subheader("🎯 Rek. nästa pass (auto)")
-        for titel, beskrivning in recommend_next_session(read_log(), read_profile()):
+        for titel, beskrivning in recommend_next_session(STATS, SHARD.read_profile()):
             st.write(f"- **{titel}** – {beskrivning}")
 
 # TRACKMAN ANALYZER
 elif view == "TrackMan Analyzer":
     st.header("📸 TrackMan / GC-Data – få feedback")
-    st.caption("Ladda upp en skärmdump och fyll i siffrorna nedan (snabbt). Appen sparar bilden och ger tips.")
-    img = st.file_uploader("Ladda upp bild (jpg/png)", type=["jpg","jpeg","png"])
-    if img is not None:
-        st.image(img, caption="Uppladdad bild", use_column_width=True)
-    klubba = st.selectbox("Klubba", ["Driver","7i","8i","9i","6i","5i","4i"] , index=1)
-    col1,col2,col3 = st.columns(3)
-    ball_speed = col1.number_input("Ball Speed (mph)", min_value=0.0, max_value=220.0, step=0.1)
-    launch = col2.number_input("Launch (°)", min_value=0.0, max_value=30.0, step=0.1)
-    spin = col3.number_input("Spin (rpm)", min_value=0.0, max_value=12000.0, step=10.0)
-    col4,col5,col6 = st.columns(3)
-    height = col4.number_input("Height (m)", min_value=0.0, max_value=80.0, step=0.1)
-    aoa = col5.number_input("AoA (°)", min_value=-10.0, max_value=10.0, step=0.1)
-    face_to_path = col6.number_input("Face-to-Path (°)", min_value=-10.0, max_value=10.0, step=0.1)
-    path = st.number_input("Club Path (°)", min_value=-10.0, max_value=10.0, step=0.1)
-
-    if st.button("🔍 Analysera & spara"):
-        # spara bild om finns
-        saved_name = None
+    analyzer_mode = st.radio("Läge", ["Enstaka slag","Importera CSV"], horizontal=True)
+    if analyzer_mode == "Importera CSV":
+        st.caption("Exportera slagen från TrackMan/GCQuad som CSV. Alla giltiga slag sparas i en omgång och du får samlade tips per klubba.")
+        lm_file = st.file_uploader("Launch monitor-export (csv)", type=["csv","txt"])
+        standard_klubba = st.selectbox("Klubba när filen saknar klubbkolumn", CLUBS, index=CLUBS.index("7i"))
+        if lm_file is not None and st.button("📥 Importera slag"):
+            try:
+                shots, rejected = read_export(lm_file, standard_klubba, CLUBS)
+            except ValueError as e:
+                st.error(str(e)); st.stop()
+            if shots.empty:
+                st.warning("Inga giltiga slag i filen.")
+            else:
+                SHARD.append_rows(to_log_rows(shots, today_str()))   # en batch till lagringen
+                SHOTS.append(shots.assign(ts=datetime.now(), datum=today_str(), källa="import"))
+                st.success(f"Importerade {len(shots)} slag.")
+            skipped = {k: v for k, v in rejected.items() if v}
+            if skipped: st.caption("Hoppade över: " + ", ".join(f"{v} {k}" for k, v in skipped.items()))
+            coach = resolve_coach_mode(SHARD.read_profile())
+            freq = tip_frequencies(shots, "Enkel", by="klubba")   # utan det fasta Avancerat-tipset
+            for rec in club_summary(shots).to_dict("records"):
+                medians = {k: (None if pd.isna(v) else v) for k, v in rec.items()}
+                st.markdown(f"#### {rec['klubba']} – {rec['slag']} slag")
+                st.caption(f"Median: launch {rec['launch']:.1f}°, spinn {int(medians['spin'] or 0)} rpm, bollfart {round(medians['ball_speed'] or 0, 1)} mph")
+                for t in trackman_feedback(medians, rec["klubba"], coach):
+                    st.write("• " + t)
+                top = freq[freq["klubba"] == rec["klubba"]].nlargest(3, "antal")
+                if len(top):
+                    st.caption("Vanligast per slag: " + " • ".join(f"{round(100*a)}% {t}" for t, a in zip(top["tips"], top["andel"])))
+    else:
+        st.caption("Ladda upp en skärmdump och fyll i siffrorna nedan (snabbt). Appen sparar bilden och ger tips.")
+        img = st.file_uploader("Ladda upp bild (jpg/png)", type=["jpg","jpeg","png"])
         if img is not None:
-            ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-            ext = os.path.splitext(img.name)[1].lower()
-            saved_name = f"tm_{ts}{ext}"
-            with open(os.path.join(ANALYTICS_DIR, saved_name), "wb") as f:
-                f.write(img.read())
-        # sammanställ och tips
-        data = {"ball_speed":ball_speed,"launch":launch,"spin":spin,"height":height,"aoa":aoa,"face_to_path":face_to_path,"path":path}
-        tips = trackman_feedback(data, klubba, resolve_coach_mode(read_profile()))
-        st.success("Analys klar. Här är dina tips:")
-        for t in tips:
-            st.write("• " + t)
-        # logga en rad för carry/launch om angivet
-        if klubba and launch>0:
-            append_row({"datum": today_str(), "pass":"Range","kategori":"LM","moment":f"{klubba} launch/spin","klubba":klubba,"värde":launch,"anteckning":f"spin {int(spin)} rpm; bs {ball_speed} mph; img {saved_name or ''}"})
-        st.balloons()
-
-    # Visa senaste analyser
-    st.markdown("### Dina senaste analyser")
-    files = [f for f in os.listdir(ANALYTICS_DIR) if f.lower().endswith((".jpg",".jpeg",".png"))]
-    files = sorted(files)[-3:][::-1]
-    if files:
-        for f in files:
-            st.image(os.path.join(ANALYTICS_DIR, f), caption=f)
+            st.image(img, caption="Uppladdad bild", use_column_width=True)
+        klubba = st.selectbox("Klubba", ["Driver","7i","8i","9i","6i","5i","4i"] , index=1)
+        col1,col2,col3 = st.columns(3)
+        ball_speed = col1.number_input("Ball Speed (mph)", min_value=0.0, max_value=220.0, step=0.1)
+        launch = col2.number_input("Launch (°)", min_value=0.0, max_value=30.0, step=0.1)
+        spin = col3.number_input("Spin (rpm)", min_value=0.0, max_value=12000.0, step=10.0)
+        col4,col5,col6 = st.columns(3)
+        height = col4.number_input("Height (m)", min_value=0.0, max_value=80.0, step=0.1)
+        aoa = col5.number_input("AoA (°)", min_value=-10.0, max_value=10.0, step=0.1)
+        face_to_path = col6.number_input("Face-to-Path (°)", min_value=-10.0, max_value=10.0, step=0.1)
+        path = st.number_input("Club Path (°)", min_value=-10.0, max_value=10.0, step=0.1)
+
+        if st.button("🔍 Analysera & spara"):
+            # spara bild om finns
+            saved_name = None
+            if img is not None:
+                saved_name = ingest_upload(img, ANALYTICS_DIR, klubba=klubba)
+            # sammanställ och tips
+            data = {"ball_speed":ball_speed,"launch":launch,"spin":spin,"height":height,"aoa":aoa,"face_to_path":face_to_path,"path":path}
+            tips = trackman_feedback(data, klubba, resolve_coach_mode(SHARD.read_profile()))
+            st.success("Analys klar. Här är dina tips:")
+            for t in tips:
+                st.write("• " + t)
+            # bollflykt enligt modellen (förberäknat rutnät, se golflog.ballflight)
+            if ball_speed > 0 and launch > 0 and not in_range(ball_speed, launch, spin):
+                st.caption("Modellen täcker inte de här värdena (bollfart 20–220 mph, launch 0–40°, spinn 0–12000 rpm) – ingen bollflykt beräknad.")
+            elif ball_speed > 0 and launch > 0:
+                with st.spinner("Räknar bollflykt…"):
+                    carry_m, apex_m, land = flight(ball_speed, launch, spin)
+                st.markdown(f"**Modell:** carry ~{carry_m:.0f} m, topphöjd ~{apex_m:.0f} m, landningsvinkel ~{land:.0f}°")
+                if klubba == "Driver":
+                    w = optimal_window(ball_speed)
+                    st.caption(f"Optimalt fönster vid {ball_speed:.0f} mph: launch {w['launch'][0]:.0f}–{w['launch'][1]:.0f}°, spinn {w['spin'][0]:.0f}–{w['spin'][1]:.0f} rpm (~{w['carry']:.0f} m carry).")
+                elif land < IRON_MIN_LAND_ANGLE:
+                    st.caption(f"Landningsvinkeln är flackare än ~{IRON_MIN_LAND_ANGLE:.0f}° – bollen stannar sämre på green. Mer höjd/spinn hjälper.")
+            # logga en rad för carry/launch om angivet
+            if klubba and launch>0:
+                SHARD.append_rows([{"datum": today_str(), "pass":"Range","kategori":"LM","moment":f"{klubba} launch/spin","klubba":klubba,"värde":launch,"anteckning":f"spin {int(spin)} rpm; bs {ball_speed} mph; img {saved_name or ''}"}])
+                SHOTS.append(pd.DataFrame([dict(data, ts=datetime.now(), datum=today_str(), klubba=klubba, img=saved_name, källa="analys")]))
+            st.balloons()
+
+        # Trend per klubba ur slagtabellen
+        st.markdown("### Trend per klubba")
+        t1, t2 = st.columns(2)
+        trend_field = t1.selectbox("Mått", ["spin","ball_speed","launch"], format_func={"spin":"Spinn (rpm)","ball_speed":"Ball Speed (mph)","launch":"Launch (°)"}.get)
+        trend = SHOTS.trend(trend_field, klubba, freq=t2.radio("Per", ["D","W"], format_func={"D":"dag","W":"vecka"}.get, horizontal=True))
+        if trend.empty: st.caption(f"Inga sparade slag med {klubba} ännu.")
+        else: st.line_chart(trend)
+
+        # Visa senaste analyser
+        st.markdown("### Dina senaste analyser")
+        for a in recent_analyses(ANALYTICS_DIR, 3):
+            data = cached_image(a["path"], 640)
+            if data: st.image(data, caption=a["name"])
 
 # BENCHMARK
 elif view == "Benchmark":
     st.header("🎯 Benchmark mot mål")
-    df = df_all.copy()
     tier, t = targets_for_profile(profile)
-    if df.empty:
+    if not STATS.rows:   # tom logg – avgörs på aggregatet, loggen rörs inte
         st.info("Logga några pass först.")
     else:
-        m = compute_metrics(df)
+        table = metrics_table(STATS)
+        m = global_metrics(table)
         rows = []
         def fmt_pct(x): return "—" if x is None else f"{round(100*x)}%"
         rows.append(["Rena träffar", fmt_pct(m["clean_rate"]), f"{round(100*t['clean_rate'])}%"])
@@ -371,6 +328,107 @@ elif view == "Benchmark":
         rows.append(["Kortputt i hål", fmt_pct(m["short_putt_make"]), f"{round(100*t['short_putt_make'])}%"])
         st.dataframe(pd.DataFrame(rows, columns=["Nyckeltal","Du","Mål"]), use_container_width=True)
 
+        per_club = club_overview(table)
+        if not per_club.empty:
+            st.markdown("### Per klubba")
+            cols = {"center":"Mitt i","toe":"Tåträff","heel":"Hälträff","thin":"Topp","fat":"Duff","flush":"Flush","carry_std":"Carry-spridning (m)"}
+            per_club = per_club.reindex(columns=list(cols)).reindex([c for c in CLUBS if c in per_club.index]).dropna(how="all")
+            for c in ["center","toe","heel","thin","fat","flush"]:
+                per_club[c] = per_club[c].map(lambda x: fmt_pct(None if pd.isna(x) else x))
+            per_club["carry_std"] = per_club["carry_std"].map(lambda x: "—" if pd.isna(x) else round(x,1))
+            st.dataframe(per_club.rename(columns=cols), use_container_width=True)
+
+        # Rullande fönster – räknas på dagliga rollups, inte på rådata
+        st.markdown("### Utveckling")
+        days = st.radio("Period", [7, 30, 90], index=1, horizontal=True, format_func=lambda d: f"{d} dagar")
+        w = global_metrics(table_from_aggregate(DAILY.window(days)))
+        def fmt_m(x): return "—" if x is None else round(x,1)
+        st.dataframe(pd.DataFrame([
+            ["Rena träffar", fmt_pct(w["clean_rate"]), fmt_pct(m["clean_rate"])],
+            ["Driver slice", fmt_pct(w["driver_slice_rate"]), fmt_pct(m["driver_slice_rate"])],
+            ["Driver hook", fmt_pct(w["driver_hook_rate"]), fmt_pct(m["driver_hook_rate"])],
+            ["7i spridning carry (m)", fmt_m(w["carry_std_7i"]), fmt_m(m["carry_std_7i"])],
+            ["Driver spridning carry (m)", fmt_m(w["carry_std_driver"]), fmt_m(m["carry_std_driver"])],
+            ["Chip inom 2 m", fmt_pct(w["chip_within2_rate"]), fmt_pct(m["chip_within2_rate"])],
+        ], columns=["Nyckeltal", f"Senaste {days} dagar", "Totalt"]), use_container_width=True)
+        rates = pd.DataFrame({"Rena träffar (%)": 100*DAILY.trend("center", days),
+                              "Chip inom 2 m (%)": 100*DAILY.trend("chip_within2", days)}).dropna(how="all")
+        if not rates.empty:
+            st.caption(f"Rullande {days} dagar")
+            st.line_chart(rates)
+        carry = pd.DataFrame({"7i carry-spridning (m)": DAILY.trend("carry_std", days, "7i"),
+                              "Driver carry-spridning (m)": DAILY.trend("carry_std", days, "Driver")}).dropna(how="all")
+        if not carry.empty:
+            st.line_chart(carry)
+
+        # Diagram ritas (och matplotlib laddas) först när de slås på; bytes cachas per data-version och tema
+        if st.toggle("📊 Visa diagram", key="bench_charts"):
+            from golflog.charts import KINDS, chart
+            theme = (profile.get("primary_color", "#1E88E5"), bool(profile.get("dark_mode", False)))
+            for kind, source in [("carry", STATS), ("hits", STATS), ("putts", DAILY)]:
+                data = chart(kind, source, theme)
+                if data: st.image(data, caption=KINDS[kind])
+
+# VIDEO
+elif view == "Video":
+    st.header("🎥 Svingvideor")
+    VIDEOS = library_for(SHARD)
+    with st.expander("➕ Ladda upp video", expanded=False):
+        up = st.file_uploader("Video", type=[e.lstrip(".") for e in VIDEO_EXT])
+        v1, v2 = st.columns(2)
+        v_klubba = v1.selectbox("Klubba", CLUBS, index=CLUBS.index(st.session_state.get("last_club","7i")), key="video_klubba")
+        v_vinkel = v2.selectbox("Vinkel", ANGLES, key="video_vinkel")
+        v_miljo = v1.selectbox("Miljö", ENVIRONMENTS, key="video_miljo")
+        v_miss = v2.selectbox("Miss", MISSES, key="video_miss")
+        v_kommentar = st.text_input("Kommentar", key="video_kommentar")
+        if up is not None and st.button("💾 Spara video"):
+            try:
+                name = VIDEOS.ingest(up, klubba=v_klubba, vinkel=v_vinkel, miljo=v_miljo, miss=v_miss, kommentar=v_kommentar)
+            except ValueError as e:
+                st.error(str(e)); st.stop()
+            st.success(f"Sparade {name}. Nyckelbilder och förhandsvisning skapas i bakgrunden.")
+    # bläddring: bara poster-bilder för aktuell sida; GIF och original laddas först på begäran
+    f1, f2, f3 = st.columns(3)
+    q_klubba = f1.selectbox("Klubba", ["Alla"] + CLUBS, key="video_q_klubba")
+    q_vinkel = f2.selectbox("Vinkel", ["Alla"] + ANGLES, key="video_q_vinkel")
+    q_miss = f3.selectbox("Miss", ["Alla"] + MISSES, key="video_q_miss")
+    PAGE = 8
+    filters = {k: (None if v == "Alla" else v) for k, v in (("klubba", q_klubba), ("vinkel", q_vinkel), ("miss", q_miss))}
+    _, total = VIDEOS.query(limit=0, **filters)
+    if not total:
+        st.info("Inga videor med de här filtren ännu.")
+    else:
+        page_no = st.number_input(f"Sida (av {-(-total // PAGE)})", 1, -(-total // PAGE), 1) if total > PAGE else 1
+        page, _ = VIDEOS.query(offset=(page_no - 1) * PAGE, limit=PAGE, **filters)
+        t1, t2 = st.columns([2, 1])
+        t1.caption(f"{total} videor")
+        if t2.button("⏱️ Mät tempo", help="Backsving:nedsving och träffbild för videor som saknar det (processpool)."):
+            with st.spinner("Mäter tempo…"):
+                done, failed = VIDEOS.analyze()
+            t1.success(f"Mätte {len(done)} videor" + (f", {len(failed)} utan tydlig sving" if failed else "") + ".")
+            page, _ = VIDEOS.query(offset=(page_no - 1) * PAGE, limit=PAGE, **filters)
+        for v in page.to_dict("records"):
+            name = v["filnamn"]
+            c1, c2 = st.columns([1, 2])
+            poster = VIDEOS.asset(name, "poster.jpg")
+            data = cached_image(poster, 320) if poster else None
+            if data: c1.image(data)
+            else: c1.caption({"bearbetas": "⏳ Bearbetas…", "fel": "⚠️ Kunde inte läsa videon", "ingen cv2": "Ingen förhandsvisning (cv2 saknas)"}.get(VIDEOS.status(name), "⏳ Väntar…"))
+            info = VIDEOS.info(name)
+            meta = " • ".join(str(x) for x in (v["klubba"], v["vinkel"], v["miss"], v["miljo"]) if pd.notna(x) and x)
+            c2.markdown(f"**{str(v['ts'])[:16].replace('T', ' ')}** – {meta}")
+            tempo = pd.to_numeric(v.get("tempo"), errors="coerce")
+            if pd.notna(tempo):
+                c2.markdown(f"⏱️ Tempo **{tempo:.1f}:1** (backsving {float(v['backsving_s']):.2f} s, nedsving {float(v['nedsving_s']):.2f} s) • träff {float(v['traff_s']):.2f} s")
+            c2.caption(f"{v['storlek_bytes'] / 2**20:.1f} MB" + (f" • {info['sekunder']:.1f} s @ {info['fps']:.0f} fps" if info.get("sekunder") else "")
+                       + (f" • {v['kommentar']}" if pd.notna(v["kommentar"]) and v["kommentar"] else ""))
+            # en expander skickar innehållet även stängd – en toggle laddar GIF:en först när den slås på
+            if c2.toggle("Förhandsvisning", key=f"video_prev_{name}"):
+                gif, sheet = VIDEOS.asset(name, "gif"), VIDEOS.asset(name, "kf.jpg")
+                if gif: c2.image(gif)
+                if sheet: c2.image(sheet, caption="Nyckelbilder")
+                if c2.checkbox("Visa originalet", key=f"video_orig_{name}"): c2.video(VIDEOS.path(name))
+
 # PROFIL
 elif view == "Profil":
     st.header("👤 Profil & mål")
@@ -383,11 +441,65 @@ elif view == "Profil":
     coach_mode = st.selectbox("Coach-läge", ["Auto","Enkel","Avancerad"], index=["Auto","Enkel","Avancerad"].index(p.get("coach_mode","Auto")))
     goal = st.selectbox("Mål", ["Balans & träffbild","Mindre slice/hook","Bättre närspel","Längre med driver"], index=["Balans & träffbild","Mindre slice/hook","Bättre närspel","Längre med driver"].index(p.get("goal","Balans & träffbild")))
     if st.button("💾 Spara profil"):
-        write_profile({"swing_speed_value": speed_val, "swing_speed_unit": speed_unit, "shaft_flex": shaft, "hcp": hcp_val, "coach_mode": coach_mode, "onboarded": True, "goal": goal})
+        SHARD.write_profile({"swing_speed_value": speed_val, "swing_speed_unit": speed_unit, "shaft_flex": shaft, "hcp": hcp_val, "coach_mode": coach_mode, "onboarded": True, "goal": goal})
         st.success("Profil sparad!")
-    st.info(f"Aktiverat coach-läge nu: **{resolve_coach_mode(read_profile())}**")
-else:
+    st.info(f"Aktiverat coach-läge nu: **{resolve_coach_mode(SHARD.read_profile())}**")
+elif view == "Data":
     st.header("📄 Data")
     st.dataframe(df_all, use_container_width=True)
-    st.download_button("⬇️ Exportera CSV", data=df_all.to_csv(index=False).encode("utf-8"),
-                       file_name="golf_logg.csv", mime="text/csv")
+    # exporten skrivs i bitar till en temporär fil först vid klick – inget byggs på vanliga reruns
+    st.markdown("### Exportera")
+    e1, e2, e3 = st.columns(3)
+    start = e1.date_input("Från", value=None, key="export_from")
+    end = e2.date_input("Till", value=None, key="export_to")
+    fmt = e3.selectbox("Format", list(FORMATS), format_func=lambda f: FORMATS[f][0], key="export_format")
+    e4, e5 = st.columns(2)
+    klubba = e4.selectbox("Klubba", ["Alla"] + CLUBS, key="export_klubba")
+    pass_ = e5.selectbox("Pass", ["Alla", "Range", "Närspel", "Bana"], key="export_pass")
+    filters = {"start": start, "end": end, "klubba": None if klubba == "Alla" else klubba, "pass_": None if pass_ == "Alla" else pass_}
+    want = (SHARD.data_dir, fmt, tuple(filters.values()))
+    ready = st.session_state.get("export")
+    if ready and ready[0] != want:   # filtren har ändrats – den förberedda filen gäller inte längre
+        if os.path.exists(ready[1]): os.remove(ready[1])
+        ready = st.session_state.export = None
+    if st.button("📦 Förbered export"):
+        if ready and os.path.exists(ready[1]): os.remove(ready[1])
+        with st.spinner("Skriver exporten…"):
+            path, n = export_file(LOG, fmt, **filters)
+        ready = st.session_state.export = (want, path, n)
+    if ready and os.path.exists(ready[1]):
+        with open(ready[1], "rb") as f:
+            st.download_button(f"⬇️ Ladda ner ({ready[2]} rader, {os.path.getsize(ready[1]) / 2**20:.1f} MB)", data=f,
+                               file_name=file_name(fmt, **filters), mime=FORMATS[fmt][1])
+
+# DIAGNOSTIK (dold)
+elif view == "Diagnostik":
+    st.header("🩺 Diagnostik – var tar rerun-tiden vägen?")
+    items = profiling.reruns()
+    st.caption(f"{len(items)} avslutade reruns i den här processen (max {profiling.MAX_RERUNS}). Tider i ms.")
+    c1, c2 = st.columns(2)
+    if c1.button("🔬 Profilera nästa rerun"):
+        st.session_state.profile_next = True
+        st.info("Nästa klick körs med cProfile – filen hamnar i data/profiles/.")
+    if c2.button("🧹 Nollställ mätningar"):
+        profiling.clear(); items = []
+    if items:
+        st.subheader("Percentiler per steg")
+        summ = profiling.summary(items)
+        summ["span"] = ["  " * n + s for s, n in zip(summ["span"], summ["nivå"])]
+        st.dataframe(summ.drop(columns="nivå").round(2), use_container_width=True, hide_index=True)
+        st.subheader("Senaste reruns")
+        labels = [f"{datetime.fromtimestamp(r['ts']):%H:%M:%S} – {r['label'] or '?'} – {r['total_ms']:.0f} ms" for r in reversed(items[-20:])]
+        pick = st.selectbox("Rerun", range(len(labels)), format_func=lambda i: labels[i])
+        rec = items[-1 - pick]
+        bd = profiling.breakdown(rec)
+        bd["span"] = ["  " * n + s for s, n in zip(bd["span"], bd["nivå"])]
+        st.dataframe(bd.drop(columns="nivå").round({"start_ms": 1, "ms": 2, "andel": 3}), use_container_width=True, hide_index=True)
+        if rec["profile"]: st.caption(f"cProfile: `{rec['profile']}` (öppna med snakeviz eller `python -m golflog.profiling`)")
+    tops = sorted(glob.glob(os.path.join(DATA_DIR, "profiles", "*.txt")))[-5:]
+    if tops:
+        st.subheader("Sparade profiler")
+        for f in reversed(tops):
+            with open(f, "r", encoding="utf-8") as fh, st.expander(os.path.basename(f)[:-4]): st.code(fh.read())
+
+profiling.end_rerun(os.path.join(DATA_DIR, "profiles"))
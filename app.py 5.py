@@ -1,89 +1,55 @@
-
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-from datetime import date, datetime
-import os, json
-
+from datetime import date
+import os
+from golflog import profiling
+from golflog.tenants import shard_for, clean_user_id
+from golflog.analyses import ingest_upload
+from golflog.imagecache import cached_image
+from golflog.metrics import metrics_table, global_metrics
+from golflog.recommend import targets_for_profile, recommend_bag, recommend_for_club, resolve_coach_mode
+from golflog.feedback import CLEAR_TIPS, trackman_feedback
+from golflog.theme import base_css, theme_css
+from golflog.videos import ANGLES, MISSES, POSTER_WIDTH, VIDEO_EXT, library_for
+from golflog.export import FORMATS, export_file, file_name
+
+# Logiken ligger i golflog/ (laddas en gång per process); skriptet sköter bara gränssnittet.
+profiling.begin_rerun(profile=st.session_state.pop("profile_next", None))
+profiling.phase("uppstart")
 st.set_page_config(page_title="Golf Träningslogg", page_icon="⛳", layout="centered")
 
-# Load base CSS
-with open("assets/style.css", "r", encoding="utf-8") as f:
-    st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+# Load base CSS (läses från disk en gång, sedan bara när filen ändras)
+st.markdown(base_css(), unsafe_allow_html=True)
 
 # ---------------------------------
 # Paths & constants
 # ---------------------------------
 DATA_DIR = "data"
-VIDEO_DIR = os.path.join(DATA_DIR, "videos")
-IMG_DIR = os.path.join(DATA_DIR, "images")
-ANALYTICS_DIR = os.path.join(DATA_DIR, "trackman")
-LOG_PATH = os.path.join(DATA_DIR, "logg.csv")
-VIDEO_META = os.path.join(DATA_DIR, "videos.csv")
-PROFILE_JSON = os.path.join(DATA_DIR, "profile.json")
-os.makedirs(DATA_DIR, exist_ok=True); os.makedirs(VIDEO_DIR, exist_ok=True)
-os.makedirs(IMG_DIR, exist_ok=True); os.makedirs(ANALYTICS_DIR, exist_ok=True)
 
-COLUMNS = ["datum", "pass", "kategori", "moment", "klubba", "värde", "anteckning"]
-VIDEO_COLUMNS = ["ts","filnamn","storlek_bytes","format","vinkel","klubba","miljo","miss","kommentar"]
+# ?user=<namn> i länken eller fältet i sidomenyn; tomt = den delade loggen i data/
+if "user" not in st.session_state: st.session_state.user = st.query_params.get("user", "")
+_name = st.sidebar.text_input("Golfare", key="user", help="Varje golfare får en egen logg och profil. Dela länken med ?user=namn.")
+try: USER = clean_user_id(_name)
+except ValueError:
+    st.error("Namnet måste innehålla minst en bokstav eller siffra."); st.stop()
+if USER: st.query_params["user"] = USER
+elif "user" in st.query_params: del st.query_params["user"]
+SHARD = shard_for(DATA_DIR, USER)   # data/users/<id>/ – egen logg, profil och skrivlås (skapas en gång)
+ANALYTICS_DIR = SHARD.analytics_dir
+LOG = SHARD.log   # GOLF_STORAGE=csv (standard), parquet eller sqlite
+STATS = SHARD.stats   # löpande nyckeltal, uppdateras per slag (python -m golflog.accumulators rebuild)
+DAILY = SHARD.daily   # dagliga rollups för 7/30/90-dagarsfönster och trender
 CLUBS = ["Driver","Tra-3","Tra-5","Hybrid 3","Hybrid 4","4i","5i","6i","7i","8i","9i","PW (48deg)","GW (52deg)","SW (56deg)","LW (60deg)"]
 
-# ---------------------------------
-# Data helpers
-# ---------------------------------
-def init_log():
-    if not os.path.exists(LOG_PATH):
-        pd.DataFrame(columns=COLUMNS).to_csv(LOG_PATH, index=False, encoding="utf-8")
-    if not os.path.exists(VIDEO_META):
-        pd.DataFrame(columns=VIDEO_COLUMNS).to_csv(VIDEO_META, index=False, encoding="utf-8")
-    if not os.path.exists(PROFILE_JSON):
-        with open(PROFILE_JSON, "w", encoding="utf-8") as f:
-            json.dump({
-                "swing_speed_value": 95, "swing_speed_unit": "mph", "shaft_flex": "R",
-                "hcp": 36, "coach_mode": "Auto", "onboarded": False, "goal":"Balans & träffbild",
-                "primary_color":"#1E88E5", "dark_mode": False
-            }, f)
-
-def read_log():
-    init_log()
-    try: df = pd.read_csv(LOG_PATH, encoding="utf-8")
-    except Exception: df = pd.DataFrame(columns=COLUMNS)
-    for c in COLUMNS:
-        if c not in df.columns: df[c] = ""
-    return df
-
-def write_log(df): df.to_csv(LOG_PATH, index=False, encoding="utf-8")
-
-def append_row(row: dict):
-    df = read_log()
-    df = pd.concat([df, pd.DataFrame([row])], ignore_index=True)
-    write_log(df)
-
-def read_profile():
-    init_log()
-    try:
-        with open(PROFILE_JSON, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return {"swing_speed_value": 95, "swing_speed_unit": "mph", "shaft_flex": "R",
-                "hcp":36, "coach_mode":"Auto", "onboarded": False, "goal":"Balans & träffbild",
-                "primary_color":"#1E88E5", "dark_mode": False}
-
-def write_profile(p):
-    with open(PROFILE_JSON, "w", encoding="utf-8") as f:
-        json.dump(p, f)
+def read_log(columns=None):
+    try: return SHARD.read_log(columns)
+    except (pd.errors.ParserError, UnicodeDecodeError, OSError) as e:
+        # ingen tom ersättning – nästa sparning skulle då skriva över hela loggen
+        st.error(f"Kunde inte läsa träningsloggen ({e}). Inget har skrivits över; kontrollera filen eller återställ från backup.")
+        st.stop()
 
 def today_str(): return date.today().isoformat()
 
-# ---------------------------------
-# Coach mode
-# ---------------------------------
-def resolve_coach_mode(profile: dict) -> str:
-    mode = profile.get("coach_mode","Auto")
-    if mode != "Auto": return mode
-    hcp = float(profile.get("hcp",36))
-    return "Enkel" if hcp >= 28 else "Avancerad"
-
 # ---------------------------------
 # Glossary
 # ---------------------------------
@@ -107,158 +73,13 @@ def glossary_widget():
 # Theme controls (dark mode + brand color)
 # ---------------------------------
 def apply_theme(primary_color: str, dark_mode: bool):
-    if dark_mode:
-        # Inject dark variables to override defaults
-        st.markdown(f"""
-        <style>
-        :root {{
-          --primary: {primary_color};
-          --bg: #0B1220;
-          --bg-2: #111827;
-          --text: #E5E7EB;
-          --muted: #9CA3AF;
-          --card-bg: #0f172a;
-          --card-border: #1f2937;
-        }}
-        html, body, .block-container {{ background-color: var(--bg) !important; color: var(--text) !important; }}
-        .stMarkdown, .stText, .stSelectbox, .stNumberInput, .stButton, .stExpander {{ color: var(--text) !important; }}
-        </style>
-        """, unsafe_allow_html=True)
-    else:
-        st.markdown(f"""
-        <style>
-        :root {{ --primary: {primary_color}; }}
-        </style>
-        """, unsafe_allow_html=True)
-
-# ---------------------------------
-# Club logic & metrics + recs (short, same as previous pretty build)
-# ---------------------------------
-def club_group(klubba: str) -> str:
-    if klubba == "Driver": return "driver"
-    if "Tra" in klubba: return "fairway"
-    if "Hybrid" in klubba: return "hybrid"
-    if any(w in klubba for w in ["PW","GW","SW","LW"]): return "wedge"
-    return "iron"
-
-def compute_club_metrics_for(df: pd.DataFrame, klubba: str):
-    r = df.copy()
-    m = {"center":None, "toe":None, "heel":None, "thin":None, "fat":None, "flush":None, "carry_std":None, "slice":None, "hook":None}
-    if r.empty: return m
-    tb = r[(r["pass"]=="Range") & (r["kategori"]=="Träffbild") & (r["klubba"]==klubba)]
-    if not tb.empty:
-        tot = len(tb); m["center"] = (tb["moment"]=="Mitt i").sum()/tot
-        m["toe"] = (tb["moment"]=="Tåträff").sum()/tot; m["heel"] = (tb["moment"]=="Hälträff").sum()/tot
-    kt = r[(r["pass"]=="Range") & (r["kategori"]=="Kontakt") & (r["klubba"]==klubba)]
-    if not kt.empty:
-        tot = len(kt); m["thin"] = (kt["moment"]=="Topp").sum()/tot; m["fat"] = (kt["moment"]=="Duff").sum()/tot; m["flush"] = (kt["moment"]=="Flush").sum()/tot
-    lc = r[(r["pass"]=="Range") & (r["kategori"]=="Längdkontroll") & (r["moment"]=="Carry") & (r["klubba"]==klubba)].copy()
-    if not lc.empty:
-        lc["värde"] = pd.to_numeric(lc["värde"], errors="coerce")
-        m["carry_std"] = float(lc["värde"].dropna().std()) if len(lc)>=3 else None
-    if klubba=="Driver":
-        dv = r[(r["pass"]=="Range") & (r["kategori"]=="Driver")]
-        if not dv.empty:
-            tot = len(dv); m["slice"] = (dv["moment"]=="Slice").sum()/tot; m["hook"] = (dv["moment"]=="Hook").sum()/tot
-    return m
-
-BENCHMARKS_BASE = {
-    "clean_rate": {"Pro":0.65, "Adv":0.50, "Beg":0.35},
-    "driver_slice_rate": {"Pro":0.12, "Adv":0.18, "Beg":0.25},
-    "driver_hook_rate":  {"Pro":0.12, "Adv":0.18, "Beg":0.25},
-    "carry_std_7i": {"Pro":6, "Adv":9, "Beg":13},
-    "carry_std_driver": {"Pro":10, "Adv":15, "Beg":22},
-}
-def hcp_tier(hcp: float):
-    if hcp <= 12: return "Pro"
-    if hcp <= 28: return "Adv"
-    return "Beg"
-def targets_for_profile(profile: dict):
-    tier = hcp_tier(float(profile.get("hcp",36)))
-    t = {k: BENCHMARKS_BASE[k][tier] for k in BENCHMARKS_BASE}
-    return tier, t
-
-def recommend_for_club(df: pd.DataFrame, profile: dict, klubba: str, mode: str):
-    _, t = targets_for_profile(profile)
-    m = compute_club_metrics_for(df, klubba)
-    grp = club_group(klubba)
-    center_target = t["clean_rate"]
-    carry_std_target = t["carry_std_driver"] if grp=="driver" else t["carry_std_7i"]
-    items = []
-    if m["center"] is not None and m["center"] < center_target:
-        items.append({"title":"Mittträff & startlinje","why":"Fler rena träffar minskar spridning och gör längden jämnare.",
-                      "how":["Startport 2–3 m framför bollen.","Mynt 3–5 cm efter bollen – landa klubban efter bollen.","2×10 slag genom porten + markkontakt efter bollen."]})
-    if (m["thin"] or 0) > 0.25:
-        items.append({"title":"Mot toppade slag","why":"Toppar = uppresning i träffen.","how":["Behåll posture.","Träffa marken efter bollen.","5×5 halvslag med fokus på nedslag."]})
-    if (m["fat"] or 0) > 0.25:
-        items.append({"title":"Mot duffar","why":"Low‑point för tidig.","how":["60/40 vikt fram.","Bröstet över bollen.","Turf efter bollen (mynt‑drill)."]})
-    if m["carry_std"] not in [None] and m["carry_std"] > carry_std_target:
-        items.append({"title":"Jämnare längdkontroll","why":"Mindre carry‑spridning = bättre klubbval.","how":["Samma bollplacering & tempo (3:1).","Distans‑stege: 5×80%, 5×90%, 5×100%.","Logga carries i appen."]})
-    if grp=="driver":
-        tier_slice = BENCHMARKS_BASE["driver_slice_rate"][hcp_tier(float(profile.get("hcp",36)))]
-        tier_hook  = BENCHMARKS_BASE["driver_hook_rate"][hcp_tier(float(profile.get("hcp",36)))]
-        if (m["slice"] or 0) > tier_slice:
-            items.append({"title":"Minska slice (driver)","why":"Slice kostar längd & kontroll.",
-                          "how": (["Starkare grepp (3–4 knogar), hög tee.","Peg utanför bakom bollen – svinga innanför.","Starta bollen svagt höger, rulla händerna."]
-                                  if mode=="Enkel" else ["Face 1–2° stängd mot path.","Path +2–4° in‑to‑out, AoA +2°.","Startlinje svagt höger."])})
-        if (m["hook"] or 0) > tier_hook:
-            items.append({"title":"Minska hook (driver)","why":"Hook = över‑release, face för stängt.",
-                          "how": (["Svagare grepp (1–2 knogar).","Hold face (mindre release).","Starta rakt/ev. vänster."]
-                                  if mode=="Enkel" else ["Face nära 0° mot path.","Neutral path (0 till +1°).","Sen release/handle forward."])})
-
-    if grp=="iron":
-        items.append({"title":"Forma Draw/Fade (järn)","why":"Shape‑kontroll ger bättre startlinje & greenträffar.",
-                      "how": (["Draw: sikta rakt, fötter lite höger, port höger.","Fade: sikta rakt, fötter lite vänster, hold face.","10 bollar per shape – logga."]
-                              if mode=="Enkel" else ["Draw: path +2–4°, face 1–2° stängd.","Fade: path −2–4°, face 0–1° öppen.","Port 2–3 m framför för startlinje."])})
-
-    if grp in ["fairway","hybrid"]:
-        items.append({"title":"Sweep‑drill","why":"Svepande träff minskar duff/topp.",
-                      "how":["Tee lågt (eller ingen).","Sopa marken efter bollen.","10 slag med låg AoA (nära 0)."]})
-
-    if grp=="wedge":
-        items.append({"title":"Wedge‑matris (klocksystem)","why":"Fasta längder 30–90 m förenklar besluten.",
-                      "how":["Tre baksvings‑längder (8/9/10).","5 slag per längd – logga.","Skriv upp matrisen i appen."]})
-        items.append({"title":"Landningspunkt‑drill","why":"Kontrollerad landning ger rätt rull/stopp.",
-                      "how":["Välj landnings‑mål 2–3 m in på green.","10 slag – räkna inom 1 m.","Anpassa loft/bounce efter underlag."]})
-    if not items: items = [{"title":"Underhåll","why":"Allt ser stabilt ut.","how":["10–15 min valfri drill.","Sätt ett litet mål och logga."]}]
-    return items
-
-# ---------------------------------
-# TrackMan feedback (clear terms)
-# ---------------------------------
-def trackman_feedback(data: dict, club: str, mode: str):
-    ball_speed = data.get("ball_speed") or 0
-    launch = data.get("launch") or 0
-    spin = data.get("spin") or 0
-    height = data.get("height") or 0
-    angle_of_attack = data.get("aoa") or 0
-    club_path = data.get("path") or 0
-    face_to_path = data.get("face_to_path") or 0
-    tips = []
-    if club=="Driver":
-        if ball_speed>0:
-            ideal_launch = 12 if ball_speed<150 else 14 if ball_speed<165 else 15.5
-            if launch < ideal_launch-2: tips.append(f"Öka startvinkel: högre tee, bollen längre fram, mer tilt (mål ~{ideal_launch}°).")
-            if launch > ideal_launch+3: tips.append(f"Sänk startvinkel: lägre tee/neutral loft (mål ~{ideal_launch}°).")
-        if spin>3000: tips.append("Hög spinn: träffa mer uppåt (positiv Angle of Attack) eller minska loft.")
-        if 0<spin<1600: tips.append("Väldigt låg spinn: mer loft eller mindre uppåtsving för höjdkontroll.")
-        if angle_of_attack<-1: tips.append("Angle of Attack negativ: träna uppåtträff (boll fram, hög tee).")
-        if club_path<-2 and face_to_path<-2: tips.append("Utifrån‑in + öppet face → slice‑risk: starkare grepp & inifrån‑sving.")
-        if club_path>2 and face_to_path>2: tips.append("Inifrån‑ut + stängt face → hook‑risk: neutralisera face/release.")
-    else:
-        if launch<14: tips.append("Låg startvinkel: kontrollerad shaft‑lean och ren bollkontakt efter bollen.")
-        if launch>22: tips.append("Hög startvinkel: minska dynamiskt loft, träffa nedåt genom bollen.")
-        if 0<spin<5000: tips.append("Låg spinn för järn: renare träff & rätt boll/loft.")
-        if height<18: tips.append("Låg topphöjd: sikta ~25–35 m med 7i – håll tempo och full finish.")
-        if abs(face_to_path)>2.5: tips.append("Stor skillnad mellan face och svingriktning → jobba neutralare face‑till‑path.")
-    if not tips: tips = ["Värdena ser rimliga ut. Fortsätt!"]
-    if mode=="Avancerad": tips.append("Avancerat: filma från bakom (Down The Line) och framifrån (Face On) och jämför sekvens/release med drillen.")
-    return tips
+    st.markdown(theme_css(primary_color, bool(dark_mode)), unsafe_allow_html=True)
 
 # ---------------------------------
 # UI (Header + Sidebar controls)
 # ---------------------------------
-profile = read_profile()
+profiling.phase("data + tema")
+profile = SHARD.read_profile()
 mode = resolve_coach_mode(profile)
 tier, targets = targets_for_profile(profile)
 
@@ -269,13 +90,14 @@ dark_mode = st.sidebar.toggle("🌙 Mörkt läge", value=bool(profile.get("dark_
 if st.sidebar.button("Spara tema"):
     profile["primary_color"] = primary_color
     profile["dark_mode"] = bool(dark_mode)
-    write_profile(profile)
+    SHARD.write_profile(profile)
     st.sidebar.success("Tema sparat.")
 
 # Apply theme after reading controls
 apply_theme(primary_color, dark_mode)
 
 # Header with logo
+profiling.phase("sidhuvud")
 st.markdown('<div class="card">', unsafe_allow_html=True)
 st.image("assets/logo.png", width=200)
 st.markdown('<div class="badge">Golf Träningslogg</div>', unsafe_allow_html=True)
@@ -284,12 +106,14 @@ st.markdown('<p class="small">Logga pass, analysera värden och få rekommendati
 st.markdown('</div>', unsafe_allow_html=True)
 
 st.sidebar.markdown(f"**Coach-läge:** {mode}  •  **Handicap:** {profile.get('hcp',36)}  •  **Mål-nivå:** {tier}")
-view = st.sidebar.radio("Navigera", ["Logga pass","Rekommendationer","TrackMan Analyzer","Benchmark","Profil","Ordlista","Data"])
+DIAG = st.query_params.get("diag") == "1" or os.environ.get("GOLF_DIAG") == "1"   # dold vy: ?diag=1
+view = st.sidebar.radio("Navigera", ["Logga pass","Rekommendationer","TrackMan Analyzer","Video","Benchmark","Profil","Ordlista","Data"] + (["Diagnostik"] if DIAG else []))
+profiling.set_label(view)
+profiling.phase(f"vy: {view}")
 
 # ---------------------------------
 # Views
 # ---------------------------------
-def today_str(): return date.today().isoformat()
 def reset_daily_counters(): pass  # simple build omits auto counters here
 
 def log_section(title): st.markdown(f'<div class="card"><h4>{title}</h4>', unsafe_allow_html=True)
@@ -306,17 +130,17 @@ if view=="Logga pass":
     if pass_typ=="Range":
         log_section("Träffbild")
         c1,c2,c3 = st.columns(3)
-        if c1.button("➕ Mitt i"): append_row({"datum": today_str(),"pass":"Range","kategori":"Träffbild","moment":"Mitt i","klubba":aktiv_klubba,"värde":1,"anteckning":""})
-        if c2.button("➕ Tåträff"): append_row({"datum": today_str(),"pass":"Range","kategori":"Träffbild","moment":"Tåträff","klubba":aktiv_klubba,"värde":1,"anteckning":""})
-        if c3.button("➕ Hälträff"): append_row({"datum": today_str(),"pass":"Range","kategori":"Träffbild","moment":"Hälträff","klubba":aktiv_klubba,"värde":1,"anteckning":""})
+        if c1.button("➕ Mitt i"): SHARD.append_rows([{"datum": today_str(),"pass":"Range","kategori":"Träffbild","moment":"Mitt i","klubba":aktiv_klubba,"värde":1,"anteckning":""}])
+        if c2.button("➕ Tåträff"): SHARD.append_rows([{"datum": today_str(),"pass":"Range","kategori":"Träffbild","moment":"Tåträff","klubba":aktiv_klubba,"värde":1,"anteckning":""}])
+        if c3.button("➕ Hälträff"): SHARD.append_rows([{"datum": today_str(),"pass":"Range","kategori":"Träffbild","moment":"Hälträff","klubba":aktiv_klubba,"värde":1,"anteckning":""}])
         end_section()
 
         log_section("Kontakt")
         k1,k2,k3 = st.columns(3)
-        if k1.button("➕ Topp"): append_row({"datum": today_str(),"pass":"Range","kategori":"Kontakt","moment":"Topp","klubba":aktiv_klubba,"värde":1,"anteckning":""})
-        if k2.button("➕ Duff"): append_row({"datum": today_str(),"pass":"Range","kategori":"Kontakt","moment":"Duff","klubba":aktiv_klubba,"värde":1,"anteckning":""})
+        if k1.button("➕ Topp"): SHARD.append_rows([{"datum": today_str(),"pass":"Range","kategori":"Kontakt","moment":"Topp","klubba":aktiv_klubba,"värde":1,"anteckning":""}])
+        if k2.button("➕ Duff"): SHARD.append_rows([{"datum": today_str(),"pass":"Range","kategori":"Kontakt","moment":"Duff","klubba":aktiv_klubba,"värde":1,"anteckning":""}])
         if k3.button("✅ Flush (perfekt)"):
-            append_row({"datum": today_str(),"pass":"Range","kategori":"Kontakt","moment":"Flush","klubba":aktiv_klubba,"värde":1,"anteckning":""})
+            SHARD.append_rows([{"datum": today_str(),"pass":"Range","kategori":"Kontakt","moment":"Flush","klubba":aktiv_klubba,"värde":1,"anteckning":""}])
             st.success("Flush – snyggt!")
         end_section()
 
@@ -324,19 +148,27 @@ if view=="Logga pass":
         cL, cR = st.columns([2,1])
         carry_val = cL.number_input("Carry (meter)", min_value=0, max_value=400, value=150, step=1, key="carry_input")
         if cR.button("➕ Logga carry"):
-            append_row({"datum": today_str(),"pass":"Range","kategori":"Längdkontroll","moment":"Carry","klubba":aktiv_klubba,"värde":int(carry_val),"anteckning":""})
+            SHARD.append_rows([{"datum": today_str(),"pass":"Range","kategori":"Längdkontroll","moment":"Carry","klubba":aktiv_klubba,"värde":int(carry_val),"anteckning":""}])
         end_section()
 
 elif view=="Rekommendationer":
     aktiv_klubba = st.selectbox("Välj klubba", CLUBS, index=CLUBS.index("7i") if "last_club" not in st.session_state else CLUBS.index(st.session_state.get("last_club","7i")))
     st.session_state["last_club"] = aktiv_klubba
     log_section(f"Fokus för {aktiv_klubba}")
-    recs = recommend_for_club(read_log(), read_profile(), aktiv_klubba, resolve_coach_mode(read_profile()))
+    p = SHARD.read_profile()
+    recs = recommend_for_club(STATS, p, aktiv_klubba, resolve_coach_mode(p))
     for r in recs:
         with st.expander(f"• {r['title']}"):
             st.write(f"**Varför:** {r['why']}")
             st.markdown("\n".join([f"- {step}" for step in r["how"]]))
     end_section()
+    # hela bagen ur samma memoiserade råd – räknas bara om för klubbor vars nyckeltal ändrats
+    if st.toggle("🎒 Hela bagen", key="rec_bag"):
+        log_section("Fokus per klubba")
+        bag = recommend_bag(STATS, p, resolve_coach_mode(p), order=CLUBS)
+        st.dataframe(pd.DataFrame([[k, " • ".join(r["title"] for r in items)] for k, items in bag.items()], columns=["Klubba", "Fokus"]),
+                     use_container_width=True, hide_index=True)
+        end_section()
 
 elif view=="TrackMan Analyzer":
     log_section("Analys av launch monitor-data")
@@ -356,32 +188,56 @@ elif view=="TrackMan Analyzer":
     if st.button("🔍 Analysera & spara"):
         saved_name = None
         if img is not None:
-            ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-            ext = os.path.splitext(img.name)[1].lower()
-            saved_name = f"tm_{ts}{ext}"
-            with open(os.path.join(ANALYTICS_DIR, saved_name), "wb") as f:
-                f.write(img.read())
+            saved_name = ingest_upload(img, ANALYTICS_DIR, klubba=klubba)
         data = {"ball_speed":ball_speed,"launch":launch,"spin":spin,"height":height,"aoa":aoa,"face_to_path":face_to_path,"path":club_path}
-        tips = trackman_feedback(data, klubba, resolve_coach_mode(read_profile()))
+        tips = trackman_feedback(data, klubba, resolve_coach_mode(SHARD.read_profile()), CLEAR_TIPS)
         st.success("Analys klar. Här är dina tips:")
         for t in tips: st.write("• " + t)
     end_section()
     glossary_widget()
 
+elif view=="Video":
+    log_section("Svingvideor")
+    videos = library_for(SHARD)
+    up = st.file_uploader("Video", type=[e.lstrip(".") for e in VIDEO_EXT])
+    v1, v2, v3 = st.columns(3)
+    v_klubba = v1.selectbox("Klubba", CLUBS, index=CLUBS.index(st.session_state.get("last_club","7i")), key="video_klubba")
+    v_vinkel = v2.selectbox("Vinkel", ANGLES, key="video_vinkel")
+    v_miss = v3.selectbox("Miss", MISSES, key="video_miss")
+    if up is not None and st.button("💾 Spara video"):
+        try: st.success(f"Sparade {videos.ingest(up, klubba=v_klubba, vinkel=v_vinkel, miss=v_miss)} – förhandsvisning skapas i bakgrunden.")
+        except ValueError as e: st.error(str(e))
+    q = st.selectbox("Visa klubba", ["Alla"] + CLUBS, key="video_q_klubba")
+    page, total = videos.query(limit=6, klubba=None if q == "Alla" else q)
+    st.caption(f"{total} videor – de senaste visas")
+    cols = st.columns(3)
+    for i, v in enumerate(page.to_dict("records")):
+        poster = videos.asset(v["filnamn"], "poster.jpg")
+        data = cached_image(poster, POSTER_WIDTH) if poster else None   # samma variant som i app.py
+        with cols[i % 3]:
+            if data: st.image(data)
+            else: st.caption("⏳ " + videos.status(v["filnamn"]))
+            tempo = pd.to_numeric(v.get("tempo"), errors="coerce")
+            st.caption(" • ".join(str(x) for x in (v["klubba"], v["vinkel"], v["miss"]) if pd.notna(x) and x)
+                       + (f" • tempo {tempo:.1f}:1" if pd.notna(tempo) else ""))
+    end_section()
+
 elif view=="Benchmark":
     log_section("Jämförelse mot mål")
-    df = read_log()
-    if df.empty:
+    if not STATS.rows:   # tom logg – avgörs på aggregatet, loggen läses inte
         st.info("Logga några pass först.")
     else:
-        tb = df[(df["pass"]=="Range") & (df["kategori"]=="Träffbild")]
-        clean = (tb["moment"]=="Mitt i").sum(); tot = len(tb)
-        clean_rate = None if tot==0 else clean/tot
+        clean_rate = global_metrics(metrics_table(STATS))["clean_rate"]
         st.metric("Rena träffar", f"{0 if clean_rate is None else int(clean_rate*100)}%")
+        if st.toggle("📊 Visa diagram", key="bench_charts"):
+            from golflog.charts import KINDS, chart   # matplotlib laddas först här
+            for kind, source in [("carry", STATS), ("hits", STATS), ("putts", DAILY)]:
+                data = chart(kind, source, (primary_color, dark_mode))
+                if data: st.image(data, caption=KINDS[kind])
     end_section()
 
 elif view=="Profil":
-    p = read_profile()
+    p = SHARD.read_profile()
     log_section("Profil & mål")
     c0,c1,c2 = st.columns(3)
     hcp_val = c0.number_input("Handicap (0–54)", 0.0, 54.0, float(p.get("hcp",36.0)), 0.1)
@@ -395,14 +251,47 @@ elif view=="Profil":
                   "hcp": hcp_val, "coach_mode": coach_mode, "onboarded": True, "goal": goal,
                   "primary_color": st.session_state.get("primary_color", p.get("primary_color","#1E88E5")),
                   "dark_mode": st.session_state.get("dark_mode", p.get("dark_mode", False))})
-        write_profile(p); st.success("Profil sparad!")
+        SHARD.write_profile(p); st.success("Profil sparad!")
     end_section()
 
 elif view=="Ordlista":
     glossary_widget()
 
+elif view=="Diagnostik":
+    log_section("Diagnostik – rerun-tider (ms)")
+    items = profiling.reruns()
+    if st.button("🔬 Profilera nästa rerun"): st.session_state.profile_next = True
+    if items:
+        st.dataframe(profiling.summary(items).round(2), use_container_width=True, hide_index=True)
+        st.caption(f"Senaste: {items[-1]['label']} – {items[-1]['total_ms']:.0f} ms" + (f" • cProfile: {items[-1]['profile']}" if items[-1]["profile"] else ""))
+        st.dataframe(profiling.breakdown(items[-1]).round(2), use_container_width=True, hide_index=True)
+    end_section()
+
 else:
     log_section("Loggdata")
-    st.dataframe(read_log(), use_container_width=True)
-    st.download_button("⬇️ Exportera CSV", data=read_log().to_csv(index=False).encode("utf-8"), file_name="golf_logg.csv", mime="text/csv")
+    df_log = read_log()
+    st.dataframe(df_log, use_container_width=True)
+    # exporten skrivs i bitar till en temporär fil först vid klick (golflog.export)
+    e1, e2, e3 = st.columns(3)
+    start = e1.date_input("Från", value=None, key="export_from")
+    end = e2.date_input("Till", value=None, key="export_to")
+    fmt = e3.selectbox("Format", list(FORMATS), format_func=lambda f: FORMATS[f][0], key="export_format")
+    e4, e5 = st.columns(2)
+    klubba = e4.selectbox("Klubba", ["Alla"] + CLUBS, key="export_klubba")
+    pass_ = e5.selectbox("Pass", ["Alla", "Range", "Närspel", "Bana"], key="export_pass")
+    filters = {"start": start, "end": end, "klubba": None if klubba == "Alla" else klubba, "pass_": None if pass_ == "Alla" else pass_}
+    want = (SHARD.data_dir, fmt, tuple(filters.values()))
+    ready = st.session_state.get("export")
+    if ready and ready[0] != want:
+        if os.path.exists(ready[1]): os.remove(ready[1])
+        ready = st.session_state.export = None
+    if st.button("📦 Förbered export"):
+        if ready and os.path.exists(ready[1]): os.remove(ready[1])
+        with st.spinner("Skriver exporten…"): path, n = export_file(LOG, fmt, **filters)
+        ready = st.session_state.export = (want, path, n)
+    if ready and os.path.exists(ready[1]):
+        with open(ready[1], "rb") as f:
+            st.download_button(f"⬇️ Ladda ner ({ready[2]} rader)", data=f, file_name=file_name(fmt, **filters), mime=FORMATS[fmt][1])
     end_section()
+
+profiling.end_rerun(os.path.join(DATA_DIR, "profiles"))
@@ -0,0 +1,2 @@
+# Delade hjälpfunktioner för Golf Träningslogg.
+# Moduler här importeras en gång per process och överlever Streamlits reruns.
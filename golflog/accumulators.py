@@ -0,0 +1,176 @@
+import argparse, atexit, json, math, os, sys, threading, time, uuid
+import pandas as pd
+from golflog.logstore import FSYNC_EVERY, FSYNC_INTERVAL, atomic_write_json, file_lock, file_stamp
+from golflog.metrics import AGG_COLUMNS, KEYS, aggregate, metrics_table, table_from_aggregate
+
+# -----------------------------
+# Löpande statistik per (pass, kategori, moment, klubba)
+# -----------------------------
+# Antal rader + Welford count/mean/M2 för värde, sparat i data/accumulators.json.
+# Uppdateras i O(1) per loggat slag; metrics_table(acc) läser dem utan att röra loggen.
+
+def _clean(v):
+    if v is None or v == "" or (isinstance(v, float) and math.isnan(v)): return None
+    return v
+
+def _number(v):
+    if v is None or isinstance(v, bool): return None
+    try: x = float(v)
+    except (TypeError, ValueError): return None
+    return None if math.isnan(x) else x
+
+class Accumulators:
+    # Nya slag uppdaterar minnet direkt; filen skrivs i batchar som loggens fsync (FSYNC_EVERY rader
+    # eller FSYNC_INTERVAL sekunder), vid flush() och när processen avslutas. Flera processer kan dela
+    # filen: en sparning läser först in det andra har sparat (under fillåset) och lägger sina osparade
+    # rader ovanpå. Har filen byggts om från loggen under tiden (ny "gen") finns raderna redan där –
+    # loggen skrivs alltid före statistiken. Dör processen med osparade rader stämmer inte radantalet
+    # mot loggen vid nästa start, och filen byggs om.
+    def __init__(self, path):
+        self.path = path
+        self.groups = {}
+        self.rows = 0   # antal loggrader som ingår – jämförs mot loggen vid start
+        self._version = 0
+        self._stamp = None   # file_stamp för det som senast lästes/skrevs
+        self._gen = None     # byts vid varje ombyggnad
+        self._pending = []   # rader som finns i minnet men inte i filen
+        self._saved_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _add(self, row):
+        g = self.groups.setdefault(tuple(_clean(row.get(k)) for k in KEYS), [0, 0, 0.0, 0.0])
+        g[0] += 1
+        x = _number(row.get("värde"))
+        if x is not None:
+            g[1] += 1
+            d = x - g[2]
+            g[2] += d / g[1]
+            g[3] += d * (x - g[2])
+        self.rows += 1
+
+    def update(self, row: dict): self.update_many([row])
+
+    def update_many(self, rows):
+        with self._lock:
+            self._refresh()
+            for r in rows: self._add(r)
+            self._pending.extend(rows)
+            self._version += 1
+            if len(self._pending) >= FSYNC_EVERY or time.monotonic() - self._saved_at >= FSYNC_INTERVAL: self._flush()
+
+    def flush(self):
+        with self._lock: self._flush()
+
+    def _flush(self):
+        if not self._pending: return
+        with file_lock(self.path):
+            self._refresh()   # andra processers sparningar; våra osparade rader läggs ovanpå
+            self._save()
+
+    def replace(self, agg: pd.DataFrame):
+        # från metrics.aggregate() – används vid rebuild och write_log
+        with self._lock, file_lock(self.path):
+            self.groups = {tuple(_clean(r[k]) for k in KEYS): [int(r["n"]), int(r["count"]), 0.0 if pd.isna(r["mean"]) else float(r["mean"]), float(r["m2"])]
+                           for r in agg.to_dict("records")}
+            self.rows = int(agg["n"].sum()) if len(agg) else 0
+            self._gen = uuid.uuid4().hex
+            self._version += 1
+            self._save()
+
+    def version(self):
+        with self._lock:
+            self._refresh()
+            return self._version
+
+    def aggregate(self) -> pd.DataFrame:
+        with self._lock:
+            self._refresh()
+            recs = [list(k) + v for k, v in self.groups.items()]
+        return pd.DataFrame(recs, columns=AGG_COLUMNS)
+
+    def _save(self):
+        atomic_write_json(self.path, {"rows": self.rows, "gen": self._gen, "groups": [list(k) + v for k, v in self.groups.items()]})
+        self._stamp = file_stamp(self.path)
+        self._pending = []
+        self._saved_at = time.monotonic()
+
+    def _refresh(self) -> bool:
+        # anropas med self._lock: läs om filen om en annan process har skrivit den
+        stamp = file_stamp(self.path)
+        if stamp is None or stamp == self._stamp: return stamp is not None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f: data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return False
+        self.groups = {tuple(g[:4]): list(g[4:]) for g in data.get("groups", [])}
+        self.rows = int(data.get("rows", 0))
+        if data.get("gen") != self._gen: self._pending = []   # ombyggd från loggen, där raderna redan finns
+        for r in self._pending: self._add(r)
+        self._gen = data.get("gen")
+        self._stamp = stamp
+        self._version += 1
+        return True
+
+    def load(self) -> bool:
+        with self._lock: return self._refresh()
+
+def rebuild(acc: Accumulators, df: pd.DataFrame):
+    acc.replace(aggregate(df))
+
+def verify(acc: Accumulators, df: pd.DataFrame, tol=1e-9):
+    # jämför nyckeltalen från ackumulatorerna med en full omräkning över rådata
+    fast = table_from_aggregate(acc.aggregate())
+    full = metrics_table(df)
+    key = ["klubba", "metric"]
+    m = full.merge(fast, on=key, how="outer", suffixes=("_full", "_acc"), indicator=True)
+    bad = m[(m["_merge"] != "both") | (m["n_full"] != m["n_acc"])
+            | ~((m["value_full"] - m["value_acc"]).abs().le(tol * (1 + m["value_full"].abs()))
+                | (m["value_full"].isna() & m["value_acc"].isna()))]
+    return bad.drop(columns="_merge")
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+def accumulators_for(data_dir, backend) -> Accumulators:
+    # en instans per datakatalog och process. Saknas filen, eller täcker den inte lika många rader som
+    # loggen (krasch mellan logg och statistik, eller en skrivare som bara rört loggen), byggs den om.
+    key = os.path.abspath(data_dir)
+    with _instances_lock:
+        acc = _instances.get(key)
+        if acc is None:
+            acc = Accumulators(os.path.join(data_dir, "accumulators.json"))
+            if not acc.load() or acc.rows != backend.count(): rebuild(acc, backend.read())
+            _instances[key] = acc
+        return acc
+
+@atexit.register
+def _flush_all():
+    with _instances_lock: items = list(_instances.values())
+    for acc in items:
+        try: acc.flush()
+        except Exception: pass
+
+def main(argv=None):
+    from golflog.storage import get_backend
+    ap = argparse.ArgumentParser(prog="python -m golflog.accumulators", description="Bygg om och verifiera benchmark-ackumulatorerna.")
+    ap.add_argument("kommando", choices=["rebuild", "verify"])
+    ap.add_argument("--data-dir", default="data")
+    ap.add_argument("--storage", default=None, help="csv, parquet eller sqlite (standard: GOLF_STORAGE)")
+    args = ap.parse_args(argv)
+    backend = get_backend(args.data_dir, args.storage)
+    df = backend.read()
+    acc = Accumulators(os.path.join(args.data_dir, "accumulators.json"))
+    if args.kommando == "rebuild":
+        rebuild(acc, df)
+        print(f"Byggde om {len(acc.groups)} grupper från {acc.rows} rader.")
+    elif not acc.load():
+        print("Hittar ingen accumulators.json – kör rebuild först."); return 1
+    bad = verify(acc, df)
+    if len(bad):
+        print(f"{len(bad)} nyckeltal skiljer sig från full omräkning:")
+        print(bad.to_string(index=False)); return 1
+    print("OK – ackumulatorerna stämmer med full omräkning.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
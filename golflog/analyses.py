@@ -0,0 +1,71 @@
+import json, os, shutil, threading, uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from golflog.imagecache import prewarm
+from golflog.profiling import timed
+
+# -----------------------------
+# TrackMan-bilder: strömmad uppladdning, nedskalade varianter i bakgrunden, index
+# -----------------------------
+CHUNK = 1 << 20            # 1 MB per skrivning
+DISPLAY_WIDTHS = (320, 640)   # förgenereras i golflog.imagecache
+INDEX_NAME = "index.jsonl"
+IMAGE_EXT = (".jpg", ".jpeg", ".png")
+
+_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="thumbs")
+_index_lock = threading.Lock()
+
+def ingest_upload(upload, directory, klubba=None, prefix="tm"):
+    # upload är ett filobjekt (Streamlit UploadedFile); kopieras i bitar utan att läsas in helt
+    ts = datetime.now()
+    ext = os.path.splitext(upload.name)[1].lower()
+    name = f"{prefix}_{ts:%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:6]}{ext}"   # två uppladdningar samma sekund krockar inte
+    path = os.path.join(directory, name)
+    upload.seek(0)
+    with open(path + ".part", "wb") as f:
+        shutil.copyfileobj(upload, f, CHUNK)
+    os.replace(path + ".part", path)
+    entry = {"name": name, "ts": ts.isoformat(timespec="seconds"), "klubba": klubba, "bytes": os.path.getsize(path)}
+    _append_index(directory, entry)
+    _pool.submit(prewarm, path, DISPLAY_WIDTHS)
+    return name
+
+def _append_index(directory, entry):
+    with _index_lock:
+        with open(os.path.join(directory, INDEX_NAME), "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+def _build_index(directory):
+    # engångs: indexera bilder som sparades innan indexet fanns
+    names = sorted(f for f in os.listdir(directory) if f.lower().endswith(IMAGE_EXT))
+    with _index_lock:
+        with open(os.path.join(directory, INDEX_NAME), "w", encoding="utf-8") as f:
+            for n in names:
+                f.write(json.dumps({"name": n, "ts": None, "klubba": None,
+                                    "bytes": os.path.getsize(os.path.join(directory, n))}, ensure_ascii=False) + "\n")
+    for n in names[-3:]:
+        _pool.submit(prewarm, os.path.join(directory, n), DISPLAY_WIDTHS)
+
+def _tail_lines(path, n, block=4096):
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        end = pos = f.tell()
+        data = b""
+        while pos > 0 and data.count(b"\n") <= n:
+            pos = max(0, pos - block)
+            f.seek(pos)
+            data = f.read(end - pos)
+    return [l for l in data.decode("utf-8", errors="ignore").splitlines() if l.strip()][-n:]
+
+@timed()
+def recent_analyses(directory, n=3):
+    # läser bara slutet av indexet – ingen listdir eller sortering per rerun
+    index = os.path.join(directory, INDEX_NAME)
+    if not os.path.exists(index): _build_index(directory)
+    out = []
+    for line in reversed(_tail_lines(index, n)):
+        try: e = json.loads(line)
+        except ValueError: continue
+        e["path"] = os.path.join(directory, e["name"])
+        out.append(e)
+    return out
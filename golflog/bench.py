@@ -0,0 +1,193 @@
+import argparse, json, os, platform, shutil, statistics, sys, tempfile, time, tracemalloc
+from datetime import date
+import numpy as np
+import pandas as pd
+from golflog import metrics, recommend
+from golflog.accumulators import Accumulators, rebuild
+from golflog.feedback import FIELDS, feedback_table, trackman_feedback
+from golflog.logstore import invalidate_cache
+from golflog.recommend import CLUBS, compute_club_metrics_for, compute_metrics, recommend_bag, recommend_for_club
+from golflog.storage import BACKENDS, COLUMNS
+from golflog.tenants import Shard
+
+# -----------------------------
+# Benchmark av datalagret och nyckeltalen – utan Streamlit
+# -----------------------------
+# python -m golflog.bench [--sizes 1000,10000,100000,1000000] [--storage csv] [--save] [--compare FIL]
+# Varje fall körs --repeat gånger för latens (median/p95) och en gång till under tracemalloc
+# för toppminnet, så att mätningen av tiden inte störs. Baslinjer sparas som JSON i data/bench/.
+BASELINE_DIR = os.path.join("data", "bench")
+DEFAULT_SIZES = "1000,10000,100000,1000000"
+APPENDS = 200          # enstaka append_row per mätning
+FEEDBACK_CALLS = 2000   # trackman_feedback anropas per slag – fler ger bara samma siffra
+
+# (pass, kategori, moment, värde) – samma kombinationer som metrics.RATES läser, plus
+# missarna som ger nämnaren, carry (numeriskt) och LM-rader
+MOMENTS = [(p, k, m, 1) for _, p, k, m in metrics.RATES] + [
+    ("Närspel", "Chippar", "Utanför 2m", 1),
+    ("Närspel", "Puttning", "Kortputt i hål", 1),
+    ("Närspel", "Puttning", "Kortputt miss", 1),
+    ("Range", "Längdkontroll", "Carry", None),
+    ("Range", "LM", "launch/spin", None),
+]
+
+def synth_log(n: int, seed=0) -> pd.DataFrame:
+    # n rader över alla CLUBS, pass och moment, spridda över det senaste året
+    rng = np.random.default_rng(seed)
+    m = rng.integers(0, len(MOMENTS), n)
+    club = rng.integers(0, len(CLUBS), n)
+    pick = lambda i: np.array([x[i] for x in MOMENTS], dtype=object)[m]
+    days = pd.Timestamp(date.today()) - pd.to_timedelta(rng.integers(0, 365, n), unit="D")
+    numeric = np.array([x[3] is None for x in MOMENTS])[m]
+    kat = pick(1)
+    value = np.where(numeric, np.where(kat == "LM", rng.normal(14, 4, n).round(1), rng.normal(150, 12, n).round()), 1.0)
+    note = np.where(kat == "LM", "spin 2800 rpm; bs 150.0 mph; img ", "")
+    return pd.DataFrame({"datum": days.strftime("%Y-%m-%d"), "pass": pick(0), "kategori": kat, "moment": pick(2),
+                         "klubba": np.array(CLUBS, dtype=object)[club], "värde": value, "anteckning": note})[COLUMNS]
+
+def synth_shots(n: int, seed=0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed + 1)
+    driver = rng.random(n) < 0.3
+    return pd.DataFrame({"klubba": np.where(driver, "Driver", "7i"),
+                         "ball_speed": np.where(driver, rng.normal(150, 12, n), rng.normal(115, 10, n)),
+                         "launch": np.where(driver, rng.normal(13, 3, n), rng.normal(18, 4, n)),
+                         "spin": np.where(driver, rng.normal(2700, 500, n), rng.normal(6500, 1200, n)),
+                         "height": rng.normal(28, 6, n), "aoa": rng.normal(-1, 3, n),
+                         "path": rng.normal(0, 3, n), "face_to_path": rng.normal(0, 3, n)})[["klubba"] + FIELDS]
+
+# -----------------------------
+# Mätning
+# -----------------------------
+def measure(fn, ops, repeat, setup=None):
+    times = []
+    for _ in range(repeat):
+        if setup: setup()
+        t = time.perf_counter(); fn(); times.append(time.perf_counter() - t)
+    if setup: setup()
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+    med = statistics.median(times)
+    return {"median_ms": 1e3 * med, "p95_ms": 1e3 * float(np.percentile(times, 95)),
+            "per_s": ops / med if med else float("inf"), "topp_mb": max(peak, 0) / 2**20}
+
+def _clear_memo():
+    with metrics._memo_lock: metrics._memo.clear()
+    recommend.clear_cache()
+
+def run_size(n, storage, repeat, root, seed=0, log=print):
+    data_dir = os.path.join(root, f"{storage}-{n}")
+    shutil.rmtree(data_dir, ignore_errors=True); os.makedirs(data_dir)
+    df = synth_log(n, seed)
+    results = []
+    def case(name, fn, ops, setup=None, rep=repeat):
+        r = {"fall": name, "rader": n, **measure(fn, ops, rep, setup)}
+        results.append(r); log(_row(r))
+        return r
+
+    backend = BACKENDS[storage](data_dir)
+    backend.init()
+    case("write_log", lambda: backend.write(df), n, rep=max(1, min(repeat, 3)))
+    fresh = {}
+    def cold():
+        for p in ("logg.csv", os.path.join("logg_parquet", "_delta.csv")): invalidate_cache(os.path.join(data_dir, p))
+        fresh["b"] = BACKENDS[storage](data_dir)
+    case("read_log (kall)", lambda: fresh["b"].read(), n, cold)
+    case("read_log (varm)", lambda: backend.read(), n, lambda: backend.read())
+    log_df = backend.read()
+    case("compute_metrics", lambda: compute_metrics(log_df), n, _clear_memo)
+    acc = Accumulators(os.path.join(data_dir, "accumulators.json"))
+    rebuild(acc, log_df)
+    case("compute_metrics (STATS)", lambda: compute_metrics(acc), 1, _clear_memo)
+    case("compute_club_metrics_for", lambda: [compute_club_metrics_for(log_df, c) for c in CLUBS], len(CLUBS), _clear_memo)
+    profile = {"hcp": 18}
+    case("recommend_for_club", lambda: [recommend_for_club(acc, profile, c, "Enkel") for c in CLUBS], len(CLUBS), _clear_memo)
+    case("recommend_bag (memo)", lambda: recommend_bag(acc, profile, "Enkel"), len(CLUBS), lambda: recommend_bag(acc, profile, "Enkel"))
+
+    shots = synth_shots(n, seed)
+    calls = shots.head(FEEDBACK_CALLS).to_dict("records")
+    case("trackman_feedback", lambda: [trackman_feedback(s, s["klubba"], "Enkel") for s in calls], len(calls))
+    case("feedback_table", lambda: feedback_table(shots, "Enkel"), n)
+
+    shard = Shard(data_dir, storage=storage)   # som appen: logg + statistik + rollups per slag
+    row = {"datum": date.today().isoformat(), "pass": "Range", "kategori": "Träffbild", "moment": "Mitt i",
+           "klubba": "7i", "värde": 1, "anteckning": ""}
+    def appends():
+        for _ in range(APPENDS): shard.append_rows([row])
+    case("append_row", appends, APPENDS)
+    return results
+
+# -----------------------------
+# Utskrift, baslinjer och jämförelse
+# -----------------------------
+HEADER = f"{'fall':<26}{'rader':>10}{'median ms':>12}{'p95 ms':>10}{'per s':>16}{'topp MB':>10}"
+
+def _row(r):
+    return f"{r['fall']:<26}{r['rader']:>10}{r['median_ms']:>12.2f}{r['p95_ms']:>10.2f}{r['per_s']:>16,.0f}{r['topp_mb']:>10.1f}"
+
+def meta(storage, repeat):
+    return {"datum": time.strftime("%Y-%m-%d %H:%M:%S"), "storage": storage, "repeat": repeat,
+            "python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__,
+            "maskin": f"{platform.system()} {platform.machine()}", "cpu": os.cpu_count()}
+
+def compare(results, baseline, threshold=1.25, min_ms=1.0):
+    # regression = långsammare (eller mer minne) än threshold × baslinjen; små absoluta skillnader är brus
+    old = {(r["fall"], r["rader"]): r for r in baseline["resultat"]}
+    out = []
+    for r in results:
+        b = old.get((r["fall"], r["rader"]))
+        if b is None: continue
+        t = r["median_ms"] / b["median_ms"] if b["median_ms"] else float("inf")
+        mem = r["topp_mb"] / b["topp_mb"] if b["topp_mb"] else 1.0
+        slow = t > threshold and r["median_ms"] - b["median_ms"] > min_ms
+        fat = mem > threshold and r["topp_mb"] - b["topp_mb"] > 1.0
+        out.append({"fall": r["fall"], "rader": r["rader"], "tid": t, "minne": mem, "regression": slow or fat})
+    return out
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m golflog.bench", description="Mät latens, genomströmning och toppminne för loggen och nyckeltalen på syntetisk data.")
+    ap.add_argument("--sizes", default=DEFAULT_SIZES, help="antal rader, kommaseparerat (upp till 10000000)")
+    ap.add_argument("--storage", choices=sorted(BACKENDS), default=os.environ.get("GOLF_STORAGE", "csv"))
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--save", nargs="?", const="", default=None, metavar="FIL",
+                    help=f"spara resultatet som JSON (standard: {BASELINE_DIR}/baseline-<storage>.json)")
+    ap.add_argument("--compare", default=None, metavar="FIL", help="jämför mot en sparad baslinje; exit 1 vid regression")
+    ap.add_argument("--threshold", type=float, default=1.25, help="kvot mot baslinjen som räknas som regression")
+    ap.add_argument("--data-dir", default=None, help="standard: en temporär katalog som tas bort efteråt")
+    args = ap.parse_args(argv)
+    sizes = [int(float(s)) for s in args.sizes.split(",") if s.strip()]
+    root = args.data_dir or tempfile.mkdtemp(prefix="golflog-bench-")
+    print(f"Lagring {args.storage}, {args.repeat} upprepningar, data i {root}")
+    print(HEADER)
+    results = []
+    try:
+        for n in sizes: results += run_size(n, args.storage, args.repeat, root, args.seed)
+    finally:
+        if args.data_dir is None: shutil.rmtree(root, ignore_errors=True)
+    doc = {"meta": meta(args.storage, args.repeat), "resultat": results}
+    if args.save is not None:
+        path = args.save or os.path.join(BASELINE_DIR, f"baseline-{args.storage}.json")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f: json.dump(doc, f, ensure_ascii=False, indent=1)
+        print(f"Sparade {len(results)} mätningar i {path}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f: baseline = json.load(f)
+        if baseline["meta"].get("storage") != args.storage:
+            print(f"Obs: baslinjen är mätt med {baseline['meta'].get('storage')}, inte {args.storage}")
+        diff = compare(results, baseline, args.threshold)
+        print(f"\n{'fall':<26}{'rader':>10}{'tid ×':>10}{'minne ×':>10}")
+        for d in diff:
+            print(f"{d['fall']:<26}{d['rader']:>10}{d['tid']:>10.2f}{d['minne']:>10.2f}" + ("  REGRESSION" if d["regression"] else ""))
+        bad = sum(d["regression"] for d in diff)
+        print(f"{bad} regressioner (gräns {args.threshold:.2f}× baslinjen)" if bad else "Inga regressioner.")
+        return 1 if bad else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
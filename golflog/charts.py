@@ -0,0 +1,163 @@
+import io, threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from golflog.metrics import ALL, CARRY, MIN_CARRY_SHOTS, club_overview, metrics_table
+from golflog.profiling import timed
+from golflog.recommend import CLUBS
+
+# -----------------------------
+# Diagram för Benchmark: carry-spridning, träffbild per klubba och kortputtar per dag
+# -----------------------------
+# Ritas med matplotlib (Figure utan pyplot – ingen global state mellan trådar) som importeras först
+# när ett diagram faktiskt ritas. Färdiga PNG/SVG-bytes cachas per (typ, datakälla + version, tema,
+# format); källorna (STATS, DAILY) räknar upp version() vid varje nytt slag, så en rerun utan ny
+# data ritar ingenting.
+KINDS = {"carry": "Carry-spridning per klubba", "hits": "Träffbild per klubba", "putts": "Kortputtar per dag"}
+MEMORY_BUDGET = 8 * 1024 * 1024   # byte
+DPI = 120
+WIDTH = 6.0                        # tum – fyller den centrerade layouten
+PUTT_DAYS = 30                     # senaste dagarna med puttar
+TOE, HEEL = "#F59E0B", "#EF4444"
+
+_mem = OrderedDict()   # key -> (source, bytes)
+_mem_bytes = 0
+_lock = threading.Lock()
+
+def _palette(theme):
+    primary, dark = theme
+    if dark: return {"primary": primary, "bg": "#0B1220", "text": "#E5E7EB", "muted": "#9CA3AF", "grid": "#1f2937"}
+    return {"primary": primary, "bg": "#FFFFFF", "text": "#111827", "muted": "#9CA3AF", "grid": "#E5E7EB"}
+
+def _figure(rows, theme):
+    from matplotlib.figure import Figure   # tungt – laddas bara när något ska ritas
+    p = _palette(theme)
+    fig = Figure(figsize=(WIDTH, 1.0 + 0.32 * max(rows, 4)), dpi=DPI, facecolor=p["bg"], layout="constrained")
+    ax = fig.add_subplot()
+    ax.set_facecolor(p["bg"])
+    ax.tick_params(colors=p["text"], labelsize=8)
+    for s in ax.spines.values(): s.set_color(p["grid"])
+    ax.grid(True, color=p["grid"], linewidth=0.6)
+    ax.set_axisbelow(True)
+    return fig, ax, p
+
+# -----------------------------
+# Data – alltid ur de löpande aggregaten, aldrig ur rådata
+# -----------------------------
+def carry_frame(stats) -> pd.DataFrame:
+    # klubba, n, medel, std för klubbor med minst MIN_CARRY_SHOTS carry-slag, i bagens ordning
+    agg = stats.aggregate()
+    lc = agg[(agg["pass"] == CARRY[0]) & (agg["kategori"] == CARRY[1]) & (agg["moment"] == CARRY[2])]
+    lc = lc[lc["count"] >= MIN_CARRY_SHOTS]
+    f = pd.DataFrame({"klubba": lc["klubba"].to_numpy(), "n": lc["count"].astype(int).to_numpy(), "medel": lc["mean"].to_numpy(),
+                      "std": np.sqrt(lc["m2"] / (lc["count"] - 1)).to_numpy()})
+    order = {c: i for i, c in enumerate(CLUBS)}
+    return f.assign(_o=f["klubba"].map(order).fillna(len(CLUBS))).sort_values(["_o", "klubba"]).drop(columns="_o").reset_index(drop=True)
+
+def hits_frame(stats) -> pd.DataFrame:
+    # andel Mitt i/Tåträff/Hälträff per klubba
+    wide = club_overview(metrics_table(stats))
+    cols = ["center", "toe", "heel"]
+    if wide.empty or not set(cols) <= set(wide.columns): return pd.DataFrame(columns=cols)
+    return wide[cols].reindex([c for c in CLUBS if c in wide.index] + sorted(c for c in wide.index if c not in CLUBS)).dropna(how="all").fillna(0.0)
+
+def putts_frame(daily, days=PUTT_DAYS) -> pd.DataFrame:
+    # i hål / miss per dag, senaste `days` dagarna som har kortputtar
+    f = daily.frame()
+    f = f[(f["kategori"] == "Puttning") & f["moment"].isin(["Kortputt i hål", "Kortputt miss"])].dropna(subset=["datum"])
+    if f.empty: return pd.DataFrame(columns=["i hål", "miss"])
+    t = f.pivot_table(index="datum", columns="moment", values="n", aggfunc="sum", fill_value=0)
+    t = t.reindex(columns=["Kortputt i hål", "Kortputt miss"], fill_value=0)
+    t.columns = ["i hål", "miss"]
+    return t.sort_index().tail(days)
+
+# -----------------------------
+# Ritning
+# -----------------------------
+def _carry(stats, theme):
+    f = carry_frame(stats)
+    if f.empty: return None
+    fig, ax, p = _figure(len(f), theme)
+    y = np.arange(len(f))[::-1]
+    ax.hlines(y, f["medel"] - 2 * f["std"], f["medel"] + 2 * f["std"], color=p["muted"], linewidth=2)
+    ax.hlines(y, f["medel"] - f["std"], f["medel"] + f["std"], color=p["primary"], linewidth=6)
+    ax.plot(f["medel"], y, "o", color=p["text"], markersize=4)
+    ax.set_yticks(y, [f"{k} (n={n})" for k, n in zip(f["klubba"], f["n"])])
+    ax.set_xlabel("Carry (m) – medel, ±1σ och ±2σ", color=p["text"], fontsize=8)
+    return fig
+
+def _hits(stats, theme):
+    f = hits_frame(stats)
+    if f.empty: return None
+    fig, ax, p = _figure(len(f), theme)
+    y = np.arange(len(f))[::-1]
+    left = np.zeros(len(f))
+    for col, label, color in [("center", "Mitt i", p["primary"]), ("toe", "Tåträff", TOE), ("heel", "Hälträff", HEEL)]:
+        v = 100 * f[col].to_numpy()
+        ax.barh(y, v, left=left, color=color, label=label, height=0.7)
+        left += v
+    ax.set_yticks(y, list(f.index))
+    ax.set_xlim(0, 100)
+    ax.set_xlabel("Andel av träffbildsslagen (%)", color=p["text"], fontsize=8)
+    ax.legend(loc="lower center", bbox_to_anchor=(0.5, 1.0), ncol=3, frameon=False, fontsize=8, labelcolor=p["text"])
+    return fig
+
+def _putts(daily, theme):
+    f = putts_frame(daily)
+    if f.empty: return None
+    fig, ax, p = _figure(6, theme)
+    x = np.arange(len(f))
+    ax.bar(x, f["i hål"], color=p["primary"], label="I hål")
+    ax.bar(x, f["miss"], bottom=f["i hål"], color=p["muted"], label="Miss")
+    ax.set_ylabel("Kortputtar", color=p["text"], fontsize=8)
+    step = max(1, len(f) // 8)
+    ax.set_xticks(x[::step], [d.strftime("%d/%m") for d in f.index[::step]])
+    rate = ax.twinx()
+    rate.plot(x, 100 * f["i hål"] / (f["i hål"] + f["miss"]), "o-", color=p["text"], markersize=3, linewidth=1)
+    rate.set_ylim(0, 105)
+    rate.set_ylabel("I hål (%)", color=p["text"], fontsize=8)
+    rate.tick_params(colors=p["text"], labelsize=8)
+    for s in rate.spines.values(): s.set_color(p["grid"])
+    ax.legend(loc="lower center", bbox_to_anchor=(0.5, 1.0), ncol=2, frameon=False, fontsize=8, labelcolor=p["text"])
+    return fig
+
+_RENDER = {"carry": _carry, "hits": _hits, "putts": _putts}
+
+def render(kind, source, theme, fmt="png"):
+    # ritar alltid (ingen cache); None om det saknas data för diagrammet
+    fig = _RENDER[kind](source, theme)
+    if fig is None: return None
+    buf = io.BytesIO()
+    fig.savefig(buf, format=fmt, facecolor=fig.get_facecolor(), metadata={"Software": None} if fmt == "png" else {"Date": None})
+    return buf.getvalue()
+
+def _remember(key, source, data):
+    global _mem_bytes
+    with _lock:
+        old = _mem.pop(key, None)
+        if old is not None: _mem_bytes -= len(old[1] or b"")
+        _mem[key] = (source, data)
+        _mem_bytes += len(data or b"")
+        while _mem_bytes > MEMORY_BUDGET and len(_mem) > 1:
+            _, (_, d) = _mem.popitem(last=False)
+            _mem_bytes -= len(d or b"")
+
+@timed()
+def chart(kind, source, theme=("#1E88E5", False), fmt="png"):
+    # PNG/SVG-bytes för st.image, eller None om det saknas data. source = STATS (carry, hits) eller
+    # DAILY (putts); theme = (primärfärg, mörkt läge) som i apply_theme.
+    theme = (str(theme[0]), bool(theme[1]))
+    key = (kind, id(source), source.version(), theme, fmt)
+    with _lock:
+        hit = _mem.get(key)
+        if hit is not None and hit[0] is source:
+            _mem.move_to_end(key)
+            return hit[1]
+    data = render(kind, source, theme, fmt)
+    _remember(key, source, data)
+    return data
+
+def clear():
+    global _mem_bytes
+    with _lock:
+        _mem.clear(); _mem_bytes = 0
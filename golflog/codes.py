@@ -0,0 +1,153 @@
+import argparse, glob, os, shutil, sys, tempfile
+import numpy as np
+import pandas as pd
+from golflog.metrics import CARRY, KEYS, RATES
+from golflog.recommend import CLUBS
+
+# -----------------------------
+# Kategorikoder för loggens upprepade strängkolumner
+# -----------------------------
+# pass/kategori/moment/klubba har några tiotal olika värden men miljontals rader. De lagras som
+# pd.Categorical med ett fast ordförråd först (stabila int8-koder mellan processer och filer) och
+# okända värden sist. Filter som df["klubba"] == "7i" blir då en jämförelse av int8-koder.
+BUTTON_MOMENTS = [("Range", "Träffbild", "Mitt i"), ("Range", "Träffbild", "Tåträff"), ("Range", "Träffbild", "Hälträff"),
+                  ("Range", "Kontakt", "Topp"), ("Range", "Kontakt", "Duff"), ("Range", "Kontakt", "Flush")]
+MISSES = [("Närspel", "Chippar", "Utanför 2m"), ("Närspel", "Puttning", "Kortputt i hål"), ("Närspel", "Puttning", "Kortputt miss")]
+LM = ("Range", "LM", "launch/spin")   # moment = "<klubba> launch/spin"
+
+def _unique(xs):
+    return list(dict.fromkeys(xs))
+
+_triples = BUTTON_MOMENTS + [r[1:] for r in RATES] + [CARRY] + MISSES
+VOCAB = {"pass": _unique([t[0] for t in _triples] + ["Bana"]),
+         "kategori": _unique([t[1] for t in _triples] + [LM[1]]),
+         "moment": _unique([t[2] for t in _triples] + [f"{c} {LM[2]}" for c in CLUBS]),
+         "klubba": list(CLUBS)}
+DTYPES = {c: pd.CategoricalDtype(v) for c, v in VOCAB.items()}
+CSV_DTYPE = {c: "category" for c in KEYS}   # read_csv bygger kategorierna direkt; encode ordnar om dem
+
+def _same(dtype, other) -> bool:
+    # CategoricalDtype == jämför oordnade kategorier som mängder – koderna kräver samma ordning
+    return isinstance(dtype, pd.CategoricalDtype) and dtype.categories.equals(other.categories)
+
+def _with_extras(col, found):
+    # fasta ordförrådet först, okända värden sorterade efter – samma indata ger samma koder
+    known = DTYPES[col].categories
+    extra = sorted(str(x) for x in found if x not in known)
+    return DTYPES[col] if not extra else pd.CategoricalDtype(list(known) + extra)
+
+def encode_column(col, values) -> pd.Categorical:
+    if isinstance(values, pd.Series): values = values.array
+    if isinstance(values, pd.Categorical) and _same(values.dtype, DTYPES[col]): return values
+    cat = values if isinstance(values, pd.Categorical) else pd.Categorical(values)
+    if cat.categories.dtype != object and len(cat.categories):
+        cat = pd.Categorical(pd.Series(cat).map(str, na_action="ignore"))   # t.ex. siffror som klubba
+    dtype = _with_extras(col, cat.categories)
+    return cat if _same(cat.dtype, dtype) else cat.set_categories(dtype.categories)
+
+def encode(df: pd.DataFrame) -> pd.DataFrame:
+    # ny ram bara om någon kolumn ändras; redan kodade kolumner (även med okända värden) lämnas orörda
+    new = {}
+    for c in KEYS:
+        if c in df.columns and not _same(df[c].dtype, DTYPES[c]):
+            cat = encode_column(c, df[c])
+            if not _same(df[c].dtype, cat.dtype): new[c] = cat
+    return df.assign(**new) if new else df
+
+def decode(df: pd.DataFrame) -> pd.DataFrame:
+    return df.assign(**{c: df[c].astype(object) for c in KEYS if c in df.columns and isinstance(df[c].dtype, pd.CategoricalDtype)})
+
+def concat(parts) -> pd.DataFrame:
+    # pd.concat behåller bara kategorityp när alla delar har exakt samma kategorier
+    parts = [encode(p) for p in parts]
+    for c in KEYS:
+        if c not in parts[0].columns: continue
+        cats = {tuple(p[c].cat.categories) for p in parts}
+        if len(cats) > 1:
+            dtype = _with_extras(c, {x for cs in cats for x in cs})
+            parts = [p.assign(**{c: p[c].cat.set_categories(dtype.categories)}) for p in parts]
+    return pd.concat(parts, ignore_index=True)
+
+def codes(df: pd.DataFrame):
+    # {kolumn: (int8-koder, ordlista)}; -1 = saknas
+    return {c: (df[c].cat.codes.to_numpy(), list(df[c].cat.categories)) for c in KEYS if c in df.columns}
+
+# -----------------------------
+# Kontroll: minne och rundtur mot CSV
+# -----------------------------
+def memory(df: pd.DataFrame) -> dict:
+    # byte per rad för de fyra nyckelkolumnerna, som strängar resp. koder
+    n = max(len(df), 1)
+    raw, enc = decode(df), encode(df)
+    return {"rader": len(df), "sträng_b": sum(raw[c].memory_usage(index=False, deep=True) for c in KEYS) / n,
+            "kod_b": sum(enc[c].memory_usage(index=False, deep=True) for c in KEYS) / n}
+
+def synthetic_log(path, rows=3000, unknown=200, seed=0):
+    # deterministisk logg: hela ordförrådet, `unknown` okända moment (fler än 127 -> int16-koder),
+    # okända/numeriska klubbor, tomma fält, heltal och decimaler, citattecken och kommatecken i anteckningar
+    rng = np.random.default_rng(seed)
+    triples = _triples + [(LM[0], LM[1], f"{c} {LM[2]}") for c in CLUBS] + [("Bana", "Spel", f"Övning {i:03d}") for i in range(unknown)]
+    clubs = list(CLUBS) + ["Järn 7", "7", "Hybrid 3 (19°)", ""]
+    t = [triples[i] for i in rng.integers(0, len(triples), rows)]
+    v = rng.integers(0, 300, rows).astype(float)
+    v[rng.random(rows) < 0.3] += 0.5
+    df = pd.DataFrame({"datum": (pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 700, rows), unit="D")).strftime("%Y-%m-%d"),
+                       "pass": [x[0] for x in t], "kategori": [x[1] for x in t], "moment": [x[2] for x in t],
+                       "klubba": [clubs[i] for i in rng.integers(0, len(clubs), rows)],
+                       "värde": np.where(rng.random(rows) < 0.05, np.nan, v),
+                       "anteckning": [["", "bra", 'sa "flush", rakt', "å, ä, ö"][i] for i in rng.integers(0, 4, rows)]})
+    df.to_csv(path, index=False, encoding="utf-8")
+    return path
+
+def roundtrip(csv_path) -> dict:
+    # logg.csv -> koder -> CSV (som export_csv) och -> Parquet-segment -> CSV; allt ska bli byte-identiskt
+    from golflog.storage import ParquetBackend, to_csv_frame
+    text = pd.read_csv(csv_path, encoding="utf-8", dtype={c: str for c in KEYS})   # filens exakta strängar
+    enc = encode(pd.read_csv(csv_path, encoding="utf-8", dtype=CSV_DTYPE))       # som CsvBackend.read
+    back = decode(enc)
+    same = all(back[c].isna().equals(text[c].isna()) and (back[c].dropna() == text[c].dropna()).all()
+               for c in KEYS if c in text.columns)
+    tmp = tempfile.mkdtemp(prefix="golflog-codes-")
+    try:
+        shutil.copy(csv_path, os.path.join(tmp, "logg.csv"))
+        pq = ParquetBackend(tmp)
+        pq.init()   # migrerar logg.csv till segment med int8-ordlistor (int16 om ordlistan är större)
+        disk = pq.export_csv()
+        typed = pq.read()
+        import pyarrow.parquet as pa_pq
+        index = sorted({str(pa_pq.read_schema(f).field("moment").type.index_type) for f in pq._segments()})
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    want = text.to_csv(index=False).encode("utf-8")
+    want_pq = to_csv_frame(text).to_csv(index=False).encode("utf-8") if len(text) else want
+    return {"csv": enc.to_csv(index=False).encode("utf-8") == want, "värden": same, "parquet": disk == want_pq,
+            "kodtyper": {c: str(typed[c].cat.codes.dtype) for c in KEYS if c in typed.columns}, "segmentindex": index,
+            "okända": {c: [x for x in enc[c].cat.categories if x not in DTYPES[c].categories] for c in KEYS if c in enc.columns},
+            **memory(text)}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m golflog.codes", description="Kontrollera kategorikoderna mot en logg.csv: rundtur och minne per rad.")
+    ap.add_argument("csv", nargs="*", help="standard: data/logg.csv och alla golfares loggar")
+    ap.add_argument("--bara-syntetisk", action="store_true", help="kör bara den syntetiska kontrollen")
+    args = ap.parse_args(argv)
+    from golflog.tenants import USERS_DIR
+    paths = [] if args.bara_syntetisk else args.csv or [p for p in [os.path.join("data", "logg.csv")] if os.path.exists(p)] + sorted(glob.glob(os.path.join("data", USERS_DIR, "*", "logg.csv")))
+    tmp = tempfile.mkdtemp(prefix="golflog-codes-")
+    ok = True
+    try:
+        # alltid först: en syntetisk logg med okända värden, så att kontrollen inte blir trivial på en tom installation
+        for label, p in [("syntetisk", synthetic_log(os.path.join(tmp, "syntetisk.csv")))] + [(p, p) for p in paths]:
+            r = roundtrip(p)
+            good = r["csv"] and r["värden"] and r["parquet"]
+            if label == "syntetisk": good &= r["kodtyper"].get("moment") == "int16" and r["segmentindex"] == ["int16"]
+            ok &= good
+            size = f"{r['sträng_b']:.0f} → {r['kod_b']:.1f} byte/rad" if r["rader"] else "tom"
+            print(f"{label}: {r['rader']} rader, {size}, koder {r['kodtyper']} – " + ("OK" if good else f"FEL {r}"))
+            extra = {c: len(v) for c, v in r["okända"].items() if v}
+            if extra: print(f"  utanför ordförrådet (antal): {extra}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
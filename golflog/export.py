@@ -0,0 +1,118 @@
+import argparse, glob, gzip, os, sys, tempfile, time
+import numpy as np
+import pandas as pd
+from golflog.storage import CATEGORICAL, CHUNK_ROWS, COLUMNS, ParquetBackend, _for_arrow
+
+# -----------------------------
+# Export av loggen i bitar: CSV, gzip-CSV eller Parquet, med filter
+# -----------------------------
+# Backendens iter_chunks() läser CHUNK_ROWS rader åt gången och varje bit filtreras och skrivs direkt
+# till en fil, så minnet beror på bitstorleken och inte på loggens längd. Appen skapar filen först när
+# någon ber om den (knappen "Förbered export"), aldrig på varje rerun.
+FORMATS = {"csv": ("CSV", "text/csv", ".csv"),
+           "csv.gz": ("CSV (gzip)", "application/gzip", ".csv.gz"),
+           "parquet": ("Parquet", "application/vnd.apache.parquet", ".parquet")}
+TMP_PREFIX = "golflog-export-"
+TMP_TTL = 3600   # sekunder innan en gammal exportfil i temp-katalogen städas bort
+GZIP_LEVEL = 6   # nivå 9 (standard i gzip) tar dubbelt så lång tid för någon procent mindre fil
+
+def _mask(chunk, start=None, end=None, klubba=None, pass_=None):
+    m = np.ones(len(chunk), dtype=bool)
+    if start is not None: m &= (chunk["datum"] >= pd.Timestamp(start)).to_numpy()
+    if end is not None: m &= (chunk["datum"] < pd.Timestamp(end) + pd.Timedelta(days=1)).to_numpy()   # t.o.m. slutdagen
+    if klubba: m &= (chunk["klubba"] == klubba).to_numpy()
+    if pass_: m &= (chunk["pass"] == pass_).to_numpy()
+    return m
+
+def export_chunks(backend, start=None, end=None, klubba=None, pass_=None, rows=CHUNK_ROWS):
+    # typade bitar (storage.to_typed) som matchar filtren; tomma bitar hoppas över
+    for chunk in backend.iter_chunks(rows):
+        m = _mask(chunk, start, end, klubba, pass_)
+        if m.all(): yield chunk[COLUMNS]
+        elif m.any(): yield chunk.loc[m, COLUMNS]
+
+def _csv_frame(chunk):
+    # som loggfilen: datum som text, heltal utan ".0" – per värde, så att alla bitar formateras lika
+    v = chunk["värde"].to_numpy(dtype=np.float64)
+    whole = np.isfinite(v) & (v % 1 == 0)
+    text = np.where(whole, np.where(whole, v, 0).astype(np.int64).astype(str), v.astype(str))
+    out = {"datum": chunk["datum"].dt.strftime("%Y-%m-%d").to_numpy()}
+    out.update({c: chunk[c].astype(object).to_numpy() for c in CATEGORICAL})
+    out["värde"] = np.where(np.isnan(v), "", text)
+    out["anteckning"] = chunk["anteckning"].to_numpy()
+    return pd.DataFrame(out, columns=COLUMNS)
+
+def _schema():
+    import pyarrow as pa
+    return pa.schema([f for f in ParquetBackend.schema() if f.name != "_rad"])
+
+def write_export(backend, path, fmt="csv", rows=CHUNK_ROWS, **filters) -> int:
+    # skriver till path (via .tmp + rename) och returnerar antal rader
+    tmp, n = path + ".tmp", 0
+    chunks = export_chunks(backend, rows=rows, **filters)
+    try:
+        if fmt == "parquet":
+            import pyarrow as pa, pyarrow.parquet as pq
+            schema = _schema()
+            with pq.ParquetWriter(tmp, schema) as w:
+                for chunk in chunks:
+                    w.write_table(pa.Table.from_pandas(_for_arrow(chunk), schema=schema, preserve_index=False))
+                    n += len(chunk)
+        elif fmt in ("csv", "csv.gz"):
+            f = (gzip.open(tmp, "wt", compresslevel=GZIP_LEVEL, encoding="utf-8", newline="") if fmt == "csv.gz"
+                 else open(tmp, "w", encoding="utf-8", newline=""))
+            with f:
+                pd.DataFrame(columns=COLUMNS).to_csv(f, index=False)
+                for chunk in chunks:
+                    _csv_frame(chunk).to_csv(f, index=False, header=False)
+                    n += len(chunk)
+        else:
+            raise ValueError(f"Okänt format: {fmt}")
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp): os.remove(tmp)
+    return n
+
+def _prune(directory):
+    now = time.time()
+    for p in glob.glob(os.path.join(directory, TMP_PREFIX + "*")):
+        try:
+            if now - os.path.getmtime(p) > TMP_TTL: os.remove(p)
+        except FileNotFoundError: pass
+
+def export_file(backend, fmt="csv", **filters):
+    # -> (sökväg till en temporär exportfil, antal rader); anroparen tar bort filen när den inte behövs
+    directory = tempfile.gettempdir()
+    _prune(directory)
+    fd, path = tempfile.mkstemp(prefix=TMP_PREFIX, suffix=FORMATS[fmt][2], dir=directory)
+    os.close(fd)
+    try: return path, write_export(backend, path, fmt, **filters)
+    except BaseException:
+        os.remove(path); raise
+
+def file_name(fmt="csv", start=None, end=None, klubba=None, pass_=None) -> str:
+    parts = ["golf_logg"] + [str(x) for x in (pass_, klubba) if x]
+    if start or end: parts.append(f"{start or ''}–{end or ''}")
+    return "_".join(p.replace(" ", "-") for p in parts) + FORMATS[fmt][2]
+
+def main(argv=None):
+    from golflog.storage import get_backend
+    ap = argparse.ArgumentParser(prog="python -m golflog.export", description="Exportera loggen i bitar till CSV, gzip-CSV eller Parquet.")
+    ap.add_argument("fil", nargs="?", help="standard: golf_logg<filter>.<format> i aktuell katalog")
+    ap.add_argument("--format", choices=list(FORMATS), default="csv")
+    ap.add_argument("--från", dest="start", type=pd.Timestamp, default=None, help="ÅÅÅÅ-MM-DD")
+    ap.add_argument("--till", dest="end", type=pd.Timestamp, default=None, help="ÅÅÅÅ-MM-DD (inklusive)")
+    ap.add_argument("--klubba", default=None)
+    ap.add_argument("--pass", dest="pass_", default=None)
+    ap.add_argument("--data-dir", default="data", help="t.ex. data/users/<namn> för en golfares logg")
+    ap.add_argument("--storage", default=None, help="csv, parquet eller sqlite (standard: GOLF_STORAGE)")
+    args = ap.parse_args(argv)
+    filters = {"start": args.start, "end": args.end, "klubba": args.klubba, "pass_": args.pass_}
+    path = args.fil or file_name(args.format, **{**filters, "start": args.start and args.start.date(), "end": args.end and args.end.date()})
+    t0 = time.perf_counter()
+    n = write_export(get_backend(args.data_dir, args.storage), path, args.format, **filters)
+    print(f"{n} rader -> {path} ({os.path.getsize(path) / 2**20:.1f} MB, {time.perf_counter() - t0:.2f} s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
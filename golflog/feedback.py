@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# TrackMan-feedback som regeltabell, utvärderad som masker över en hel slagtabell
+# -----------------------------
+# Regel = (klubbgrupp, villkor, tips, coach-läge). Villkoren är (mått, op, tröskel) och
+# måste alla gälla; tröskeln är ett tal eller en härledd kolumn (se _derive). "{mål}" i
+# tipset ersätts med driverns ideala launch för slaget. Ordningen är tipsens ordning.
+FIELDS = ["ball_speed", "launch", "spin", "height", "aoa", "face_to_path", "path"]
+ALL_MODES = "Alla"
+RULES = [
+    ("Driver", (("ball_speed", ">", 0), ("launch", "<", "launch_lo")),
+     "Öka launch: högre tee, boll längre fram, mer tilt (mål ~{mål}°).", ALL_MODES),
+    ("Driver", (("ball_speed", ">", 0), ("launch", ">", "launch_hi")),
+     "Sänk launch något: lägre tee/neutral loft (mål ~{mål}°).", ALL_MODES),
+    ("Driver", (("spin", ">", 0), ("spin", ">", 3000)),
+     "För hög spinn: träffa mer uppåt (+AoA), minska loft/mer fram flytt av vikt.", ALL_MODES),
+    ("Driver", (("spin", ">", 0), ("spin", "<", 1600)),
+     "Väldigt låg spinn: risk för dippar – mer loft eller mindre uppåt‑träff.", ALL_MODES),
+    ("Driver", (("aoa", "<", -1),),
+     "AoA negativ: träna slå **uppåt** på bollen (boll längre fram, hög tee).", ALL_MODES),
+    ("Driver", (("path", ">", 2), ("face_to_path", ">", 2)),
+     "Path inifrån + face stängd → risk hook; neutralisera face/release.", ALL_MODES),
+    ("Driver", (("path", "<", -2), ("face_to_path", "<", -2)),
+     "Path utifrån + face öppen → risk slice; starkare grepp, in-to-out.", ALL_MODES),
+    ("Järn", (("launch", "<", 14),),
+     "Låg launch: mer shaft lean kontrollerat, ren bollkontakt efter bollen.", ALL_MODES),
+    ("Järn", (("launch", ">", 22),),
+     "Hög launch: kolla loft/dynamic loft, träffa nedåt genom bollen.", ALL_MODES),
+    ("Järn", (("spin", ">", 0), ("spin", "<", 5000)),
+     "Låg spinn för järn: renare träff & rätt bollval/loft.", ALL_MODES),
+    ("Järn", (("height", "<", 18),),
+     "Låg topphöjd: sikta ~25–35 m med 7i – håll tempo och full finish.", ALL_MODES),
+    ("Järn", (("abs_face_to_path", ">", 2.5),),
+     "Stor face/path-diff → jobba mot neutralare face till path.", ALL_MODES),
+]
+FALLBACK = "Värdena ser rimliga ut för denna klubba. Fortsätt!"   # när ingen regel ovan slår till
+MODE_RULES = [("Avancerad", "Avancerat: filma DTL + FO och jämför release/sekvens med drillen.")]
+TIPS = [r[2] for r in RULES] + [FALLBACK] + [t for _, t in MODE_RULES]
+
+# samma regler med tydligare termer (Angle of Attack, startvinkel …) – index som TIPS
+CLEAR_TIPS = [
+    "Öka startvinkel: högre tee, bollen längre fram, mer tilt (mål ~{mål}°).",
+    "Sänk startvinkel: lägre tee/neutral loft (mål ~{mål}°).",
+    "Hög spinn: träffa mer uppåt (positiv Angle of Attack) eller minska loft.",
+    "Väldigt låg spinn: mer loft eller mindre uppåtsving för höjdkontroll.",
+    "Angle of Attack negativ: träna uppåtträff (boll fram, hög tee).",
+    "Inifrån‑ut + stängt face → hook‑risk: neutralisera face/release.",
+    "Utifrån‑in + öppet face → slice‑risk: starkare grepp & inifrån‑sving.",
+    "Låg startvinkel: kontrollerad shaft‑lean och ren bollkontakt efter bollen.",
+    "Hög startvinkel: minska dynamiskt loft, träffa nedåt genom bollen.",
+    "Låg spinn för järn: renare träff & rätt boll/loft.",
+    "Låg topphöjd: sikta ~25–35 m med 7i – håll tempo och full finish.",
+    "Stor skillnad mellan face och svingriktning → jobba neutralare face‑till‑path.",
+    "Värdena ser rimliga ut. Fortsätt!",
+    "Avancerat: filma från bakom (Down The Line) och framifrån (Face On) och jämför sekvens/release med drillen.",
+]
+
+_TEMPLATED = [i for i, t in enumerate(TIPS) if "{mål}" in t]
+_OPS = {"<": np.less, ">": np.greater, "<=": np.less_equal, ">=": np.greater_equal}
+_PY_OPS = {"<": float.__lt__, ">": float.__gt__, "<=": float.__le__, ">=": float.__ge__}
+
+def club_group(klubba):
+    return np.where(np.asarray(klubba, dtype=object) == "Driver", "Driver", "Järn")
+
+def _derive(shots: pd.DataFrame) -> dict:
+    cols = {f: shots[f].to_numpy(dtype=float) if f in shots else np.zeros(len(shots)) for f in FIELDS}
+    bs = cols["ball_speed"]
+    ideal = np.where(bs < 150, 12.0, np.where(bs < 165, 14.0, 15.5))
+    cols["launch_lo"] = ideal - 2
+    cols["launch_hi"] = ideal + 3
+    cols["abs_face_to_path"] = np.abs(cols["face_to_path"])
+    cols["ideal_launch"] = ideal
+    return cols
+
+def rule_masks(shots: pd.DataFrame, klubba=None, mode: str = "Enkel") -> np.ndarray:
+    # bool-matris (slag × TIPS); klubba = kolumnen "klubba" om inget annat anges
+    cols = _derive(shots)
+    group = club_group(shots["klubba"] if klubba is None else np.broadcast_to(klubba, len(shots)))
+    out = np.zeros((len(shots), len(TIPS)), dtype=bool)
+    for i, (g, conds, _, rule_mode) in enumerate(RULES):
+        m = group == g
+        for metric, op, thr in conds:
+            m &= _OPS[op](cols[metric], cols[thr] if isinstance(thr, str) else thr)
+        out[:, i] = m & (rule_mode in (ALL_MODES, mode))
+    out[:, len(RULES)] = ~out[:, :len(RULES)].any(axis=1)
+    for j, (rule_mode, _) in enumerate(MODE_RULES, start=len(RULES) + 1):
+        out[:, j] = mode == rule_mode
+    return out
+
+def _fmt_ideal(x):
+    return f"{x:g}" if x != int(x) else str(int(x))
+
+def feedback_table(shots: pd.DataFrame, mode: str = "Enkel", klubba=None) -> pd.DataFrame:
+    # långt format: en rad per (slag, tips) i regelordning. Saknade värden räknas som 0, som i formuläret.
+    shots = shots.copy()
+    for f in FIELDS:
+        shots[f] = pd.to_numeric(shots[f], errors="coerce").fillna(0.0) if f in shots else 0.0
+    return _long(shots, rule_masks(shots, klubba, mode))
+
+def _long(shots, masks):
+    rows, rules = np.nonzero(masks)   # radvis -> samma ordning som tipsen i listan
+    tips = np.array(TIPS, dtype=object)[rules]
+    templated = np.isin(rules, _TEMPLATED)
+    if templated.any():
+        ideal = _derive(shots)["ideal_launch"][rows]
+        for x in np.unique(ideal[templated]):   # högst tre ideala launch-värden
+            for r in _TEMPLATED:
+                m = templated & (ideal == x) & (rules == r)
+                tips[m] = TIPS[r].replace("{mål}", _fmt_ideal(x))
+    return pd.DataFrame({"slag": shots.index.to_numpy()[rows], "regel": rules, "tips": tips})
+
+def tips_per_shot(shots: pd.DataFrame, mode: str = "Enkel") -> pd.Series:
+    if shots.empty: return pd.Series([], index=shots.index, dtype=object)
+    long = feedback_table(shots.reset_index(drop=True), mode)
+    # raderna är redan sorterade per slag och varje slag har minst ett tips – dela upp i stället för groupby
+    pos = np.flatnonzero(np.diff(long["slag"].to_numpy())) + 1
+    return pd.Series([list(t) for t in np.split(long["tips"].to_numpy(), pos)], index=shots.index, dtype=object)
+
+def tip_frequencies(shots: pd.DataFrame, mode: str = "Enkel", by="datum") -> pd.DataFrame:
+    # hur ofta varje tips slår till per pass (by = kolumn/kolumner i shots), andel av passets slag
+    long = feedback_table(shots, mode)
+    keys = [by] if isinstance(by, str) else list(by)
+    long = long.join(shots[keys], on="slag")
+    freq = long.groupby(keys + ["regel", "tips"], sort=True, dropna=False).size().rename("antal").reset_index()
+    sizes = shots.groupby(keys, dropna=False).size().rename("slag")
+    freq = freq.join(sizes, on=keys)
+    freq["andel"] = freq["antal"] / freq["slag"]
+    return freq[keys + ["tips", "antal", "slag", "andel"]]
+
+def trackman_feedback(data: dict, club: str, mode: str, tips=TIPS):
+    # ett slag – samma regler som rule_masks, men utan DataFrame (anropas på varje rerun)
+    v = {f: float(data.get(f) or 0) for f in FIELDS}
+    bs = v["ball_speed"]
+    ideal = 12.0 if bs < 150 else 14.0 if bs < 165 else 15.5
+    v.update(launch_lo=ideal - 2, launch_hi=ideal + 3, abs_face_to_path=abs(v["face_to_path"]))
+    group = "Driver" if club == "Driver" else "Järn"
+    out = [tips[i] for i, (g, conds, _, rule_mode) in enumerate(RULES)
+           if g == group and rule_mode in (ALL_MODES, mode)
+           and all(_PY_OPS[op](v[metric], v[thr] if isinstance(thr, str) else float(thr)) for metric, op, thr in conds)]
+    if not out: out = [tips[len(RULES)]]
+    out += [tips[j] for j, (rule_mode, _) in enumerate(MODE_RULES, start=len(RULES) + 1) if mode == rule_mode]
+    return [t.replace("{mål}", _fmt_ideal(ideal)) for t in out]
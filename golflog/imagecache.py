@@ -0,0 +1,93 @@
+import hashlib, io, os, threading, time
+from collections import OrderedDict
+from functools import lru_cache
+from golflog.logstore import atomic_write_bytes
+from golflog.profiling import timed
+
+# -----------------------------
+# Nedskalade bildvarianter (WebP/JPEG) per visningsbredd
+# -----------------------------
+# Nyckel = (innehållshash, bredd, format). Minne: LRU med bytebudget; disk: data/cache/img/.
+CACHE_DIR = os.path.join("data", "cache", "img")
+MEMORY_BUDGET = 32 * 1024 * 1024   # byte
+STAT_TTL = 30.0                     # sekunder innan en fil stat:as igen
+QUALITY = 75
+
+_mem = OrderedDict()     # key -> bytes
+_mem_bytes = 0
+_hashes = {}             # abspath -> (checked_at, mtime_ns, size, sha1)
+_lock = threading.Lock()   # skyddar _mem och _hashes (förvärmningen körs i en egen tråd)
+
+@lru_cache(maxsize=1)
+def _webp_ok():
+    from PIL import features
+    return features.check("webp")
+
+def _content_hash(path):
+    key = os.path.abspath(path)
+    now = time.monotonic()
+    with _lock: hit = _hashes.get(key)
+    if hit is not None and now - hit[0] < STAT_TTL: return hit[3]
+    try: st = os.stat(path)
+    except FileNotFoundError:
+        with _lock: _hashes.pop(key, None)
+        return None
+    if hit is not None and (hit[1], hit[2]) == (st.st_mtime_ns, st.st_size):
+        with _lock: _hashes[key] = (now,) + hit[1:]
+        return hit[3]
+    h = hashlib.sha1()   # utan låset – en stor fil ska inte blockera andra bilder
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""): h.update(chunk)
+    digest = h.hexdigest()
+    with _lock: _hashes[key] = (now, st.st_mtime_ns, st.st_size, digest)
+    return digest
+
+def _remember(key, data):
+    global _mem_bytes
+    with _lock:
+        if key in _mem: return
+        _mem[key] = data
+        _mem_bytes += len(data)
+        while _mem_bytes > MEMORY_BUDGET and len(_mem) > 1:
+            _, old = _mem.popitem(last=False)
+            _mem_bytes -= len(old)
+
+def _render(path, width, fmt):
+    from PIL import Image   # Pillow laddas först när en variant måste skapas
+    with Image.open(path) as im:
+        im.draft("RGB", (width, width * 4))
+        if im.mode not in ("RGB", "RGBA"):
+            im = im.convert("RGBA" if im.mode in ("LA", "PA") or "transparency" in im.info else "RGB")
+        if im.width > width:
+            im = im.resize((width, max(1, round(im.height * width / im.width))), Image.LANCZOS)
+        buf = io.BytesIO()
+        if fmt == "WEBP":
+            im.save(buf, "WEBP", quality=QUALITY, method=4)
+        else:
+            im.convert("RGB").save(buf, "JPEG", quality=QUALITY, optimize=True, progressive=True)
+    return buf.getvalue()
+
+@timed()
+def cached_image(path, width: int):
+    # bytes för st.image, eller None om filen saknas
+    digest = _content_hash(path)
+    if digest is None: return None
+    fmt = "WEBP" if _webp_ok() else "JPEG"
+    key = (digest, width, fmt)
+    with _lock:
+        data = _mem.get(key)
+        if data is not None:
+            _mem.move_to_end(key)
+            return data
+    disk = os.path.join(CACHE_DIR, f"{digest}_{width}.{fmt.lower()}")
+    try:
+        with open(disk, "rb") as f: data = f.read()
+    except FileNotFoundError:
+        data = _render(path, width, fmt)
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        atomic_write_bytes(disk, data)   # unik temp-fil: förvärmning och vy kan skapa samma variant samtidigt
+    _remember(key, data)
+    return data
+
+def prewarm(path, widths):
+    for w in widths: cached_image(path, w)
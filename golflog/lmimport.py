@@ -0,0 +1,135 @@
+import csv, re
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# Bulkimport av launch monitor-export (TrackMan / GCQuad CSV)
+# -----------------------------
+# Filen läses i bitar om CHUNK_ROWS rader; bara de sju fälten + klubba behålls per bit.
+# Kolumnnamn matchas mot ALIASES efter normalisering ("Launch Angle [deg]" -> "launchangle").
+CHUNK_ROWS = 2000
+FIELDS = ["ball_speed", "launch", "spin", "height", "aoa", "face_to_path", "path"]
+ALIASES = {
+    "ball_speed":   ["ballspeed", "ballspd"],
+    "launch":       ["launchangle", "vla", "verticallaunch", "launch"],
+    "spin":         ["spinrate", "totalspin", "spin", "backspin"],
+    "height":       ["height", "maxheight", "peakheight", "apex"],
+    "aoa":          ["attackangle", "angleofattack", "aoa"],
+    "face_to_path": ["facetopath", "ftp"],
+    "path":         ["clubpath", "path"],
+    "club":         ["club", "clubname", "clubtype", "klubba"],
+}
+# samma gränser som fälten i Analyzer-formuläret
+RANGES = {"ball_speed": (0, 220), "launch": (0, 30), "spin": (0, 12000), "height": (0, 80),
+          "aoa": (-10, 10), "face_to_path": (-10, 10), "path": (-10, 10)}
+# enhet i rubrik eller enhetsrad -> faktor till mph / meter
+UNITS = {"ball_speed": {"m/s": 2.2369363, "km/h": 0.6213712, "kmh": 0.6213712},
+         "height": {"ft": 0.3048, "yds": 0.9144, "yd": 0.9144}}
+
+def _norm(h):
+    return re.sub(r"[^a-z0-9]", "", re.sub(r"[\[(].*?[\])]", "", str(h).lower()))
+
+def _unit(h):
+    m = re.search(r"[\[(]\s*([^\])]+?)\s*[\])]", str(h))
+    return m.group(1).lower() if m else None
+
+def map_columns(header):
+    # exportkolumn -> fält; första alias som finns vinner
+    normed = {_norm(h): h for h in header}
+    out = {}
+    for field, names in ALIASES.items():
+        for n in names:
+            if n in normed:
+                out[field] = normed[n]; break
+    return out
+
+def club_name(raw):
+    # "7 Iron", "7i", "PW", "3 Wood", "4H" … -> appens klubbnamn (None om okänd)
+    s = _norm(raw).replace("iron", "i").replace("jarn", "i").replace("wood", "w").replace("hybrid", "h")
+    if s in ("driver", "dr", "1w"): return "Driver"
+    if re.fullmatch(r"[4-9]i", s): return s
+    if s in ("pw", "pitchingwedge", "pitching"): return "PW (48deg)"
+    if s in ("gw", "aw", "gapwedge"): return "GW (52deg)"
+    if s in ("sw", "sandwedge"): return "SW (56deg)"
+    if s in ("lw", "lobwedge"): return "LW (60deg)"
+    m = re.fullmatch(r"(?:h([34])|([34])h)", s)
+    if m: return f"Hybrid {m.group(1) or m.group(2)}"
+    m = re.fullmatch(r"(?:w([35])|([35])w|tra([35]))", s)
+    if m: return f"Tra-{m.group(1) or m.group(2) or m.group(3)}"
+    return None
+
+def _sniff(upload):
+    head = upload.read(64 * 1024)
+    upload.seek(0)
+    if isinstance(head, str): head = head.encode("utf-8")
+    try: text, encoding = head.decode("utf-8-sig"), "utf-8-sig"
+    except UnicodeDecodeError: text, encoding = head.decode("latin-1"), "latin-1"
+    first = text.splitlines()[0] if text else ""
+    try: sep = csv.Sniffer().sniff(first, delimiters=",;\t").delimiter
+    except csv.Error: sep = ","
+    return sep, encoding
+
+def read_export(upload, default_club, clubs=None, chunk_rows=CHUNK_ROWS):
+    # upload: filobjekt (Streamlit UploadedFile). Returnerar (giltiga slag, avvisade per orsak).
+    upload.seek(0)
+    sep, encoding = _sniff(upload)
+    reader = pd.read_csv(upload, sep=sep, encoding=encoding, dtype=str, chunksize=chunk_rows, skipinitialspace=True)
+    cols, factors, parts = None, {}, []
+    rejected = {"saknar launch": 0, "utanför intervall": 0, "okänd klubba": 0}
+    clubs = set(clubs) if clubs else None
+    for chunk in reader:
+        if cols is None:
+            cols = map_columns(chunk.columns)
+            if "launch" not in cols:
+                raise ValueError("Hittar ingen launch-kolumn i filen (t.ex. 'Launch Angle').")
+            units = {f: _unit(cols[f]) for f in cols}
+            # TrackMan lägger ibland enheterna på en egen rad under rubriken: [mph], [deg] …
+            if len(chunk) and str(chunk[cols["launch"]].iloc[0]).strip().startswith("["):
+                units.update({f: _unit(chunk[c].iloc[0]) or units[f] for f, c in cols.items()})
+                chunk = chunk.iloc[1:]
+            factors = {f: UNITS[f].get(units.get(f), 1.0) for f in UNITS if f in cols}
+        part = pd.DataFrame(index=chunk.index)
+        for f in FIELDS:
+            if f in cols:
+                v = chunk[cols[f]].str.replace(",", ".", regex=False)   # decimalkomma i svenska exporter
+                part[f] = pd.to_numeric(v, errors="coerce") * factors.get(f, 1.0)
+            else:
+                part[f] = np.nan
+        if "club" in cols:
+            # tom klubbcell -> standardklubban; okänt namn (t.ex. Putter) avvisas
+            raw = chunk[cols["club"]].str.strip().replace("", np.nan)
+            names = {r: club_name(r) for r in raw.dropna().unique()}
+            if clubs: names = {r: c if c in clubs else None for r, c in names.items()}
+            part["klubba"] = raw.map(names).where(raw.notna(), default_club)
+        else:
+            part["klubba"] = default_club
+        # vektoriserad validering: launch krävs (som i formuläret), övriga fält får saknas
+        has_launch = part["launch"].gt(0)
+        in_range = pd.Series(True, index=part.index)
+        for f, (lo, hi) in RANGES.items():
+            in_range &= part[f].isna() | part[f].between(lo, hi)
+        known = part["klubba"].notna()
+        rejected["okänd klubba"] += int((~known).sum())
+        rejected["saknar launch"] += int((known & ~has_launch).sum())
+        rejected["utanför intervall"] += int((known & has_launch & ~in_range).sum())
+        parts.append(part[known & has_launch & in_range])
+    shots = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=FIELDS + ["klubba"])
+    return shots, rejected
+
+def to_log_rows(shots: pd.DataFrame, datum: str, img: str = ""):
+    # samma radformat som enstaka analyser: LM-rad med launch som värde, spinn/bollfart i anteckningen
+    spin = shots["spin"].fillna(0).astype(int).astype(str)
+    bs = shots["ball_speed"].fillna(0).round(1).astype(str)
+    rows = pd.DataFrame({"datum": datum, "pass": "Range", "kategori": "LM",
+                         "moment": shots["klubba"] + " launch/spin", "klubba": shots["klubba"],
+                         "värde": shots["launch"].round(1),
+                         "anteckning": "spin " + spin + " rpm; bs " + bs + " mph; img " + img})
+    return rows.to_dict("records")
+
+def club_summary(shots: pd.DataFrame) -> pd.DataFrame:
+    # median per klubba – underlag för samlad feedback
+    if shots.empty: return pd.DataFrame(columns=["klubba", "slag"] + FIELDS)
+    g = shots.groupby("klubba", sort=False)
+    out = g[FIELDS].median()
+    out.insert(0, "slag", g.size())
+    return out.reset_index().sort_values("slag", ascending=False, ignore_index=True)
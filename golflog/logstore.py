@@ -0,0 +1,310 @@
+import atexit, csv, io, json, os, threading, time
+from collections import OrderedDict
+from contextlib import contextmanager
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:   # t.ex. Windows – låsen blir no-op, O_APPEND och atomisk rename gäller fortfarande
+    fcntl = None
+
+# -----------------------------
+# Advisory fillås (<fil>.lock) mellan processer
+# -----------------------------
+# Tillägg tar ett delat lås (blockerar inte varandra), helomskrivningar ett exklusivt.
+def _flock(fd, mode):
+    if fcntl is not None: fcntl.flock(fd, mode)
+
+LOCK_SH = fcntl.LOCK_SH if fcntl else 1
+LOCK_EX = fcntl.LOCK_EX if fcntl else 2
+LOCK_UN = fcntl.LOCK_UN if fcntl else 8
+LOCK_NB = fcntl.LOCK_NB if fcntl else 4
+
+def _lock_fd(path):
+    return os.open(path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+
+@contextmanager
+def file_lock(path, exclusive=True, blocking=True):
+    # yield True om låset togs; med blocking=False yield False om någon annan håller det
+    fd = _lock_fd(path)
+    try:
+        try: _flock(fd, (LOCK_EX if exclusive else LOCK_SH) | (0 if blocking else LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        yield True
+    finally:
+        os.close(fd)   # släpper låset
+
+def _tmp_name(path):
+    # unikt per process och tråd – samtidiga skrivare krockar aldrig på temp-filen
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+def atomic_write_csv(df: pd.DataFrame, path):
+    # temp + fsync + rename: läsare ser antingen gamla eller nya filen, aldrig en halv
+    tmp = _tmp_name(path)
+    df.to_csv(tmp, index=False, encoding="utf-8")
+    with open(tmp, "rb") as f: os.fsync(f.fileno())
+    os.replace(tmp, path)
+    invalidate_cache(path)
+
+def atomic_write_bytes(path, data: bytes):
+    tmp = _tmp_name(path)
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data); f.flush(); os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp): os.remove(tmp)
+
+def atomic_write_json(path, obj):
+    atomic_write_bytes(path, json.dumps(obj, ensure_ascii=False).encode("utf-8"))
+
+def file_stamp(path):
+    # (inode, mtime, storlek) – ändras vid varje atomisk omskrivning; None om filen saknas
+    try: st = os.stat(path)
+    except FileNotFoundError: return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+def _write_all(fd, data: bytes):
+    view = memoryview(data)
+    while view:
+        n = os.write(fd, view)
+        view = view[n:]
+
+# -----------------------------
+# Append-only CSV writer
+# -----------------------------
+FSYNC_EVERY = 25       # fsync efter så här många rader ...
+FSYNC_INTERVAL = 2.0   # ... eller så här många sekunder, det som kommer först
+
+def _csv_line(values) -> bytes:
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator=os.linesep).writerow(["" if v is None else v for v in values])
+    return buf.getvalue().encode("utf-8")
+
+class CsvAppender:
+    # En rad per händelse med O_APPEND; headern skrivs/kontrolleras bara när filen öppnas.
+    # Om filen bytts ut (atomisk omskrivning i en annan process) öppnas den nya automatiskt.
+    def __init__(self, path, columns):
+        self.path = path
+        self.columns = list(columns)
+        self.header = list(columns)
+        self._fd = None
+        self._lockfd = None
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _stale(self):
+        try: return os.stat(self.path).st_ino != os.fstat(self._fd).st_ino
+        except FileNotFoundError: return True
+
+    def _open(self):
+        # anropas med exklusivt lås: bara en process skriver headern i en ny fil
+        if self._fd is not None:
+            os.close(self._fd); self._fd = None
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        size = os.fstat(fd).st_size
+        if size == 0:
+            os.write(fd, _csv_line(self.columns))
+            self.header = list(self.columns)
+        else:
+            os.close(fd)
+            self.header = self._check_header()
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+        self._fd = fd
+
+    def _check_header(self):
+        with open(self.path, "r", encoding="utf-8", newline="") as f:
+            header = next(csv.reader(f), [])
+        if header and all(c in header for c in self.columns):
+            with open(self.path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                last = f.read(1)
+            if last not in (b"\n", b"\r"):
+                with open(self.path, "ab") as f:
+                    f.write(os.linesep.encode("utf-8"))
+            return header
+        # äldre fil utan alla kolumner: skriv om en gång, precis som read_log fyller på
+        try: df = pd.read_csv(self.path, encoding="utf-8")
+        except pd.errors.EmptyDataError: df = pd.DataFrame(columns=self.columns)
+        for c in self.columns:
+            if c not in df.columns: df[c] = ""
+        atomic_write_csv(df, self.path)
+        return list(df.columns)
+
+    def _encode(self, row: dict) -> bytes:
+        return _csv_line([row.get(c, "") for c in self.header])
+
+    def append(self, row: dict):
+        self.append_many([row])
+
+    def append_many(self, rows):
+        with self._lock:
+            if self._lockfd is None: self._lockfd = _lock_fd(self.path)
+            _flock(self._lockfd, LOCK_SH)
+            try:
+                if self._fd is None or self._stale():
+                    _flock(self._lockfd, LOCK_EX)
+                    self._open()
+                    _flock(self._lockfd, LOCK_SH)
+                data = b"".join(self._encode(r) for r in rows)
+                if not data: return
+                _write_all(self._fd, data)
+            finally:
+                _flock(self._lockfd, LOCK_UN)
+            self._unsynced += len(rows)
+            if self._unsynced >= FSYNC_EVERY or time.monotonic() - self._last_sync >= FSYNC_INTERVAL:
+                self._sync()
+
+    def _sync(self):
+        if self._fd is not None and self._unsynced:
+            os.fsync(self._fd)
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            if self._lockfd is not None:
+                os.close(self._lockfd); self._lockfd = None
+            if self._fd is None: return
+            self._sync()
+            os.close(self._fd)
+            self._fd = None
+
+_appenders = {}
+_appenders_lock = threading.Lock()
+
+def appender_for(path, columns) -> CsvAppender:
+    key = os.path.abspath(path)
+    with _appenders_lock:
+        a = _appenders.get(key)
+        if a is None:
+            a = _appenders[key] = CsvAppender(path, columns)
+        return a
+
+def close_appender(path):
+    # anropas före helomskrivning så att inget ligger kvar osynkat på gamla filen
+    with _appenders_lock:
+        a = _appenders.pop(os.path.abspath(path), None)
+    if a is not None: a.close()
+    invalidate_cache(path)
+
+@atexit.register
+def _close_all():
+    with _appenders_lock:
+        items = list(_appenders.values()); _appenders.clear()
+    for a in items: a.close()
+
+# -----------------------------
+# Process-wide read cache (mtime + size)
+# -----------------------------
+MAX_CACHED_LOGS = 32   # antal loggfiler som hålls parsade (LRU)
+_GUARD = 64            # byte före offset som måste vara oförändrade för inkrementell läsning
+
+class _CachedLog:
+    __slots__ = ("df", "ino", "mtime_ns", "size", "offset", "guard", "header")
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def _with_columns(df, columns):
+    for c in columns:
+        if c not in df.columns: df[c] = ""
+    return df
+
+def _parse(data: bytes, header=None, dtype=None):
+    if header is None: return pd.read_csv(io.BytesIO(data), encoding="utf-8", dtype=dtype)
+    return pd.read_csv(io.BytesIO(data), header=None, names=header, encoding="utf-8", dtype=dtype)
+
+def _full_read(path, st, columns, convert=None, dtype=None):
+    with open(path, "rb") as f: data = f.read()
+    cut = data.rfind(b"\n") + 1   # en halvskriven sista rad tas med nästa gång
+    ent = _CachedLog()
+    ent.df = _with_columns(_parse(data[:cut], dtype=dtype) if cut else pd.DataFrame(columns=columns), columns)
+    if convert: ent.df = convert(ent.df)
+    ent.header = list(ent.df.columns)
+    ent.ino, ent.mtime_ns, ent.size = st.st_ino, st.st_mtime_ns, st.st_size
+    ent.offset = cut
+    ent.guard = data[max(0, cut - _GUARD):cut]
+    return ent
+
+def _tail_read(path, st, ent, convert=None, dtype=None):
+    with open(path, "rb") as f:
+        start = max(0, ent.offset - len(ent.guard))
+        f.seek(start)
+        data = f.read()
+    if data[:ent.offset - start] != ent.guard: return None   # filen har skrivits om
+    tail = data[ent.offset - start:]
+    cut = tail.rfind(b"\n") + 1
+    new = _CachedLog()
+    new.header = ent.header
+    new.df = ent.df
+    if cut:
+        rows = _parse(tail[:cut], ent.header, dtype)
+        if convert: rows = convert(rows)
+        new.df = rows if ent.df.empty else pd.concat([ent.df, rows], ignore_index=True)
+        if convert: new.df = convert(new.df)   # nya kategorier i svansen: koda om en gång
+    new.ino, new.mtime_ns, new.size = st.st_ino, st.st_mtime_ns, st.st_size
+    new.offset = ent.offset + cut
+    new.guard = data[max(0, new.offset - _GUARD) - start:new.offset - start]
+    return new
+
+def read_csv_cached(path, columns, convert=None, dtype=None) -> pd.DataFrame:
+    # Samma DataFrame delas av alla sessioner i processen – behandla den som read-only.
+    # dtype går till read_csv; convert(df) körs en gång per inläst del (t.ex. codes.encode), inte per anrop.
+    key = os.path.abspath(path)
+    st = os.stat(path)
+    with _cache_lock:
+        ent = _cache.get(key)
+        if ent is not None: _cache.move_to_end(key)
+    if ent is not None and (ent.ino, ent.mtime_ns, ent.size) == (st.st_ino, st.st_mtime_ns, st.st_size):
+        return ent.df
+    fresh = None
+    if ent is not None and ent.ino == st.st_ino and st.st_size >= ent.size:
+        fresh = _tail_read(path, st, ent, convert, dtype)
+    if fresh is None:
+        fresh = _full_read(path, st, columns, convert, dtype)
+    with _cache_lock:
+        _cache[key] = fresh
+        _cache.move_to_end(key)
+        while len(_cache) > MAX_CACHED_LOGS: _cache.popitem(last=False)
+    return fresh.df
+
+# -----------------------------
+# Strömmande läsning (export) – aldrig hela filen i minnet
+# -----------------------------
+class _Prefix(io.RawIOBase):
+    # de första `size` byten av en öppen fil
+    def __init__(self, f, size): self.f, self.left = f, size
+    def readable(self): return True
+    def readinto(self, b):
+        n = self.f.readinto(memoryview(b)[:min(len(b), self.left)]) if self.left else 0
+        self.left -= n
+        return n
+
+def _complete_rows(f, size):
+    # slutet på sista hela raden inom de första size byten
+    pos = size
+    while pos > 0:
+        start = max(0, pos - (1 << 16))
+        f.seek(start)
+        i = f.read(pos - start).rfind(b"\n")
+        if i >= 0: return start + i + 1
+        pos = start
+    return 0
+
+def iter_csv_chunks(path, columns, rows, dtype=None):
+    # DataFrame-bitar om högst `rows` rader. Bara rader som var hela när läsningen började –
+    # senare tillägg (O_APPEND) och en halvskriven sista rad kommer inte med.
+    with open(path, "rb") as f:
+        end = _complete_rows(f, os.fstat(f.fileno()).st_size)
+        if not end: return
+        f.seek(0)
+        with pd.read_csv(io.BufferedReader(_Prefix(f, end)), encoding="utf-8", dtype=dtype, chunksize=rows) as reader:
+            for chunk in reader: yield _with_columns(chunk, columns)
+
+def invalidate_cache(path):
+    with _cache_lock:
+        _cache.pop(os.path.abspath(path), None)
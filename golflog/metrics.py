@@ -0,0 +1,142 @@
+import math, threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from golflog.profiling import timed
+
+# -----------------------------
+# Metrics engine: ett groupby över hela loggen -> tidy tabell
+# -----------------------------
+KEYS = ["pass", "kategori", "moment", "klubba"]
+METRIC_COLUMNS = KEYS + ["värde"]   # kolumnprojektion för backends som stöder det
+AGG_COLUMNS = KEYS + ["n", "count", "mean", "m2"]   # n = rader, count/mean/m2 = numeriska värden (Welford-form)
+TABLE_COLUMNS = ["klubba", "metric", "value", "n"]
+ALL = "Alla"   # klubba-värde för nyckeltal över alla klubbor
+
+# (metric, pass, kategori, moment) – andel av raderna i pass+kategori som har moment
+RATES = [
+    ("center", "Range", "Träffbild", "Mitt i"),
+    ("toe", "Range", "Träffbild", "Tåträff"),
+    ("heel", "Range", "Träffbild", "Hälträff"),
+    ("thin", "Range", "Kontakt", "Topp"),
+    ("fat", "Range", "Kontakt", "Duff"),
+    ("flush", "Range", "Kontakt", "Flush"),
+    ("slice", "Range", "Driver", "Slice"),
+    ("hook", "Range", "Driver", "Hook"),
+    ("chip_within2", "Närspel", "Chippar", "Inom 2m"),
+]
+CARRY = ("Range", "Längdkontroll", "Carry")
+MIN_CARRY_SHOTS = 3
+
+def aggregate(df: pd.DataFrame) -> pd.DataFrame:
+    if df.empty: return pd.DataFrame(columns=AGG_COLUMNS)
+    v = df["värde"]
+    if not pd.api.types.is_float_dtype(v): v = pd.to_numeric(v, errors="coerce")
+    frame = pd.DataFrame({k: df[k] if isinstance(df[k].dtype, pd.CategoricalDtype) else df[k].astype("category") for k in KEYS})
+    frame["v"] = v.to_numpy()
+    g = frame.groupby(KEYS, observed=True, dropna=False, sort=False)["v"]
+    agg = g.agg(["size", "count", "mean", "var"]).reset_index()
+    agg = agg.rename(columns={"size": "n"})
+    agg["m2"] = (agg["var"] * (agg["count"] - 1)).fillna(0.0)
+    for k in KEYS: agg[k] = agg[k].astype(object)
+    return agg[AGG_COLUMNS]
+
+def _rate_rows(agg, metric, pass_, kategori, moment):
+    sub = agg[agg["kategori"] == kategori]
+    if pass_ is not None: sub = sub[sub["pass"] == pass_]
+    if sub.empty: return []
+    klubba = sub["klubba"].fillna(ALL + "?")   # NaN-klubba räknas bara i ALL-raden
+    tot = sub["n"].groupby(klubba).sum()
+    hit = sub["n"].where(sub["moment"] == moment, 0).groupby(klubba).sum()
+    club = pd.DataFrame({"klubba": tot.index, "metric": metric, "value": (hit / tot).to_numpy(), "n": tot.to_numpy()})
+    club = club[club["klubba"] != ALL + "?"]
+    total = pd.DataFrame({"klubba": [ALL], "metric": [metric], "value": [hit.sum() / tot.sum()], "n": [tot.sum()]})
+    return [club, total]
+
+def table_from_aggregate(agg: pd.DataFrame) -> pd.DataFrame:
+    parts = []
+    if not agg.empty:
+        for metric, p, kat, mom in RATES:
+            parts += _rate_rows(agg, metric, p, kat, mom)
+        lc = agg[(agg["pass"] == CARRY[0]) & (agg["kategori"] == CARRY[1]) & (agg["moment"] == CARRY[2])]
+        if not lc.empty:
+            cnt = lc["count"].astype(float)
+            std = np.sqrt(lc["m2"] / (cnt - 1)).where(cnt >= 2)
+            parts.append(pd.DataFrame({"klubba": lc["klubba"].to_numpy(), "metric": "carry_std",
+                                       "value": std.to_numpy(), "n": lc["count"].to_numpy()}))
+        pt = agg[agg["kategori"] == "Puttning"]
+        if not pt.empty:
+            makes = pt.loc[pt["moment"] == "Kortputt i hål", "n"].sum()
+            parts.append(pd.DataFrame({"klubba": [ALL], "metric": ["short_putt_make"],
+                                       "value": [1.0 if makes > 0 else np.nan], "n": [pt["n"].sum()]}))
+    if not parts: return pd.DataFrame(columns=TABLE_COLUMNS)
+    table = pd.concat(parts, ignore_index=True)
+    table["n"] = table["n"].astype(int)
+    return table[TABLE_COLUMNS]
+
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+
+@timed()
+def metrics_table(source) -> pd.DataFrame:
+    # source är en DataFrame eller en storage-backend. Backends med aggregate() (sqlite) räknar i
+    # databasen; övriga läser METRIC_COLUMNS. read_log delar samma DataFrame mellan reruns, så
+    # identitet (plus backendens version) räcker som nyckel.
+    if isinstance(source, pd.DataFrame): key, stamp = id(source), len(source)
+    elif hasattr(source, "aggregate"): key, stamp = id(source), source.version()
+    else: return metrics_table(source.read(METRIC_COLUMNS))
+    with _memo_lock:
+        hit = _memo.get(key)
+        if hit is not None and hit[0] is source and hit[1] == stamp:
+            return hit[2]
+    agg = aggregate(source) if isinstance(source, pd.DataFrame) else source.aggregate()
+    table = table_from_aggregate(agg)
+    with _memo_lock:
+        _memo[key] = (source, stamp, table)
+        while len(_memo) > 8: _memo.popitem(last=False)
+    return table
+
+def _lookup(table: pd.DataFrame):
+    return {(k, m): (v, n) for k, m, v, n in table[TABLE_COLUMNS].itertuples(index=False, name=None)}
+
+def _value(lk, klubba, metric):
+    v = lk.get((klubba, metric))
+    if v is None or v[0] is None or (isinstance(v[0], float) and math.isnan(v[0])): return None
+    return float(v[0])
+
+def _carry_std(lk, klubba):
+    v = lk.get((klubba, "carry_std"))
+    if v is None or v[1] < MIN_CARRY_SHOTS: return None
+    return float(v[0])
+
+def global_metrics(table: pd.DataFrame) -> dict:
+    lk = _lookup(table)
+    return {"clean_rate": _value(lk, ALL, "center"),
+            "driver_slice_rate": _value(lk, ALL, "slice"),
+            "driver_hook_rate": _value(lk, ALL, "hook"),
+            "carry_std_7i": _carry_std(lk, "7i"),
+            "carry_std_driver": _carry_std(lk, "Driver"),
+            "short_putt_make": _value(lk, ALL, "short_putt_make"),
+            "chip_within2_rate": _value(lk, ALL, "chip_within2")}
+
+def _club(lk, klubba):
+    m = {k: _value(lk, klubba, k) for k in ["center", "toe", "heel", "thin", "fat", "flush"]}
+    m["carry_std"] = _carry_std(lk, klubba)
+    # slice/hook loggas som egen kategori och gäller driver oavsett klubba-kolumnen
+    m["slice"] = _value(lk, ALL, "slice") if klubba == "Driver" else None
+    m["hook"] = _value(lk, ALL, "hook") if klubba == "Driver" else None
+    return m
+
+def club_metrics(table: pd.DataFrame, klubba: str) -> dict:
+    return _club(_lookup(table), klubba)
+
+def bag_metrics(table: pd.DataFrame, clubs) -> dict:
+    # club_metrics för alla klubbor med en enda uppslagstabell
+    lk = _lookup(table)
+    return {k: _club(lk, k) for k in clubs}
+
+def club_overview(table: pd.DataFrame) -> pd.DataFrame:
+    # bred tabell klubba × nyckeltal för Benchmark-vyn
+    t = table[table["klubba"] != ALL]
+    if t.empty: return pd.DataFrame()
+    return t.pivot_table(index="klubba", columns="metric", values="value", aggfunc="first")
@@ -0,0 +1,186 @@
+import atexit, glob, json, math, os, threading, time
+from contextlib import ExitStack
+import pandas as pd
+from golflog.logstore import file_lock
+
+# -----------------------------
+# Buffrat pass-läge: slag samlas i minnet och skrivs i batchar
+# -----------------------------
+# Varje slag skrivs först som en rad i en journal (data/journal/<session>.jsonl) och hamnar i
+# lagringen när bufferten når FLUSH_EVERY slag, är FLUSH_SECONDS gammal eller passet avslutas.
+# Journalen fsyncas inte: den klarar att processen dör, inte strömavbrott.
+# En levande buffert håller <journal>.lock; uppspelningen hoppar över låsta journaler, så en annan
+# process aldrig spelar upp ett pass som pågår. Före varje batch skrivs {"flushing": seq, "at": n}
+# (n = loggens radantal när batchen läggs till, under shardens lås) och efter {"flushed": seq}.
+# Dör processen mellan de två jämför uppspelningen loggens rader n.. med batchen och hoppar över
+# den om den redan står där – ingen dubblett.
+FLUSH_EVERY = 20
+FLUSH_SECONDS = 30.0
+RING_SIZE = 200   # fler obuffrade slag än så -> tvingad flush
+
+class PassBuffer:
+    def __init__(self, journal_path, sink, flush_every=FLUSH_EVERY, flush_seconds=FLUSH_SECONDS):
+        self.journal_path = journal_path
+        self.sink = sink   # sink(rows, mark) skriver en batch; mark(n) anropas med loggens radantal före tillägget
+        self.flush_every = flush_every
+        self.flush_seconds = flush_seconds
+        self.rows = []
+        self.seq = 0
+        self.oldest = None
+        self.written = 0
+        self._journal = None
+        self._held = ExitStack()   # journalens fillås medan bufferten lever
+        self._lock = threading.RLock()
+        _register(self)
+
+    @property
+    def pending(self): return len(self.rows)
+
+    def add(self, row: dict):
+        with self._lock:
+            if self._journal is None:
+                os.makedirs(os.path.dirname(self.journal_path), exist_ok=True)
+                self._held.enter_context(file_lock(self.journal_path))
+                self._journal = open(self.journal_path, "a", encoding="utf-8")
+            self.seq += 1
+            self._journal.write(json.dumps({"seq": self.seq, "row": row}, ensure_ascii=False, default=str) + "\n")
+            self._journal.flush()
+            self.rows.append(row)
+            if self.oldest is None: self.oldest = time.monotonic()
+            if len(self.rows) >= min(self.flush_every, RING_SIZE): self.flush()
+
+    def _mark(self, at):
+        self._journal.write(json.dumps({"flushing": self.seq, "at": at}) + "\n")
+        self._journal.flush()
+
+    def due(self) -> bool:
+        return bool(self.rows) and time.monotonic() - self.oldest >= self.flush_seconds
+
+    def flush(self):
+        with self._lock:
+            if not self.rows: return 0
+            rows, self.rows, self.oldest = self.rows, [], None
+            try:
+                self.sink(rows, self._mark)
+            except Exception:
+                self.rows = rows + self.rows   # behåll i bufferten (och journalen) till nästa försök
+                if self.oldest is None: self.oldest = time.monotonic()
+                raise
+            self._journal.write(json.dumps({"flushed": self.seq}) + "\n")
+            self._journal.flush()
+            self._journal.truncate(0)
+            self.written += len(rows)
+            return len(rows)
+
+    def close(self):
+        with self._lock:
+            n = self.flush()
+            if self._journal is not None:
+                self._journal.close(); self._journal = None
+                for p in (self.journal_path, self.journal_path + ".lock"):
+                    try: os.remove(p)
+                    except FileNotFoundError: pass
+                self._held.close()
+            _unregister(self)
+            return n
+
+_SAME = ("pass", "kategori", "moment", "klubba")
+
+def _value(v):
+    try: v = float(v)
+    except (TypeError, ValueError): return None
+    return None if math.isnan(v) else round(v, 6)
+
+def _text(v):
+    # tom klubba kommer tillbaka från CSV som NaN – None, NaN och "" är samma sak
+    if v is None or v is pd.NA or (isinstance(v, float) and math.isnan(v)): return ""
+    return str(v)
+
+def _written(log, at, rows) -> bool:
+    # står batchen redan i loggen på rad at.. (flush som dog före {"flushed"})?
+    df = log.read()
+    if at < 0 or len(df) < at + len(rows): return False
+    part = df.iloc[at:at + len(rows)]
+    for c in _SAME:
+        if [_text(x) for x in part[c].astype(object)] != [_text(r.get(c)) for r in rows]: return False
+    return [_value(x) for x in part["värde"]] == [_value(r.get("värde")) for r in rows]
+
+def replay_journal(path, sink, log=None) -> int:
+    # spelar upp ej skrivna slag; med log hoppas en batch som redan hann skrivas över
+    entries, flushed, marker = [], 0, None
+    try: f = open(path, "r", encoding="utf-8")
+    except FileNotFoundError: return 0   # en annan process hann före
+    with f:
+        for line in f:
+            try: e = json.loads(line)
+            except ValueError: continue   # halvskriven sista rad vid krasch
+            if "flushed" in e: flushed = max(flushed, e["flushed"])
+            elif "flushing" in e: marker = e
+            else: entries.append(e)
+    entries = [e for e in entries if e["seq"] > flushed]
+    if marker is not None and log is not None and marker["flushing"] > flushed:
+        batch = [e["row"] for e in entries if e["seq"] <= marker["flushing"]]
+        if batch and _written(log, marker["at"], batch):
+            entries = [e for e in entries if e["seq"] > marker["flushing"]]
+    rows = [e["row"] for e in entries]
+    if rows:
+        with open(path, "a", encoding="utf-8") as j:
+            def mark(at):
+                j.write(json.dumps({"flushing": entries[-1]["seq"], "at": at}) + "\n"); j.flush()
+            sink(rows, mark)
+    os.remove(path)
+    return len(rows)
+
+_replayed = set()
+_replay_lock = threading.Lock()
+
+def replay_journals_once(journal_dir, sink, log=None) -> int:
+    # körs en gång per process och katalog; journaler som någon buffert (i valfri process) håller låst hoppas över
+    key = os.path.abspath(journal_dir)
+    with _replay_lock:
+        if key in _replayed: return 0
+        _replayed.add(key)
+        with _buffers_lock: live = {os.path.abspath(b.journal_path) for b in _buffers}
+        n = 0
+        for p in glob.glob(os.path.join(journal_dir, "*.jsonl")):
+            if os.path.abspath(p) in live: continue
+            with file_lock(p, blocking=False) as free:
+                if not free: continue
+                n += replay_journal(p, sink, log)
+                try: os.remove(p + ".lock")
+                except FileNotFoundError: pass
+        return n
+
+# -----------------------------
+# Bakgrundstråd för tidsbaserad flush (Streamlit kör bara vid interaktion)
+# -----------------------------
+_buffers = set()
+_buffers_lock = threading.Lock()
+_flusher = None
+
+def _register(buf):
+    global _flusher
+    with _buffers_lock:
+        _buffers.add(buf)
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_loop, name="pass-flusher", daemon=True)
+            _flusher.start()
+
+def _unregister(buf):
+    with _buffers_lock: _buffers.discard(buf)
+
+def _flush_loop():
+    while True:
+        time.sleep(1.0)
+        with _buffers_lock: bufs = list(_buffers)
+        for b in bufs:
+            if b.due():
+                try: b.flush()
+                except Exception: pass   # ligger kvar i journalen och försöks igen
+
+@atexit.register
+def _flush_all():
+    with _buffers_lock: bufs = list(_buffers)
+    for b in bufs:
+        try: b.flush()
+        except Exception: pass
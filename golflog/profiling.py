@@ -0,0 +1,167 @@
+import argparse, cProfile, functools, io, os, pstats, sys, threading, time
+from collections import deque
+import pandas as pd
+
+# -----------------------------
+# Tidsmätning per rerun (Diagnostik-vyn)
+# -----------------------------
+# Streamlit kör om hela skriptet vid varje klick. begin_rerun()/end_rerun() ramar in en körning,
+# phase() delar den i steg på toppnivå (data, sidomeny, vy …) och span()/@timed mäter hjälpfunktioner
+# inuti. Utan pågående rerun (CLI, bench) kostar en span bara en attributläsning.
+# GOLF_PROFILE=1 kör cProfile på varje rerun och sparar .prof + topplista i data/profiles/.
+MAX_RERUNS = 500
+PROFILE_DIR = os.path.join("data", "profiles")
+PROFILE_TOP = 40   # rader i textsammanfattningen
+
+_local = threading.local()
+_done = deque(maxlen=MAX_RERUNS)
+_done_lock = threading.Lock()
+_profilers = {}   # tråd-id -> cProfile.Profile som är igång (för reruns som aldrig nådde end_rerun)
+_profilers_lock = threading.Lock()
+
+class _Run:
+    __slots__ = ("label", "ts", "t0", "spans", "stack", "phase", "profiler")
+
+def _stop_stale_profilers():
+    # en körning som avbröts av st.rerun()/st.stop()/ett undantag når aldrig end_rerun, och dess
+    # profilerare är fortfarande igång – i den här tråden eller i en tråd som redan har avslutats
+    # (från 3.12 delar alla trådar sys.monitoring, så en kvarglömd profilerare stoppar alla andra)
+    me = threading.get_ident()
+    alive = {t.ident for t in threading.enumerate()}
+    with _profilers_lock:
+        stale = [i for i in _profilers if i == me or i not in alive]
+        profilers = [_profilers.pop(i) for i in stale]
+    for p in profilers: p.disable()
+
+def begin_rerun(label="", profile=None):
+    # en ofullbordad körning (st.stop/st.rerun) kastas – den säger inget om en hel rerun
+    _stop_stale_profilers()
+    run = _Run()
+    run.label, run.ts, run.t0 = label, time.time(), time.perf_counter()
+    run.spans, run.stack, run.phase = [], [], None
+    run.profiler = None
+    if profile if profile is not None else os.environ.get("GOLF_PROFILE") == "1":
+        p = cProfile.Profile()
+        try:
+            p.enable()
+        except ValueError:   # 3.12+: en annan session profileras just nu – den här reruns körs utan profil
+            p = None
+        if p is not None:
+            run.profiler = p
+            with _profilers_lock: _profilers[threading.get_ident()] = p
+    _local.run = run
+
+def _close_phase(run, now):
+    if run.phase is not None:
+        name, t0 = run.phase
+        run.spans.append((name, 0, 1e3 * (t0 - run.t0), 1e3 * (now - t0)))
+        run.phase = None
+
+def phase(name):
+    # nytt steg på toppnivå; föregående steg avslutas
+    run = getattr(_local, "run", None)
+    if run is None: return
+    now = time.perf_counter()
+    _close_phase(run, now)
+    run.phase = (name, now)
+
+def set_label(label):
+    run = getattr(_local, "run", None)
+    if run is not None: run.label = label
+
+class span:
+    # with span("namn"): ...  – nästlas under aktuellt steg
+    __slots__ = ("name", "run", "t0")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.run = getattr(_local, "run", None)
+        if self.run is not None:
+            self.run.stack.append(self.name)
+            self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        run = self.run
+        if run is not None and getattr(_local, "run", None) is run:
+            ms = 1e3 * (time.perf_counter() - self.t0)
+            run.stack.pop()
+            run.spans.append((self.name, len(run.stack) + (run.phase is not None), 1e3 * (self.t0 - run.t0), ms))
+        return False
+
+def timed(name=None):
+    def wrap(fn):
+        label = name or fn.__name__
+        @functools.wraps(fn)
+        def inner(*a, **kw):
+            if getattr(_local, "run", None) is None: return fn(*a, **kw)
+            with span(label): return fn(*a, **kw)
+        return inner
+    return wrap
+
+def end_rerun(profile_dir=PROFILE_DIR):
+    run = getattr(_local, "run", None)
+    if run is None: return None
+    _local.run = None
+    now = time.perf_counter()
+    _close_phase(run, now)
+    rec = {"ts": run.ts, "label": run.label, "total_ms": 1e3 * (now - run.t0), "spans": run.spans, "profile": None}
+    if run.profiler is not None:
+        run.profiler.disable()
+        with _profilers_lock: _profilers.pop(threading.get_ident(), None)
+        rec["profile"] = dump_profile(run.profiler, profile_dir, run.ts)
+    with _done_lock: _done.append(rec)
+    return rec
+
+def dump_profile(profiler, profile_dir=PROFILE_DIR, ts=None):
+    # .prof öppnas med snakeviz/flameprof (flamegraph) eller pstats; .txt är en snabb topplista
+    os.makedirs(profile_dir, exist_ok=True)
+    base = os.path.join(profile_dir, time.strftime("rerun-%Y%m%d-%H%M%S", time.localtime(ts)) + f"-{threading.get_ident() % 10000:04d}")
+    profiler.dump_stats(base + ".prof")
+    buf = io.StringIO()
+    pstats.Stats(profiler, stream=buf).sort_stats("cumulative").print_stats(PROFILE_TOP)
+    with open(base + ".txt", "w", encoding="utf-8") as f: f.write(buf.getvalue())
+    return base + ".prof"
+
+# -----------------------------
+# Sammanställning
+# -----------------------------
+def reruns(n=None):
+    with _done_lock: items = list(_done)
+    return items[-n:] if n else items
+
+def clear():
+    with _done_lock: _done.clear()
+
+SPAN_COLUMNS = ["span", "nivå", "start_ms", "ms"]
+
+def breakdown(rec) -> pd.DataFrame:
+    # en rerun: steg och spans i körordning, föräldern före sina barn
+    df = pd.DataFrame(rec["spans"], columns=SPAN_COLUMNS).sort_values(["start_ms", "nivå"], kind="stable")
+    df["andel"] = df["ms"] / rec["total_ms"] if rec["total_ms"] else 0.0
+    return df.reset_index(drop=True)
+
+def summary(items=None) -> pd.DataFrame:
+    # percentiler per span över alla sparade reruns; "rerun" = hela skriptet
+    items = reruns() if items is None else items
+    rows = [("rerun", 0, 0.0, r["total_ms"]) for r in items] + [s for r in items for s in r["spans"]]
+    if not rows: return pd.DataFrame(columns=["span", "nivå", "antal", "p50", "p90", "p99", "max", "summa"])
+    df = pd.DataFrame(rows, columns=SPAN_COLUMNS)
+    g = df.groupby(["span", "nivå"], sort=False)["ms"]
+    out = g.agg(antal="size", p50="median", p90=lambda s: s.quantile(0.9), p99=lambda s: s.quantile(0.99),
+                max="max", summa="sum").reset_index()
+    return out.sort_values(["nivå", "summa"], ascending=[True, False]).reset_index(drop=True)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m golflog.profiling", description="Visa en sparad rerun-profil (data/profiles/*.prof).")
+    ap.add_argument("fil")
+    ap.add_argument("--top", type=int, default=PROFILE_TOP, help="antal funktioner")
+    ap.add_argument("--sort", default="cumulative", choices=["cumulative", "tottime", "ncalls"])
+    args = ap.parse_args(argv)
+    pstats.Stats(args.fil).sort_stats(args.sort).print_stats(args.top)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
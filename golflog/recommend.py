@@ -0,0 +1,174 @@
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from golflog.metrics import bag_metrics, club_metrics, global_metrics, metrics_table
+from golflog.profiling import timed
+
+# -----------------------------
+# Mål per HCP-nivå och rekommendationer (ingen Streamlit – används av appen och golflog.bench)
+# -----------------------------
+CLUBS = ["LW (60deg)","SW (56deg)","GW (52deg)","PW (48deg)","9i","8i","7i","6i","5i","4i","Hybrid 4","Hybrid 3","Tra-5","Tra-3","Driver"]
+
+BENCHMARKS_BASE = {
+    "clean_rate": {"Pro":0.65, "Adv":0.50, "Beg":0.35},
+    "driver_slice_rate": {"Pro":0.12, "Adv":0.18, "Beg":0.25},
+    "driver_hook_rate":  {"Pro":0.12, "Adv":0.18, "Beg":0.25},
+    "carry_std_7i": {"Pro":6, "Adv":9, "Beg":13},
+    "carry_std_driver": {"Pro":10, "Adv":15, "Beg":22},
+    "chip_within2_rate": {"Pro":0.60, "Adv":0.45, "Beg":0.30},
+    "short_putt_make": {"Pro":0.90, "Adv":0.80, "Beg":0.60}
+}
+def hcp_tier(hcp: float):
+    if hcp <= 12: return "Pro"
+    if hcp <= 28: return "Adv"
+    return "Beg"
+def _targets(tier):
+    return {k: BENCHMARKS_BASE[k][tier] for k in BENCHMARKS_BASE}
+def targets_for_profile(profile: dict):
+    tier = hcp_tier(float(profile.get("hcp",36)))
+    return tier, _targets(tier)
+
+def resolve_coach_mode(profile: dict) -> str:
+    mode = profile.get("coach_mode","Auto")
+    if mode != "Auto": return mode
+    hcp = float(profile.get("hcp",36))
+    return "Enkel" if hcp >= 28 else "Avancerad"
+
+def compute_metrics(source):
+    # source: DataFrame, storage-backend (sqlite aggregerar i SQL) eller STATS
+    return global_metrics(metrics_table(source))
+
+# -----------------------------
+# Fingeravtryck + memo
+# -----------------------------
+# Råden beror bara på nyckeltalen (andelar och carry-spridning per klubba), HCP-nivån och coach-läget.
+# Nyckeltalen fryses till hashbara tupler en gång per metrics-tabell (som metrics_table delar mellan
+# reruns) och råden memoiseras per (klubba, nivå, läge, avtryck) i en begränsad LRU. Ett nytt slag
+# ändrar bara avtrycket för sin klubba (och de globala nyckeltalen) – övriga klubbors råd ligger kvar.
+CACHE_SIZE = 512
+_fp_memo = OrderedDict()   # id(tabell) -> (tabell, {klubba|None: avtryck})
+_fp_lock = threading.Lock()
+
+def _freeze(m: dict) -> tuple:
+    return tuple(sorted(m.items()))
+
+def fingerprints(source) -> dict:
+    # {klubba: nyckeltal per klubba, None: globala nyckeltal} som tupler
+    table = metrics_table(source)
+    with _fp_lock:
+        hit = _fp_memo.get(id(table))
+        if hit is not None and hit[0] is table: return hit[1]
+    fp = {k: _freeze(m) for k, m in bag_metrics(table, CLUBS).items()}
+    fp[None] = _freeze(global_metrics(table))
+    with _fp_lock:
+        _fp_memo[id(table)] = (table, fp)
+        while len(_fp_memo) > 8: _fp_memo.popitem(last=False)
+    return fp
+
+def _club_fingerprint(source, klubba):
+    fp = fingerprints(source).get(klubba)
+    return fp if fp is not None else _freeze(club_metrics(metrics_table(source), klubba))
+
+def clear_cache():
+    with _fp_lock: _fp_memo.clear()
+    _session_items.cache_clear(); _club_items.cache_clear()
+
+def cache_info() -> dict:
+    return {"pass": _session_items.cache_info(), "klubba": _club_items.cache_info()}
+
+# -----------------------------
+# Auto-pass generator (enkelt)
+# -----------------------------
+@timed()
+def recommend_next_session(source, profile: dict):
+    # listan delas med memot – ändra inte i den
+    return _session_items(hcp_tier(float(profile.get("hcp",36))), fingerprints(source)[None])
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _session_items(tier, fp):
+    m, t = dict(fp), _targets(tier)
+    items = []
+    # välj största gap
+    if m["clean_rate"] is None or m["clean_rate"] < t["clean_rate"]:
+        items.append(("Träffbild", "10 min mittträff: startport + mynt 3–5 cm efter bollen"))
+    if m["driver_slice_rate"] not in [None] and m["driver_slice_rate"] > t["driver_slice_rate"]:
+        items.append(("Driver slice", "10 min: starkare grepp, peg utanför bakom (inifrån)"))
+    if m["driver_hook_rate"] not in [None] and m["driver_hook_rate"] > t["driver_hook_rate"]:
+        items.append(("Driver hook", "10 min: svagare grepp, hold face, neutral path"))
+    if m["carry_std_7i"] not in [None] and m["carry_std_7i"] > t["carry_std_7i"]:
+        items.append(("7i-carry spridning", "10 min: samma bollplacering + tempo-metronom"))
+    if m["chip_within2_rate"] is None or m["chip_within2_rate"] < t["chip_within2_rate"]:
+        items.append(("Chip inom 2 m", "10 min: landningspunkt, 10x—räkna inom 2 m"))
+    if not items:
+        items = [("Underhåll", "Valfritt pass 30 min – repetera styrkor")]
+    return items[:3]
+
+# -----------------------------
+# Per klubba
+# -----------------------------
+def club_group(klubba: str) -> str:
+    if klubba == "Driver": return "driver"
+    if "Tra" in klubba: return "fairway"
+    if "Hybrid" in klubba: return "hybrid"
+    if any(w in klubba for w in ["PW","GW","SW","LW"]): return "wedge"
+    return "iron"
+
+def compute_club_metrics_for(source, klubba: str):
+    # source: DataFrame, storage-backend (sqlite aggregerar i SQL) eller STATS
+    return club_metrics(metrics_table(source), klubba)
+
+@timed()
+def recommend_for_club(source, profile: dict, klubba: str, mode: str):
+    # listan och dess råd delas med memot – ändra inte i dem
+    return _club_items(klubba, hcp_tier(float(profile.get("hcp",36))), mode, _club_fingerprint(source, klubba))
+
+@timed()
+def recommend_bag(source, profile: dict, mode: str, order=CLUBS) -> dict:
+    # hela bagen på en gång: {klubba: råd} för alla CLUBS i ordningen order, ur samma avtryck
+    tier, fp = hcp_tier(float(profile.get("hcp",36))), fingerprints(source)
+    return {k: _club_items(k, tier, mode, fp[k]) for k in order if k in fp}
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _club_items(klubba, tier, mode, fp):
+    m, t = dict(fp), _targets(tier)
+    grp = club_group(klubba)
+    center_target = t["clean_rate"]
+    carry_std_target = t["carry_std_driver"] if grp=="driver" else t["carry_std_7i"]
+    items = []
+    if m["center"] is not None and m["center"] < center_target:
+        items.append({"title":"Mittträff & startlinje","why":"Fler rena träffar minskar spridning och gör längden jämnare.",
+                      "how":["Startport 2–3 m framför bollen.","Mynt 3–5 cm efter bollen – landa klubban efter bollen.","2×10 slag genom porten + markkontakt efter bollen."]})
+    if (m["thin"] or 0) > 0.25:
+        items.append({"title":"Mot toppade slag","why":"Toppar = uppresning i träffen.","how":["Behåll posture.","Träffa marken efter bollen.","5×5 halvslag med fokus på nedslag."]})
+    if (m["fat"] or 0) > 0.25:
+        items.append({"title":"Mot duffar","why":"Low‑point för tidig.","how":["60/40 vikt fram.","Bröstet över bollen.","Turf efter bollen (mynt‑drill)."]})
+    if m["carry_std"] not in [None] and m["carry_std"] > carry_std_target:
+        items.append({"title":"Jämnare längdkontroll","why":"Mindre carry‑spridning = bättre klubbval.","how":["Samma bollplacering & tempo (3:1).","Distans‑stege: 5×80%, 5×90%, 5×100%.","Logga carries i appen."]})
+    if grp=="driver":
+        tier_slice = BENCHMARKS_BASE["driver_slice_rate"][tier]
+        tier_hook  = BENCHMARKS_BASE["driver_hook_rate"][tier]
+        if (m["slice"] or 0) > tier_slice:
+            items.append({"title":"Minska slice (driver)","why":"Slice kostar längd & kontroll.",
+                          "how": (["Starkare grepp (3–4 knogar), hög tee.","Peg utanför bakom bollen – svinga innanför.","Starta bollen svagt höger, rulla händerna."]
+                                  if mode=="Enkel" else ["Face 1–2° stängd mot path.","Path +2–4° in‑to‑out, AoA +2°.","Startlinje svagt höger."])})
+        if (m["hook"] or 0) > tier_hook:
+            items.append({"title":"Minska hook (driver)","why":"Hook = över‑release, face för stängt.",
+                          "how": (["Svagare grepp (1–2 knogar).","Hold face (mindre release).","Starta rakt/ev. vänster."]
+                                  if mode=="Enkel" else ["Face nära 0° mot path.","Neutral path (0 till +1°).","Sen release/handle forward."])})
+
+    if grp=="iron":
+        items.append({"title":"Forma Draw/Fade (järn)","why":"Shape‑kontroll ger bättre startlinje & greenträffar.",
+                      "how": (["Draw: sikta rakt, fötter lite höger, port höger.","Fade: sikta rakt, fötter lite vänster, hold face.","10 bollar per shape – logga."]
+                              if mode=="Enkel" else ["Draw: path +2–4°, face 1–2° stängd.","Fade: path −2–4°, face 0–1° öppen.","Port 2–3 m framför för startlinje."])})
+
+    if grp in ["fairway","hybrid"]:
+        items.append({"title":"Sweep‑drill","why":"Svepande träff minskar duff/topp.",
+                      "how":["Tee lågt (eller ingen).","Sopa marken efter bollen.","10 slag med låg AoA (nära 0)."]})
+
+    if grp=="wedge":
+        items.append({"title":"Wedge‑matris (klocksystem)","why":"Fasta längder 30–90 m förenklar besluten.",
+                      "how":["Tre baksvings‑längder (8/9/10).","5 slag per längd – logga.","Skriv upp matrisen i appen."]})
+        items.append({"title":"Landningspunkt‑drill","why":"Kontrollerad landning ger rätt rull/stopp.",
+                      "how":["Välj landnings‑mål 2–3 m in på green.","10 slag – räkna inom 1 m.","Anpassa loft/bounce efter underlag."]})
+    if not items: items = [{"title":"Underhåll","why":"Allt ser stabilt ut.","how":["10–15 min valfri drill.","Sätt ett litet mål och logga."]}]
+    return items
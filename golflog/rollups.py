@@ -0,0 +1,215 @@
+import atexit, glob, json, os, threading, time, uuid
+from datetime import date
+import numpy as np
+import pandas as pd
+from golflog.accumulators import _clean, _number
+from golflog.logstore import FSYNC_EVERY, FSYNC_INTERVAL, atomic_write_csv, atomic_write_json, file_lock, file_stamp
+from golflog.metrics import AGG_COLUMNS, ALL, CARRY, KEYS, MIN_CARRY_SHOTS, RATES
+
+# -----------------------------
+# Dagliga rollups per (datum, pass, kategori, moment, klubba)
+# -----------------------------
+# n = rader, count/sum/sumsq = numeriska värden. En CSV per månad under data/rollups/,
+# så ett nytt slag skriver bara om innevarande månad (högst några hundra rader).
+ROLLUP_KEYS = ["datum"] + KEYS
+ROLLUP_COLUMNS = ROLLUP_KEYS + ["n", "count", "sum", "sumsq"]
+
+def _day(v):
+    if v is None or (not isinstance(v, str) and pd.isna(v)): return None
+    if isinstance(v, (pd.Timestamp, date)): return v.strftime("%Y-%m-%d")
+    return str(v)[:10] or None
+
+def _month(row):
+    d = _day(row.get("datum"))
+    return d[:7] if d else "okänd"
+
+class DailyRollup:
+    # Som Accumulators: minnet uppdateras per slag och de ändrade månadsfilerna skrivs i batchar
+    # (FSYNC_EVERY rader / FSYNC_INTERVAL sekunder, flush(), vid avslut) under ett fillås, efter att
+    # månader som en annan process har skrivit lästs in. _gen.json byts vid varje ombyggnad.
+    def __init__(self, root):
+        self.root = root
+        self.months = {}   # "YYYY-MM" -> {(datum, pass, kategori, moment, klubba): [n, count, sum, sumsq]}
+        self._stamps = {}  # "YYYY-MM" -> file_stamp för det som senast lästes/skrevs
+        self._gen, self._gen_stamp = None, None
+        self._pending = []   # rader som finns i minnet men inte i månadsfilerna
+        self._saved_at = time.monotonic()
+        self._version = 0
+        self._frame = (None, None)
+        self._lock = threading.Lock()
+
+    def _add(self, row):
+        d = _day(row.get("datum"))
+        g = self.months.setdefault(_month(row), {}).setdefault((d,) + tuple(_clean(row.get(k)) for k in KEYS), [0, 0, 0.0, 0.0])
+        g[0] += 1
+        x = _number(row.get("värde"))
+        if x is not None:
+            g[1] += 1; g[2] += x; g[3] += x * x
+
+    def update(self, row: dict): self.update_many([row])
+
+    def _locked(self):
+        os.makedirs(self.root, exist_ok=True)
+        return file_lock(os.path.join(self.root, "_rollups"))
+
+    def update_many(self, rows):
+        with self._lock:
+            self._refresh()
+            for r in rows: self._add(r)
+            self._pending.extend(rows)
+            self._version += 1
+            if len(self._pending) >= FSYNC_EVERY or time.monotonic() - self._saved_at >= FSYNC_INTERVAL: self._flush()
+
+    def flush(self):
+        with self._lock: self._flush()
+
+    def _flush(self):
+        if not self._pending: return
+        with self._locked():
+            self._refresh()   # andra processers månader; våra osparade rader läggs ovanpå
+            for m in {_month(r) for r in self._pending}: self._save(m)
+        self._pending = []
+        self._saved_at = time.monotonic()
+
+    def replace(self, df: pd.DataFrame):
+        frame = daily_frame(df)
+        with self._lock, self._locked():
+            self.months, self._stamps, self._pending = {}, {}, []
+            self._gen = uuid.uuid4().hex
+            atomic_write_json(self._gen_path(), {"gen": self._gen})
+            self._gen_stamp = file_stamp(self._gen_path())
+            for rec in frame.itertuples(index=False, name=None):
+                key, vals = tuple(_clean(v) for v in rec[:5]), list(rec[5:])
+                self.months.setdefault(key[0][:7] if key[0] else "okänd", {})[key] = vals
+            for f in glob.glob(os.path.join(self.root, "*.csv")): os.remove(f)
+            for m in self.months: self._save(m)
+            self._version += 1
+
+    def _save(self, month):
+        path = os.path.join(self.root, f"{month}.csv")
+        rows = [list(k) + v for k, v in self.months[month].items()]
+        atomic_write_csv(pd.DataFrame(rows, columns=ROLLUP_COLUMNS), path)
+        self._stamps[month] = file_stamp(path)
+
+    def _gen_path(self):
+        return os.path.join(self.root, "_gen.json")
+
+    def _refresh(self) -> bool:
+        # anropas med self._lock: läs in månadsfiler som tillkommit, bytts ut eller tagits bort och
+        # lägg osparade rader ovanpå de månader som lästes om (om ingen har byggt om under tiden)
+        if not os.path.isdir(self.root): return False
+        stamp = file_stamp(self._gen_path())
+        if stamp != self._gen_stamp:
+            try:
+                with open(self._gen_path(), "r", encoding="utf-8") as f: gen = json.load(f).get("gen")
+            except (FileNotFoundError, ValueError): gen = None
+            if gen != self._gen: self._pending = []   # ombyggd från loggen, där raderna redan finns
+            self._gen, self._gen_stamp = gen, stamp
+        found = {os.path.basename(f)[:-4]: f for f in glob.glob(os.path.join(self.root, "*.csv"))}
+        touched = set()
+        for m in [m for m in self.months if m not in found]:
+            del self.months[m]; self._stamps.pop(m, None); touched.add(m)
+        for m, f in found.items():
+            stamp = file_stamp(f)
+            if stamp is None or stamp == self._stamps.get(m): continue
+            try: df = pd.read_csv(f, encoding="utf-8")
+            except (FileNotFoundError, pd.errors.EmptyDataError): continue
+            self.months[m] = {tuple(_clean(v) for v in rec[:5]): list(rec[5:])
+                              for rec in df[ROLLUP_COLUMNS].itertuples(index=False, name=None)}
+            self._stamps[m] = stamp
+            touched.add(m)
+        for r in self._pending:
+            if _month(r) in touched: self._add(r)
+        if touched: self._version += 1
+        return True
+
+    def load(self) -> bool:
+        with self._lock: return self._refresh()
+
+    def rows(self) -> int:
+        # antal loggrader som ingår – jämförs mot loggen vid start
+        with self._lock:
+            self._refresh()
+            return int(sum(v[0] for m in self.months.values() for v in m.values()))
+
+    def version(self):
+        with self._lock:
+            self._refresh()
+            return self._version
+
+    def frame(self) -> pd.DataFrame:
+        with self._lock:
+            self._refresh()
+            v, f = self._frame
+            if v == self._version: return f
+            rows = [list(k) + vals for m in self.months.values() for k, vals in m.items()]
+            f = pd.DataFrame(rows, columns=ROLLUP_COLUMNS)
+            f["datum"] = pd.to_datetime(f["datum"], errors="coerce")
+            self._frame = (self._version, f)
+            return f
+
+    def window(self, days: int, end=None) -> pd.DataFrame:
+        # AGG_COLUMNS för de senaste `days` dagarna t.o.m. end – summerar bara rollup-rader
+        f = self.frame()
+        end = pd.Timestamp(end or date.today())
+        f = f[(f["datum"] > end - pd.Timedelta(days=days)) & (f["datum"] <= end)]
+        if f.empty: return pd.DataFrame(columns=AGG_COLUMNS)
+        g = f.groupby(KEYS, dropna=False, sort=False)[["n", "count", "sum", "sumsq"]].sum().reset_index()
+        cnt = g["count"].replace(0, np.nan)
+        g["mean"] = g["sum"] / cnt
+        g["m2"] = (g["sumsq"] - g["sum"] * g["sum"] / cnt).fillna(0.0).clip(lower=0.0)
+        return g[AGG_COLUMNS]
+
+    def trend(self, metric: str, days: int, klubba: str = ALL) -> pd.Series:
+        # rullande nyckeltal per kalenderdag över `days` dagar
+        f = self.frame().dropna(subset=["datum"])
+        if klubba != ALL: f = f[f["klubba"] == klubba]
+        if metric == "carry_std":
+            f = f[(f["pass"] == CARRY[0]) & (f["kategori"] == CARRY[1]) & (f["moment"] == CARRY[2])]
+            if f.empty: return pd.Series(dtype=float)
+            s = _rolling(f.groupby("datum")[["count", "sum", "sumsq"]].sum(), days)
+            c = s["count"].where(s["count"] >= MIN_CARRY_SHOTS)
+            return np.sqrt(((s["sumsq"] - s["sum"] ** 2 / c) / (c - 1)).clip(lower=0))
+        _, p, kat, mom = next(r for r in RATES if r[0] == metric)
+        f = f[(f["pass"] == p) & (f["kategori"] == kat)]
+        if f.empty: return pd.Series(dtype=float)
+        daily = pd.DataFrame({"tot": f["n"], "hit": f["n"].where(f["moment"] == mom, 0), "datum": f["datum"]}).groupby("datum").sum()
+        s = _rolling(daily, days)
+        return s["hit"] / s["tot"].replace(0, np.nan)
+
+def _rolling(daily: pd.DataFrame, days: int) -> pd.DataFrame:
+    idx = pd.date_range(daily.index.min(), max(daily.index.max(), pd.Timestamp(date.today())), freq="D")
+    return daily.reindex(idx, fill_value=0).rolling(days, min_periods=1).sum()
+
+def daily_frame(df: pd.DataFrame) -> pd.DataFrame:
+    # full omräkning från rådata (ett groupby) – används vid rebuild/write_log
+    if df.empty: return pd.DataFrame(columns=ROLLUP_COLUMNS)
+    v = df["värde"]
+    if not pd.api.types.is_float_dtype(v): v = pd.to_numeric(v, errors="coerce")
+    frame = pd.DataFrame({k: df[k].astype(object) for k in KEYS})
+    frame.insert(0, "datum", pd.to_datetime(df["datum"], errors="coerce").dt.strftime("%Y-%m-%d").to_numpy())
+    frame["n"] = 1
+    frame["count"] = v.notna().astype(int).to_numpy()
+    frame["sum"] = v.fillna(0.0).to_numpy()
+    frame["sumsq"] = (v.fillna(0.0) ** 2).to_numpy()
+    return frame.groupby(ROLLUP_KEYS, dropna=False, sort=True)[["n", "count", "sum", "sumsq"]].sum().reset_index()
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+def rollups_for(data_dir, backend) -> DailyRollup:
+    key = os.path.abspath(data_dir)
+    with _instances_lock:
+        r = _instances.get(key)
+        if r is None:
+            r = DailyRollup(os.path.join(data_dir, "rollups"))
+            if not r.load() or r.rows() != backend.count(): r.replace(backend.read())   # saknas eller har glidit isär
+            _instances[key] = r
+        return r
+
+@atexit.register
+def _flush_all():
+    with _instances_lock: items = list(_instances.values())
+    for r in items:
+        try: r.flush()
+        except Exception: pass
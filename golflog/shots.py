@@ -0,0 +1,147 @@
+import glob, os, threading, time
+import pandas as pd
+from golflog.feedback import FIELDS
+from golflog.logstore import _tmp_name, atomic_write_json
+
+# -----------------------------
+# Typad slagtabell för launch monitor-data (data/shots/*.parquet)
+# -----------------------------
+# En rad per slag: tid, datum, klubba, de sju LM-fälten, bildreferens och källa
+# (analys/import/backfill). Varje append blir ett litet segment part-<id>.parquet; när de
+# blir fler än COMPACT_PARTS slås allt ihop till base-<id>.parquet, som ersätter alla
+# segment med id <= <id> (gamla filer städas bort efteråt, så ett avbrott ger aldrig dubbletter).
+SHOT_COLUMNS = ["ts", "datum", "klubba"] + FIELDS + ["img", "källa"]
+COMPACT_PARTS = 16
+
+def _schema():
+    import pyarrow as pa
+    dict_str = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([("ts", pa.timestamp("s")), ("datum", pa.date32()), ("klubba", dict_str)]
+                     + [(f, pa.float64()) for f in FIELDS]
+                     + [("img", pa.string()), ("källa", dict_str)])
+
+def _typed(df: pd.DataFrame) -> pd.DataFrame:
+    out = pd.DataFrame(index=range(len(df)))
+    out["ts"] = pd.to_datetime(df["ts"], errors="coerce").to_numpy() if "ts" in df else pd.NaT
+    out["datum"] = pd.to_datetime(df["datum"], errors="coerce").to_numpy()
+    out["klubba"] = pd.Categorical(df["klubba"].to_numpy())
+    for f in FIELDS:
+        out[f] = pd.to_numeric(df[f], errors="coerce").astype("float64").to_numpy() if f in df else float("nan")
+    img = pd.Series(df["img"].to_numpy() if "img" in df else None, index=out.index, dtype=object)
+    out["img"] = img.where(img.notna() & (img != ""), None)
+    out["källa"] = pd.Categorical(df["källa"].to_numpy() if "källa" in df else ["analys"] * len(df))
+    return out
+
+def _for_arrow(typed: pd.DataFrame) -> pd.DataFrame:
+    out = typed.copy()
+    out["ts"] = out["ts"].dt.floor("s")
+    out["datum"] = out["datum"].dt.date.astype(object).where(out["datum"].notna(), None)
+    for c in ("klubba", "källa"): out[c] = out[c].astype(object).where(out[c].notna(), None)
+    return out
+
+def _cid(path):
+    return os.path.basename(path).split("-", 1)[1].split(".")[0]
+
+class ShotTable:
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.RLock()
+        self._cache = {}
+
+    def _files(self):
+        # gällande bas + segment som är nyare än basen
+        bases = sorted(glob.glob(os.path.join(self.root, "base-*.parquet")))
+        base = bases[-1] if bases else None
+        floor = _cid(base) if base else ""
+        parts = [p for p in sorted(glob.glob(os.path.join(self.root, "part-*.parquet"))) if _cid(p) > floor]
+        return ([base] if base else []) + parts
+
+    def _write(self, typed, name):
+        import pyarrow as pa, pyarrow.parquet as pq
+        os.makedirs(self.root, exist_ok=True)
+        target = os.path.join(self.root, name)
+        tmp = _tmp_name(target)
+        pq.write_table(pa.Table.from_pandas(_for_arrow(typed), schema=_schema(), preserve_index=False), tmp)
+        os.replace(tmp, target)
+
+    def append(self, df: pd.DataFrame):
+        if df is None or not len(df): return 0
+        with self._lock:
+            self._write(_typed(df), f"part-{time.time_ns():020d}.parquet")
+            if len(self._files()) > COMPACT_PARTS: self.compact()
+        return len(df)
+
+    def compact(self):
+        with self._lock:
+            files = self._files()
+            if len(files) < 2: return
+            df = self.read()
+            self._write(df, f"base-{_cid(files[-1])}.parquet")
+            keep = set(self._files())
+            for f in glob.glob(os.path.join(self.root, "*.parquet")):
+                if f not in keep: os.remove(f)
+            self._cache.clear()
+
+    def read(self, columns=None) -> pd.DataFrame:
+        cols = list(columns) if columns else SHOT_COLUMNS
+        with self._lock:
+            files = self._files()
+            version = tuple((f, os.path.getsize(f)) for f in files)
+            hit = self._cache.get(tuple(cols))
+            if hit is not None and hit[0] == version: return hit[1]
+            if files:
+                import pyarrow.dataset as ds
+                df = ds.dataset(files, format="parquet", schema=_schema()).to_table(columns=cols).to_pandas(date_as_object=False)
+            else:
+                df = _typed(pd.DataFrame(columns=["datum", "klubba"]))[cols]
+            self._cache[tuple(cols)] = (version, df)
+            return df
+
+    def trend(self, field: str, klubba=None, freq="D") -> pd.DataFrame:
+        # median per dag (eller vecka: freq="W") och klubba – läser bara tre kolumner
+        df = self.read(["datum", "klubba", field]).dropna(subset=["datum", field])
+        if klubba is not None: df = df[df["klubba"] == klubba]
+        if df.empty: return pd.DataFrame()
+        g = df.groupby([pd.Grouper(key="datum", freq=freq), "klubba"], observed=True)[field].median()
+        return g.unstack("klubba")
+
+# -----------------------------
+# Engångs-backfill från LM-rader i loggen
+# -----------------------------
+# Analyzer skrev tidigare bara värde=launch och "spin {int} rpm; bs {x} mph; img {namn}".
+LM_NOTE = r"spin\s+(?P<spin>-?\d+(?:\.\d+)?)\s*rpm;\s*bs\s+(?P<ball_speed>-?\d+(?:\.\d+)?)\s*mph(?:;\s*img\s*(?P<img>\S*))?"
+
+def parse_lm_rows(log: pd.DataFrame) -> pd.DataFrame:
+    lm = log[log["kategori"].astype(object) == "LM"]
+    if lm.empty: return _typed(pd.DataFrame(columns=["datum", "klubba"]))
+    notes = lm["anteckning"].astype(object).where(lm["anteckning"].notna(), "").astype(str)
+    parsed = notes.str.extract(LM_NOTE)
+    out = pd.DataFrame({"ts": pd.to_datetime(lm["datum"], errors="coerce"), "datum": lm["datum"],
+                        "klubba": lm["klubba"].astype(object), "launch": lm["värde"],
+                        "spin": parsed["spin"], "ball_speed": parsed["ball_speed"], "img": parsed["img"],
+                        "källa": "backfill"})
+    return _typed(out)
+
+def backfill(table: ShotTable, log: pd.DataFrame) -> int:
+    # Hela backfillen är ett segment (skrivs via rename, allt eller inget). Dog processen innan
+    # markören skrevs finns backfill-raderna redan i tabellen – då skrivs bara markören.
+    marker = os.path.join(table.root, "_backfilled.json")
+    if os.path.exists(marker): return 0
+    done = (table.read(["källa"])["källa"] == "backfill").any()
+    n = 0 if done else table.append(parse_lm_rows(log))
+    os.makedirs(table.root, exist_ok=True)
+    atomic_write_json(marker, {"rader": n, "tid": time.strftime("%Y-%m-%d %H:%M:%S")})
+    return n
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+def shots_for(data_dir, backend) -> ShotTable:
+    key = os.path.abspath(data_dir)
+    with _instances_lock:
+        t = _instances.get(key)
+        if t is None:
+            t = ShotTable(os.path.join(data_dir, "shots"))
+            backfill(t, backend.read())
+            _instances[key] = t
+        return t
@@ -0,0 +1,153 @@
+import argparse, glob, multiprocessing, os, shutil, sys, tempfile, threading, time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, timedelta
+from golflog.accumulators import Accumulators, verify
+from golflog.logstore import close_appender
+from golflog.passbuffer import PassBuffer
+from golflog.rollups import ROLLUP_KEYS, DailyRollup, daily_frame
+from golflog.storage import BACKENDS, get_backend
+from golflog.tenants import Shard
+
+# -----------------------------
+# Stresstest: många samtidiga tillägg från trådar och processer, inga rader får försvinna
+# -----------------------------
+# python -m golflog.stress [--storage csv|parquet|sqlite] [--threads 16] [--processes 4] [--rows 4000]
+# Under tiden skriver en tråd om hela loggen (csv, parquet) och komprimerar deltan (parquet).
+# Standard är appens skrivväg (Shard.append_rows, varannan skrivare via en PassBuffer med journal);
+# efteråt jämförs ackumulatorerna (som "accumulators verify") och rollups mot loggen och inga
+# journaler får ligga kvar. --via backend skriver direkt till lagringen och kontrollerar bara loggen.
+# Körs även som automatiskt test: tests/test_stress.py.
+VIA = ("shard", "backend")
+BUFFER_EVERY = 7   # slag per batch för skrivare som går via PassBuffer
+
+MOMENTS = [("Stress", "Tillägg"), ("Längdkontroll", "Carry"), ("Träffbild", "Mitt i")]
+
+def _rows(worker, start, n):
+    # blandar kategorier och två månader, så att nyckeltal och flera rollup-filer påverkas
+    days = [date.today().isoformat(), (date.today() - timedelta(days=40)).isoformat()]
+    return [{"datum": days[i % 2], "pass": "Range", "kategori": MOMENTS[i % 3][0], "moment": MOMENTS[i % 3][1],
+             "klubba": "7i", "värde": 100 + i % 50, "anteckning": f"{worker}-{i}"} for i in range(start, start + n)]
+
+_shards = {}
+_shards_lock = threading.Lock()
+
+def _shard(data_dir, storage):
+    # en Shard per process, som tenants.shard_for
+    key = os.path.abspath(data_dir)
+    with _shards_lock:
+        if key not in _shards: _shards[key] = Shard(data_dir, storage=storage)
+        return _shards[key]
+
+def _append(data_dir, storage, worker, n, batch, via="backend", buffered=False):
+    if via == "backend":
+        sink = get_backend(data_dir, storage).append_many
+    else:
+        sink = _shard(data_dir, storage).append_rows
+    buf = PassBuffer(os.path.join(data_dir, "journal", f"stress-{worker}.jsonl"), sink, flush_every=BUFFER_EVERY) if buffered else None
+    for i in range(0, n, batch):
+        rows = _rows(worker, i, min(batch, n - i))
+        if buf is None: sink(rows)
+        else:
+            for r in rows: buf.add(r)
+    if buf is not None: buf.close()
+    if via == "shard": _shard(data_dir, storage).flush()   # processer från multiprocessing kör inte atexit
+    return n
+
+def _process_worker(data_dir, storage, worker, n, batch, via="backend", buffered=False):
+    # egen process: egna appenders/anslutningar, precis som en andra Streamlit-instans
+    return _append(data_dir, storage, worker, n, batch, via, buffered)
+
+def _disturb(backend, stop, counter):
+    # hel omskrivning under lås (csv, parquet) omväxlande med komprimering av deltan (parquet)
+    ops = [op for op in (getattr(backend, "compact", None), hasattr(backend, "update") and (lambda: backend.update(lambda df: df))) if op]
+    while ops and not stop.is_set():
+        ops[counter[0] % len(ops)]()
+        counter[0] += 1
+        time.sleep(0.01)
+
+def _rollup_diff(daily, df) -> int:
+    # antal (datum, nycklar) där rollupens n/count skiljer sig från en omräkning över loggen
+    full = daily_frame(df).set_index(ROLLUP_KEYS)[["n", "count"]]
+    f = daily.frame()
+    fast = f.assign(datum=f["datum"].dt.strftime("%Y-%m-%d")).groupby(ROLLUP_KEYS, dropna=False)[["n", "count"]].sum()
+    full, fast = full.align(fast, fill_value=0)
+    return int((full != fast).any(axis=1).sum())
+
+def check_derived(data_dir, df) -> dict:
+    # läser härlett tillstånd från disk (nya instanser) och jämför med loggen
+    acc = Accumulators(os.path.join(data_dir, "accumulators.json"))
+    daily = DailyRollup(os.path.join(data_dir, "rollups"))
+    acc.load(); daily.load()
+    return {"ack_rader": acc.rows, "ack_avvikelser": int(len(verify(acc, df))),
+            "rollup_rader": daily.rows(), "rollup_avvikelser": _rollup_diff(daily, df),
+            "journaler_kvar": len(glob.glob(os.path.join(data_dir, "journal", "*.jsonl")))}
+
+def ok(r) -> bool:
+    if r["saknas"] or r["dubbletter"]: return False
+    if "ack_rader" not in r: return True
+    return (r["ack_rader"] == r["rader_i_loggen"] == r["rollup_rader"] and not r["ack_avvikelser"]
+            and not r["rollup_avvikelser"] and not r["journaler_kvar"])
+
+def run(data_dir, storage="csv", threads=16, processes=4, rows=4000, batch=1, disturb=True, via="shard"):
+    backend = get_backend(data_dir, storage)
+    backend.init()
+    if via == "shard": _shard(data_dir, storage)   # härlett tillstånd finns innan skrivarna startar
+    per_worker = rows // (threads + processes)
+    expected = {f"{w}-{i}" for w in [f"t{k}" for k in range(threads)] + [f"p{k}" for k in range(processes)]
+                for i in range(per_worker)}
+    stop, rewrites = threading.Event(), [0]
+    disturber = threading.Thread(target=_disturb, args=(backend, stop, rewrites), daemon=True) if disturb else None
+    t0 = time.perf_counter()
+    if disturber: disturber.start()
+    try:
+        with ThreadPoolExecutor(max(threads, 1)) as tp, \
+             ProcessPoolExecutor(max(processes, 1), mp_context=multiprocessing.get_context("spawn")) as pp:
+            futs = [pp.submit(_process_worker, data_dir, storage, f"p{k}", per_worker, batch, via, via == "shard" and k % 2 == 1)
+                    for k in range(processes)]
+            futs += [tp.submit(_append, data_dir, storage, f"t{k}", per_worker, batch, via, via == "shard" and k % 2 == 1)
+                     for k in range(threads)]
+            written = sum(f.result() for f in futs)
+        elapsed = time.perf_counter() - t0
+    finally:
+        stop.set()
+        if disturber: disturber.join()
+    for p in ("logg.csv", os.path.join("logg_parquet", "_delta.csv")):
+        close_appender(os.path.join(data_dir, p))
+    fresh = BACKENDS[storage](data_dir)   # ny instans: inga cachar från körningen
+    df = fresh.read()
+    notes = df["anteckning"].astype(str)
+    seen = notes[notes.isin(expected)]
+    r = {"skrivna": written, "lästa": int(len(seen)), "saknas": len(expected - set(seen)),
+         "dubbletter": int(seen.duplicated().sum()), "omskrivningar": rewrites[0], "rader_i_loggen": int(len(df)),
+         "sekunder": elapsed, "rader_per_s": written / elapsed if elapsed else 0.0}
+    if via == "shard": r.update(check_derived(data_dir, df))
+    return r
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m golflog.stress", description="Samtidiga tillägg från trådar och processer – kontrollerar att ingen rad försvinner.")
+    ap.add_argument("--storage", choices=sorted(BACKENDS), default="csv")
+    ap.add_argument("--threads", type=int, default=16)
+    ap.add_argument("--processes", type=int, default=4)
+    ap.add_argument("--rows", type=int, default=4000, help="totalt antal rader")
+    ap.add_argument("--batch", type=int, default=1, help="rader per append_many")
+    ap.add_argument("--no-disturb", action="store_true", help="ingen samtidig omskrivning/komprimering")
+    ap.add_argument("--via", choices=VIA, default="shard", help="shard = appens skrivväg med ackumulatorer, rollups och journal; backend = bara lagringen")
+    ap.add_argument("--data-dir", default=None, help="standard: en temporär katalog som tas bort efteråt")
+    args = ap.parse_args(argv)
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="golflog-stress-")
+    try:
+        r = run(data_dir, args.storage, args.threads, args.processes, args.rows, args.batch, not args.no_disturb, args.via)
+    finally:
+        if args.data_dir is None: shutil.rmtree(data_dir, ignore_errors=True)
+    print(f"{args.storage}: {r['skrivna']} rader från {args.threads} trådar + {args.processes} processer "
+          f"på {r['sekunder']:.2f} s ({r['rader_per_s']:.0f} rader/s), {r['omskrivningar']} omskrivningar under tiden")
+    print(f"Lästa tillbaka {r['lästa']} – saknas {r['saknas']}, dubbletter {r['dubbletter']}")
+    if "ack_rader" in r:
+        print(f"Ackumulatorer: {r['ack_rader']} rader ({r['rader_i_loggen']} i loggen), {r['ack_avvikelser']} avvikande nyckeltal")
+        print(f"Rollups: {r['rollup_rader']} rader, {r['rollup_avvikelser']} avvikande dagar – journaler kvar: {r['journaler_kvar']}")
+    good = ok(r)
+    print("OK" if good else "FEL – rader har försvunnit/dubblerats eller härlett tillstånd stämmer inte med loggen")
+    return 0 if good else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
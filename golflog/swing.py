@@ -0,0 +1,131 @@
+import argparse, multiprocessing, os, sys, time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+
+# -----------------------------
+# Svingtempo ur video: rörelseenergi per bild -> faser -> tempo
+# -----------------------------
+# Bilderna avkodas strömmande (ingen video hålls i minnet), tas ned till ett grått rutnät (var n:e
+# pixel) och differentieras blockvis med NumPy. Energin = andel rutor som ändrats mer än DIFF_LEVEL;
+# med rörelseoskärpa växer den med farten (medel |Δ| mättas när klubban rör sig mer än sin bredd).
+# Faser: träff = största rörelsen, toppen = lugnaste bilden strax före (vändningen), start = där
+# rörelsen före toppen började. Tempo = backsving / nedsving (målet ~3:1, se recommend_for_club).
+TARGET_WIDTH = 96      # pixlar i analysrutnätet
+BLOCK = 64             # bilder per vektoriserad differens
+DIFF_LEVEL = 8         # gråskalesteg som räknas som ändring (över brus/komprimering)
+SMOOTH_S = 0.04        # glidande medel över energin (sekunder)
+DOWNSWING_S = (0.12, 0.6)   # rimlig nedsving: min/max sekunder före träff
+MAX_BACKSWING_S = 2.0
+START_LEVEL = 0.12     # andel av (träff - vila) som räknas som rörelse
+DEFAULT_FPS = 30.0
+
+class MotionEnergy:
+    # tar emot BGR-bilder en i taget (t.ex. inne i golflog.videos.extract); differenserna räknas per block
+    def __init__(self, width=TARGET_WIDTH):
+        self.width, self.out, self.block, self.n, self.prev, self.stride = width, [], None, 0, None, None
+
+    def add(self, frame):
+        if self.stride is None:
+            self.stride = max(1, frame.shape[1] // self.width)
+            h, w = frame[::self.stride, ::self.stride].shape[:2]
+            self.block = np.empty((BLOCK + 1, h, w), dtype=np.int16)
+        self.block[self.n + 1] = frame[::self.stride, ::self.stride].sum(axis=2, dtype=np.int16) // 3   # grått, utan interpolering
+        self.n += 1
+        if self.n == BLOCK: self._flush()
+
+    def _flush(self):
+        b, n = self.block, self.n
+        if self.prev is None: start = 1   # första bilden saknar föregångare
+        else: start = 0; b[0] = self.prev
+        d = np.abs(np.diff(b[start:n + 1], axis=0)) > DIFF_LEVEL
+        self.out.append(d.mean(axis=(1, 2), dtype=np.float32))
+        self.prev = b[n].copy(); self.n = 0
+
+    def energy(self):
+        # energi[i-1] jämför bild i med bild i-1
+        if self.n: self._flush()
+        return np.concatenate(self.out) if self.out else np.empty(0, dtype=np.float32)
+
+def motion_energy(path, width=TARGET_WIDTH):
+    # -> (energi per bildövergång, fps)
+    import cv2
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened(): raise ValueError(f"Kan inte läsa {os.path.basename(path)}")
+    acc = MotionEnergy(width)
+    try:
+        fps = float(cap.get(cv2.CAP_PROP_FPS) or 0.0) or DEFAULT_FPS
+        while True:
+            ok, frame = cap.read()
+            if not ok: break
+            acc.add(frame)
+    finally:
+        cap.release()
+    return acc.energy(), fps
+
+def _smooth(e, fps):
+    k = max(1, int(round(SMOOTH_S * fps))) | 1   # udda fönster – ingen förskjutning
+    return np.convolve(e, np.ones(k) / k, mode="same") if k > 1 and len(e) > k else e
+
+def phases(energy, fps) -> dict:
+    # bildnummer för start, topp och träff plus tider och tempo (tenants.TEMPO_COLUMNS); None om ingen sving syns
+    e = _smooth(np.asarray(energy, dtype=np.float64), fps)
+    if len(e) < 4 or not np.isfinite(e).all(): return None
+    impact = int(np.argmax(e))
+    rest = float(np.percentile(e, 10))
+    if e[impact] - rest <= 1e-6: return None
+    lo, hi = max(0, impact - int(DOWNSWING_S[1] * fps)), impact - int(DOWNSWING_S[0] * fps)
+    if hi <= lo: return None
+    top = lo + int(np.argmin(e[lo:hi]))
+    first = max(0, top - int(MAX_BACKSWING_S * fps))
+    # förbi den lugna vändningen, genom backsvingen, till sista lugna bilden före den
+    moving = e[first:top + 1] >= rest + START_LEVEL * (e[impact] - rest)
+    last = np.flatnonzero(moving)
+    quiet = np.flatnonzero(~moving[:last[-1]]) if len(last) else []
+    start = first + (int(quiet[-1]) + 1 if len(quiet) else 0)
+    back, down = (top - start) / fps, (impact - top) / fps
+    if back <= 0 or down <= 0: return None   # rörelse men ingen backsving – t.ex. bara bollen
+    return {"start_bild": start + 1, "topp_bild": top + 1, "traff_bild": impact + 1,   # energi[i] hör till bild i+1
+            "backsving_s": round(back, 3), "nedsving_s": round(down, 3), "traff_s": round((impact + 1) / fps, 3),
+            "tempo": round(back / down, 2)}
+
+def analyze(path) -> dict:
+    energy, fps = motion_energy(path)
+    r = phases(energy, fps)
+    if r is None: raise ValueError(f"Hittar ingen sving i {os.path.basename(path)}")
+    return r
+
+# -----------------------------
+# Batch över en processpool
+# -----------------------------
+def analyze_many(paths, workers=None):
+    # yield (path, resultat eller Exception) i den ordning de blir klara
+    paths = list(paths)
+    if not paths: return
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    if workers == 1:
+        for p in paths:
+            try: yield p, analyze(p)
+            except Exception as e: yield p, e
+        return
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futs = {pool.submit(analyze, p): p for p in paths}
+        for f in as_completed(futs):
+            try: yield futs[f], f.result()
+            except Exception as e: yield futs[f], e
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m golflog.swing", description="Mät svingtempo (backsving:nedsving) och träffbild i videofiler.")
+    ap.add_argument("filer", nargs="+")
+    ap.add_argument("--workers", type=int, default=None, help="processer (standard: antal kärnor)")
+    args = ap.parse_args(argv)
+    t0, bad = time.perf_counter(), 0
+    for p, r in analyze_many(args.filer, args.workers):
+        if isinstance(r, Exception):
+            bad += 1; print(f"{p}: {r}"); continue
+        print(f"{p}: tempo {r['tempo']}:1 (backsving {r['backsving_s']:.2f} s, nedsving {r['nedsving_s']:.2f} s), träff bild {r['traff_bild']} @ {r['traff_s']:.2f} s")
+    dt = time.perf_counter() - t0
+    print(f"{len(args.filer)} videor på {dt:.2f} s ({len(args.filer) / dt:.1f} per s)")
+    return 1 if bad else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
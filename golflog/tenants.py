@@ -0,0 +1,146 @@
+import copy, hashlib, json, os, re, threading, unicodedata
+from contextlib import contextmanager
+from golflog.accumulators import accumulators_for, rebuild
+from golflog.logstore import atomic_write_json, file_lock
+from golflog.profiling import timed
+from golflog.rollups import rollups_for
+from golflog.shots import shots_for
+from golflog.storage import get_backend
+
+# -----------------------------
+# En lagringskatalog (shard) per golfare: data/users/<id>/
+# -----------------------------
+# Tomt användar-id = den delade katalogen data/ (så som appen alltid har sparat), så
+# befintliga installationer fortsätter som förut. Varje shard har egen logg, statistik,
+# rollups, slagtabell, profil och journal, ett eget skrivlås och en profilcache.
+USERS_DIR = "users"
+_ID = re.compile(r"[^a-z0-9_-]+")
+TEMPO_COLUMNS = ["tempo","backsving_s","nedsving_s","traff_bild","traff_s"]   # fylls av golflog.swing
+VIDEO_COLUMNS = ["ts","filnamn","storlek_bytes","format","vinkel","klubba","miljo","miss","kommentar"] + TEMPO_COLUMNS
+DEFAULT_PROFILE = {"swing_speed_value": 95, "swing_speed_unit": "mph", "shaft_flex": "R",
+                   "hcp": 36, "coach_mode": "Auto", "onboarded": False, "goal":"Balans & träffbild",
+                   "primary_color":"#1E88E5", "dark_mode": False}
+
+def clean_user_id(user) -> str:
+    # "Anna Svensson" -> "anna-svensson", "Björn" -> "bjorn"; bara tecken som är säkra i ett katalognamn.
+    # Bokstäver utan ASCII-motsvarighet (t.ex. ß, æ, kinesiska) ger ett kort hash-suffix i stället för
+    # att försvinna, så olika namn inte delar shard. Tomt = den delade loggen; ett namn som inte blir
+    # något id alls (t.ex. "!!!") avvisas i stället för att hamna där.
+    raw = str(user or "").strip().lower()
+    if not raw: return ""
+    decomposed = unicodedata.normalize("NFKD", raw)   # å -> a + ring; ringen faller bort nedan
+    uid = _ID.sub("-", decomposed.encode("ascii", "ignore").decode("ascii")).strip("-")[:40]
+    if any(c.isalnum() and not c.isascii() for c in decomposed):
+        uid = f"{uid}-{hashlib.sha1(raw.encode('utf-8')).hexdigest()[:8]}".strip("-")
+    if not uid: raise ValueError(f"Ogiltigt namn på golfare: {user!r}")
+    return uid
+
+def user_dir(data_root, user) -> str:
+    uid = clean_user_id(user)
+    return os.path.join(data_root, USERS_DIR, uid) if uid else data_root
+
+class Shard:
+    def __init__(self, data_dir, user_id="", storage=None):
+        self.user_id = user_id
+        self.data_dir = data_dir
+        self.profile_path = os.path.join(data_dir, "profile.json")
+        self.journal_dir = os.path.join(data_dir, "journal")
+        self.analytics_dir = os.path.join(data_dir, "trackman")
+        self.video_dir = os.path.join(data_dir, "videos")
+        self.video_meta = os.path.join(data_dir, "videos.csv")
+        self.lock = threading.RLock()   # trådar i processen; locked() lägger till fillåset mellan processer
+        self.lock_path = os.path.join(data_dir, "shard")
+        self._held = 0
+        for d in (data_dir, self.analytics_dir, self.video_dir): os.makedirs(d, exist_ok=True)
+        if not os.path.exists(self.video_meta):
+            with open(self.video_meta, "w", encoding="utf-8") as f: f.write(",".join(VIDEO_COLUMNS) + "\n")
+        self.log = get_backend(data_dir, storage)   # None = GOLF_STORAGE
+        self.log.init()
+        with self.locked():   # ingen annan process skriver medan statistiken jämförs mot loggen
+            self.stats = accumulators_for(data_dir, self.log)
+            self.daily = rollups_for(data_dir, self.log)
+            self.shots = shots_for(data_dir, self.log)
+        self._profile = None   # (mtime_ns, size, dict)
+
+    @contextmanager
+    def locked(self):
+        # shardens skrivlås: RLock i processen + <data_dir>/shard.lock mellan processer (tas en gång per tråd)
+        with self.lock:
+            self._held += 1
+            try:
+                if self._held == 1:
+                    with file_lock(self.lock_path): yield
+                else:
+                    yield
+            finally:
+                self._held -= 1
+
+    # --- logg: alla härledda strukturer uppdateras under samma lås ---
+    @timed()
+    def read_log(self, columns=None):
+        # delad, cachad DataFrame – behandla som read-only. Läsfel propageras (ingen tom ersättning).
+        return self.log.read(columns)
+
+    @timed()
+    def append_rows(self, rows, mark=None):
+        # mark(n): anropas med loggens radantal under låset, precis före tillägget (passbuffer-journalen)
+        with self.locked():
+            if mark is not None: mark(self.log.count())
+            self.log.append_many(rows)
+            self.stats.update_many(rows)
+            self.daily.update_many(rows)
+
+    def flush(self):
+        # sparar statistik och rollups som bara finns i minnet (annars i batchar och vid avslut)
+        self.stats.flush()
+        self.daily.flush()
+
+    @timed()
+    def write_log(self, df):
+        with self.locked():
+            self.log.write(df)
+            rebuild(self.stats, df)
+            self.daily.replace(df)
+
+    # --- profil: cache i processen, write-through till profile.json ---
+    @timed()
+    def read_profile(self, defaults: dict = DEFAULT_PROFILE) -> dict:
+        try: st = os.stat(self.profile_path)
+        except FileNotFoundError:
+            self.write_profile(defaults)
+            return copy.deepcopy(defaults)
+        hit = self._profile
+        if hit is None or (hit[0], hit[1]) != (st.st_mtime_ns, st.st_size):
+            # ändrad på disk (annan process) – läs om en gång
+            try:
+                with open(self.profile_path, "r", encoding="utf-8") as f: p = json.load(f)
+            except (OSError, ValueError):
+                return copy.deepcopy(defaults)
+            hit = self._profile = (st.st_mtime_ns, st.st_size, p)
+        return copy.deepcopy(hit[2])
+
+    @timed()
+    def write_profile(self, p: dict):
+        with self.locked():
+            atomic_write_json(self.profile_path, p)
+            st = os.stat(self.profile_path)
+            self._profile = (st.st_mtime_ns, st.st_size, copy.deepcopy(p))
+
+_shards = {}
+_shards_lock = threading.Lock()
+
+def shard_for(data_root, user=None) -> Shard:
+    # en Shard per katalog och process; skapas vid första besöket
+    path = user_dir(data_root, user)
+    key = os.path.abspath(path)
+    s = _shards.get(key)
+    if s is not None: return s
+    with _shards_lock:
+        s = _shards.get(key)
+        if s is None:
+            s = _shards[key] = Shard(path, clean_user_id(user))
+        return s
+
+def list_users(data_root):
+    root = os.path.join(data_root, USERS_DIR)
+    return sorted(d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d))) if os.path.isdir(root) else []
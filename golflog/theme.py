@@ -0,0 +1,45 @@
+import os
+from functools import lru_cache
+from golflog.profiling import timed
+
+# -----------------------------
+# CSS för appen: basfilen och temat byggs en gång och återanvänds på varje rerun
+# -----------------------------
+STYLE_PATH = os.path.join("assets", "style.css")
+_base = None   # (mtime_ns, size, css)
+
+@timed()
+def base_css(path=STYLE_PATH) -> str:
+    # läses om bara när filen ändrats; saknas den blir det ingen bas-CSS
+    global _base
+    try: st = os.stat(path)
+    except FileNotFoundError: return ""
+    hit = _base
+    if hit is None or (hit[0], hit[1]) != (st.st_mtime_ns, st.st_size):
+        with open(path, "r", encoding="utf-8") as f: hit = _base = (st.st_mtime_ns, st.st_size, f"<style>{f.read()}</style>")
+    return hit[2]
+
+@lru_cache(maxsize=32)
+def theme_css(primary_color: str, dark_mode: bool) -> str:
+    if dark_mode:
+        # mörka variabler skriver över standardvärdena
+        return f"""
+        <style>
+        :root {{
+          --primary: {primary_color};
+          --bg: #0B1220;
+          --bg-2: #111827;
+          --text: #E5E7EB;
+          --muted: #9CA3AF;
+          --card-bg: #0f172a;
+          --card-border: #1f2937;
+        }}
+        html, body, .block-container {{ background-color: var(--bg) !important; color: var(--text) !important; }}
+        .stMarkdown, .stText, .stSelectbox, .stNumberInput, .stButton, .stExpander {{ color: var(--text) !important; }}
+        </style>
+        """
+    return f"""
+        <style>
+        :root {{ --primary: {primary_color}; }}
+        </style>
+        """
@@ -0,0 +1,299 @@
+import argparse, importlib.util, json, multiprocessing, os, shutil, sys, threading, time, uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from golflog.logstore import _tmp_name, appender_for, atomic_write_csv, close_appender, file_lock, read_csv_cached
+from golflog.profiling import timed
+from golflog.recommend import CLUBS
+from golflog.swing import MotionEnergy, analyze_many, phases
+from golflog.tenants import TEMPO_COLUMNS, VIDEO_COLUMNS, shard_for
+
+# -----------------------------
+# Svingvideor: strömmad uppladdning, metadataindex, nyckelbilder och förhandsvisning i bakgrunden
+# -----------------------------
+# Originalen ligger i <shard>/videos/, metadata i videos.csv (VIDEO_COLUMNS). En processpool avkodar
+# varje video en gång och sparar i videos/_preview/: poster (<namn>.poster.jpg), nyckelbilder
+# (<namn>.kf.jpg), en kort lågupplöst GIF (<namn>.gif) och fakta (<namn>.json). Samma avkodning mäter
+# tempo och träffbild (golflog.swing), som skrivs in i videos.csv. Biblioteket visar
+# bara dessa – originalfilen läses först när man ber om den. Kräver opencv-python(-headless);
+# utan cv2 sparas och söks videor som vanligt men utan bilder.
+CHUNK = 1 << 20   # 1 MB per skrivning
+VIDEO_EXT = (".mp4", ".mov", ".m4v", ".webm", ".avi")
+PREVIEW_DIR = "_preview"
+KEYFRAMES = 6          # jämnt fördelade över klippet
+PREVIEW_FRAMES = 24    # bilder i GIF:en
+PREVIEW_FPS = 8
+PREVIEW_WIDTH = 240
+POSTER_WIDTH = 320
+QUALITY = 75
+WORKERS = 2
+
+ANGLES = ["Face-on", "Down-the-line", "Bakifrån", "Annan"]
+ENVIRONMENTS = ["Range", "Bana", "Inomhus"]
+MISSES = ["Ingen", "Slice", "Hook", "Push", "Pull", "Topp", "Duff", "Tåträff", "Hälträff"]
+INDEXED = ["klubba", "vinkel", "miss", "miljo"]
+META_DTYPE = {c: "category" for c in INDEXED + ["format"]}
+
+def cv2_available() -> bool:
+    return importlib.util.find_spec("cv2") is not None
+
+# -----------------------------
+# Avkodning (körs i poolens processer)
+# -----------------------------
+def _atomic(path, write):
+    # egen temp-fil per process/tråd: appens pool och "python -m golflog.videos process" kan avkoda samma klipp
+    tmp = _tmp_name(path)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp): os.remove(tmp)
+
+def extract(path, out_dir, keyframes=KEYFRAMES, frames=PREVIEW_FRAMES, width=PREVIEW_WIDTH):
+    # ett varv genom klippet: varje bild går till rörelseenergin, utvalda skalas ned för bilderna
+    import cv2
+    from PIL import Image
+    stem = os.path.basename(path)
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened(): raise ValueError(f"Kan inte läsa {stem}")
+    try:
+        n = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        fps = float(cap.get(cv2.CAP_PROP_FPS) or 0.0)
+        w, h = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if n <= 0:   # vissa behållare saknar bildantal – räkna
+            while cap.grab(): n += 1
+            cap.release(); cap = cv2.VideoCapture(path)
+        if n <= 0: raise ValueError(f"Inga bilder i {stem}")
+        kf_at = np.unique(np.linspace(0, n - 1, keyframes).round().astype(int))
+        gif_at = np.unique(np.linspace(0, n - 1, min(frames, n)).round().astype(int))
+        want = set(kf_at) | set(gif_at)
+        got, i, motion = {}, 0, MotionEnergy()
+        while cap.grab():
+            ok, img = cap.retrieve()
+            if ok: motion.add(img)
+            if ok and i in want:
+                scale = min(1.0, max(width, POSTER_WIDTH) / img.shape[1])
+                img = cv2.resize(img, (max(1, round(img.shape[1] * scale)), max(1, round(img.shape[0] * scale))), interpolation=cv2.INTER_AREA)
+                got[i] = img[:, :, ::-1]   # BGR -> RGB
+            i += 1
+    finally:
+        cap.release()
+    if not got: raise ValueError(f"Kunde inte avkoda {stem}")
+    pil = {k: Image.fromarray(np.ascontiguousarray(v)) for k, v in got.items()}
+    small = lambda im, wd: im if im.width <= wd else im.resize((wd, max(1, round(im.height * wd / im.width))), Image.LANCZOS)
+    os.makedirs(out_dir, exist_ok=True)
+    base = os.path.join(out_dir, stem)
+    # CAP_PROP_FRAME_COUNT kan lova fler bilder än som går att avkoda – ta då de bilder som finns
+    decoded = [pil[k] for k in sorted(pil)]
+    kf = [pil[k] for k in kf_at if k in pil] or [decoded[len(decoded) // 2]]
+    poster = kf[len(kf) // 2]
+    _atomic(base + ".poster.jpg", lambda p: small(poster, POSTER_WIDTH).convert("RGB").save(p, "JPEG", quality=QUALITY))
+    # nyckelbilder som ett rutnät (3 per rad) – en fil att visa i stället för sex
+    tiles = [small(im, width) for im in kf]
+    cols = min(3, len(tiles)); rows = -(-len(tiles) // cols)
+    tw, th = tiles[0].width, tiles[0].height
+    sheet = Image.new("RGB", (cols * tw, rows * th))
+    for k, im in enumerate(tiles): sheet.paste(im, ((k % cols) * tw, (k // cols) * th))
+    _atomic(base + ".kf.jpg", lambda p: sheet.save(p, "JPEG", quality=QUALITY))
+    anim = [small(pil[k], width).convert("P", palette=Image.ADAPTIVE) for k in gif_at if k in pil] \
+        or [small(im, width).convert("P", palette=Image.ADAPTIVE) for im in kf]
+    _atomic(base + ".gif", lambda p: anim[0].save(p, "GIF", save_all=True, append_images=anim[1:],
+                                                   duration=int(1000 / PREVIEW_FPS), loop=0, optimize=True))
+    info = {"bilder": n, "fps": round(fps, 2), "sekunder": round(n / fps, 2) if fps else None,
+            "bredd": w, "höjd": h, "nyckelbilder": [int(k) for k in kf_at]}
+    info.update(phases(motion.energy(), fps or 30.0) or {c: None for c in TEMPO_COLUMNS})
+    def dump(p):
+        with open(p, "w", encoding="utf-8") as f: json.dump(info, f, ensure_ascii=False)
+    _atomic(base + ".json", dump)
+    return info
+
+_pool = None
+_pool_lock = threading.Lock()
+_pending = {}   # abspath -> Future
+
+def _executor():
+    # spawn: Streamlit kör trådar, och fork av en trådad process är riskabelt
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def submit(path, out_dir, on_done=None):
+    # on_done(info) körs i föräldraprocessen när extract lyckats
+    if not cv2_available(): return None
+    key = os.path.abspath(path)
+    with _pool_lock:
+        fut = _pending.get(key)
+        if fut is not None and not fut.done(): return fut
+    fut = _executor().submit(extract, path, out_dir)
+    with _pool_lock: _pending[key] = fut
+    if on_done: fut.add_done_callback(lambda f: f.exception() is None and on_done(f.result()))
+    return fut
+
+# -----------------------------
+# Bibliotek per shard
+# -----------------------------
+class VideoLibrary:
+    def __init__(self, video_dir, meta_path):
+        self.dir = video_dir
+        self.meta = meta_path
+        self.preview_dir = os.path.join(video_dir, PREVIEW_DIR)
+        self._index = None   # (df, {kolumn: {värde: radpositioner}})
+        self._lock = threading.Lock()
+
+    def read(self) -> pd.DataFrame:
+        # delad, cachad ram (läses om inkrementellt när videos.csv växer)
+        return read_csv_cached(self.meta, VIDEO_COLUMNS, dtype=META_DTYPE)
+
+    def _indexes(self, df):
+        with self._lock:
+            if self._index is None or self._index[0] is not df:
+                self._index = (df, {c: df.groupby(c, observed=True, sort=False).indices for c in INDEXED})
+            return self._index[1]
+
+    @timed()
+    def query(self, offset=0, limit=None, **filters):
+        # filters: klubba/vinkel/miss/miljo = värde (None/"" = alla). Nyast först; (sida, antal träffar)
+        df = self.read()
+        idx = self._indexes(df)
+        pos = None
+        for c, v in filters.items():
+            if c not in idx: raise ValueError(f"Kan inte filtrera på {c}")
+            if not v: continue
+            hit = idx[c].get(v, np.empty(0, dtype=np.intp))
+            pos = hit if pos is None else np.intersect1d(pos, hit, assume_unique=True)
+        pos = np.arange(len(df)) if pos is None else np.sort(pos)
+        pos = pos[::-1]
+        page = pos[offset:None if limit is None else offset + limit]
+        return df.iloc[page].reset_index(drop=True), len(pos)
+
+    def ingest(self, upload, klubba="", vinkel="", miljo="", miss="", kommentar="", prefix="swing"):
+        # upload är ett filobjekt (Streamlit UploadedFile eller öppen fil); kopieras i bitar till disk
+        ext = os.path.splitext(getattr(upload, "name", ""))[1].lower()
+        if ext not in VIDEO_EXT: raise ValueError(f"Okänt videoformat {ext or '(inget)'} – använd {', '.join(VIDEO_EXT)}")
+        ts = datetime.now()
+        name = f"{prefix}_{ts:%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:6]}{ext}"
+        path = os.path.join(self.dir, name)
+        if hasattr(upload, "seek"): upload.seek(0)
+        with open(path + ".part", "wb") as f:
+            shutil.copyfileobj(upload, f, CHUNK)
+        os.replace(path + ".part", path)
+        appender_for(self.meta, VIDEO_COLUMNS).append({
+            "ts": ts.isoformat(timespec="seconds"), "filnamn": name, "storlek_bytes": os.path.getsize(path),
+            "format": ext.lstrip("."), "vinkel": vinkel, "klubba": klubba, "miljo": miljo, "miss": miss,
+            "kommentar": kommentar})
+        submit(path, self.preview_dir, lambda info: self.record({name: info}))
+        return name
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    def asset(self, name, kind):
+        # kind: poster.jpg, kf.jpg, gif eller json; None om den inte finns (än)
+        p = os.path.join(self.preview_dir, f"{name}.{kind}")
+        return p if os.path.exists(p) else None
+
+    def info(self, name) -> dict:
+        p = self.asset(name, "json")
+        if p is None: return {}
+        with open(p, "r", encoding="utf-8") as f: return json.load(f)
+
+    def status(self, name) -> str:
+        if self.asset(name, "json"): return "klar"
+        fut = _pending.get(os.path.abspath(self.path(name)))
+        if fut is not None:
+            if not fut.done(): return "bearbetas"
+            if fut.exception() is not None: return "fel"
+        return "väntar" if cv2_available() else "ingen cv2"
+
+    def process_missing(self):
+        # köa videor utan förhandsvisning (t.ex. efter omstart eller när cv2 installerats) -> {namn: Future}
+        names = [n for n in self.read()["filnamn"].dropna() if self.asset(n, "json") is None and os.path.exists(self.path(n))]
+        futs = {n: submit(self.path(n), self.preview_dir) for n in names}
+        return {n: f for n, f in futs.items() if f is not None}
+
+    def record(self, results):
+        # {filnamn: dict med TEMPO_COLUMNS} -> videos.csv i en omskrivning under exklusivt lås
+        if not results: return 0
+        close_appender(self.meta)
+        with file_lock(self.meta):
+            df = pd.read_csv(self.meta, encoding="utf-8")
+            for c in VIDEO_COLUMNS:
+                if c not in df.columns: df[c] = np.nan
+            hit = df["filnamn"].isin(list(results))
+            for c in TEMPO_COLUMNS:
+                df[c] = df[c].astype(object)
+                df.loc[hit, c] = [results[n].get(c) for n in df.loc[hit, "filnamn"]]
+            atomic_write_csv(df[VIDEO_COLUMNS], self.meta)
+        return int(hit.sum())
+
+    def analyze(self, names=None, workers=None):
+        # tempo för videor som saknar det (eller names), över en processpool; en omskrivning av videos.csv
+        df = self.read()
+        if names is None: names = df.loc[pd.to_numeric(df["tempo"], errors="coerce").isna(), "filnamn"].dropna().tolist()
+        paths = {self.path(n): n for n in names if os.path.exists(self.path(n))}
+        results, errors = {}, {}
+        for p, r in analyze_many(paths, workers):
+            if isinstance(r, Exception): errors[paths[p]] = str(r)
+            else: results[paths[p]] = r
+        self.record(results)
+        return results, errors
+
+_libraries = {}
+_libraries_lock = threading.Lock()
+
+def library_for(shard) -> VideoLibrary:
+    key = os.path.abspath(shard.video_meta)
+    with _libraries_lock:
+        lib = _libraries.get(key)
+        if lib is None: lib = _libraries[key] = VideoLibrary(shard.video_dir, shard.video_meta)
+        return lib
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m golflog.videos", description="Svingvideor: importera, skapa förhandsvisningar, mät tempo och sök.")
+    ap.add_argument("kommando", choices=["import", "process", "tempo", "list"])
+    ap.add_argument("filer", nargs="*", help="videofiler att importera")
+    ap.add_argument("--data-dir", default="data")
+    ap.add_argument("--user", default=None, help="golfare (standard: den delade katalogen)")
+    ap.add_argument("--klubba", default="", choices=[""] + CLUBS)
+    ap.add_argument("--vinkel", default="", choices=[""] + ANGLES)
+    ap.add_argument("--miljo", default="", choices=[""] + ENVIRONMENTS)
+    ap.add_argument("--miss", default="", choices=[""] + MISSES)
+    ap.add_argument("--workers", type=int, default=None, help="processer för tempo (standard: antal kärnor)")
+    args = ap.parse_args(argv)
+    lib = library_for(shard_for(args.data_dir, args.user))
+    meta = {"klubba": args.klubba, "vinkel": args.vinkel, "miljo": args.miljo, "miss": args.miss}
+    if args.kommando == "import":
+        for p in args.filer:
+            try:
+                with open(p, "rb") as f: print(f"{p} -> {lib.ingest(f, **meta)}")
+            except ValueError as e:
+                print(f"{p}: {e}"); return 1
+    if args.kommando in ("import", "process"):
+        if not cv2_available():
+            print("cv2 saknas – installera opencv-python-headless för nyckelbilder och förhandsvisning."); return 0
+        futs, done, bad = lib.process_missing(), {}, 0
+        for n, f in futs.items():
+            try: done[n] = f.result()
+            except Exception as e: bad += 1; print(f"{n}: {e}")
+        lib.record(done)
+        print(f"{len(done)} förhandsvisningar klara" + (f", {bad} fel" if bad else ""))
+        return 1 if bad else 0
+    if args.kommando == "tempo":
+        if not cv2_available():
+            print("cv2 saknas – installera opencv-python-headless för tempomätning."); return 1
+        t0 = time.perf_counter()
+        results, errors = lib.analyze(workers=args.workers)
+        for n, r in results.items(): print(f"{n}: tempo {r['tempo']}:1, träff {r['traff_s']:.2f} s")
+        for n, e in errors.items(): print(f"{n}: {e}")
+        dt = time.perf_counter() - t0
+        print(f"{len(results)} videor mätta på {dt:.1f} s" + (f", {len(errors)} utan sving" if errors else ""))
+        return 0
+    page, total = lib.query(**meta)
+    print(page.to_string(index=False) if total else "Inga videor.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
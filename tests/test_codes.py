@@ -0,0 +1,14 @@
+from golflog import codes
+
+# rundturen CSV -> koder -> CSV/Parquet -> CSV på en syntetisk logg med okända kategorier
+
+def test_roundtrip_with_unknown_categories(tmp_path):
+    r = codes.roundtrip(codes.synthetic_log(str(tmp_path / "logg.csv")))
+    assert r["csv"] and r["värden"] and r["parquet"], r
+    assert len(r["okända"]["moment"]) == 200 and r["okända"]["klubba"]
+    assert r["kodtyper"]["moment"] == "int16" and r["segmentindex"] == ["int16"]   # ordlistan har växt förbi 127
+
+def test_roundtrip_small_vocabulary_stays_int8(tmp_path):
+    r = codes.roundtrip(codes.synthetic_log(str(tmp_path / "logg.csv"), rows=500, unknown=5))
+    assert r["csv"] and r["värden"] and r["parquet"], r
+    assert set(r["kodtyper"].values()) == {"int8"} and r["segmentindex"] == ["int8"]
@@ -0,0 +1,120 @@
+import itertools
+import pandas as pd
+from golflog.feedback import CLEAR_TIPS, feedback_table, tips_per_shot, trackman_feedback
+
+# -----------------------------
+# De gamla if-kedjorna (app.py resp. "app.py 5.py" före regeltabellen), ordagrant som referens
+# -----------------------------
+def old_feedback_app(data: dict, club: str, mode: str):
+    bs = data.get("ball_speed") or 0
+    launch = data.get("launch") or 0
+    spin = data.get("spin") or 0
+    h = data.get("height") or 0
+    aoa = data.get("aoa") or 0
+    path = data.get("path") or 0
+    f2p = data.get("face_to_path") or 0
+
+    tips = []
+    if club == "Driver":
+        if bs > 0:
+            ideal_launch = 12 if bs < 150 else 14 if bs < 165 else 15.5
+            if launch < ideal_launch-2: tips.append(f"Öka launch: högre tee, boll längre fram, mer tilt (mål ~{ideal_launch}°).")
+            if launch > ideal_launch+3: tips.append(f"Sänk launch något: lägre tee/neutral loft (mål ~{ideal_launch}°).")
+        if spin > 0 and spin > 3000: tips.append("För hög spinn: träffa mer uppåt (+AoA), minska loft/mer fram flytt av vikt.")
+        if spin > 0 and spin < 1600: tips.append("Väldigt låg spinn: risk för dippar – mer loft eller mindre uppåt‑träff.")
+        if aoa < -1: tips.append("AoA negativ: träna slå **uppåt** på bollen (boll längre fram, hög tee).")
+        if path > 2 and f2p > 2: tips.append("Path inifrån + face stängd → risk hook; neutralisera face/release.")
+        if path < -2 and f2p < -2: tips.append("Path utifrån + face öppen → risk slice; starkare grepp, in-to-out.")
+    else:  # järn
+        if launch < 14: tips.append("Låg launch: mer shaft lean kontrollerat, ren bollkontakt efter bollen.")
+        if launch > 22: tips.append("Hög launch: kolla loft/dynamic loft, träffa nedåt genom bollen.")
+        if spin > 0 and spin < 5000: tips.append("Låg spinn för järn: renare träff & rätt bollval/loft.")
+        if h < 18: tips.append("Låg topphöjd: sikta ~25–35 m med 7i – håll tempo och full finish.")
+        if abs(f2p) > 2.5: tips.append("Stor face/path-diff → jobba mot neutralare face till path.")
+
+    if not tips:
+        tips = ["Värdena ser rimliga ut för denna klubba. Fortsätt!"]
+    if mode == "Avancerad":
+        tips.append("Avancerat: filma DTL + FO och jämför release/sekvens med drillen.")
+    return tips
+
+def old_feedback_app5(data: dict, club: str, mode: str):
+    ball_speed = data.get("ball_speed") or 0
+    launch = data.get("launch") or 0
+    spin = data.get("spin") or 0
+    height = data.get("height") or 0
+    angle_of_attack = data.get("aoa") or 0
+    club_path = data.get("path") or 0
+    face_to_path = data.get("face_to_path") or 0
+    tips = []
+    if club=="Driver":
+        if ball_speed>0:
+            ideal_launch = 12 if ball_speed<150 else 14 if ball_speed<165 else 15.5
+            if launch < ideal_launch-2: tips.append(f"Öka startvinkel: högre tee, bollen längre fram, mer tilt (mål ~{ideal_launch}°).")
+            if launch > ideal_launch+3: tips.append(f"Sänk startvinkel: lägre tee/neutral loft (mål ~{ideal_launch}°).")
+        if spin>3000: tips.append("Hög spinn: träffa mer uppåt (positiv Angle of Attack) eller minska loft.")
+        if 0<spin<1600: tips.append("Väldigt låg spinn: mer loft eller mindre uppåtsving för höjdkontroll.")
+        if angle_of_attack<-1: tips.append("Angle of Attack negativ: träna uppåtträff (boll fram, hög tee).")
+        if club_path<-2 and face_to_path<-2: tips.append("Utifrån‑in + öppet face → slice‑risk: starkare grepp & inifrån‑sving.")
+        if club_path>2 and face_to_path>2: tips.append("Inifrån‑ut + stängt face → hook‑risk: neutralisera face/release.")
+    else:
+        if launch<14: tips.append("Låg startvinkel: kontrollerad shaft‑lean och ren bollkontakt efter bollen.")
+        if launch>22: tips.append("Hög startvinkel: minska dynamiskt loft, träffa nedåt genom bollen.")
+        if 0<spin<5000: tips.append("Låg spinn för järn: renare träff & rätt boll/loft.")
+        if height<18: tips.append("Låg topphöjd: sikta ~25–35 m med 7i – håll tempo och full finish.")
+        if abs(face_to_path)>2.5: tips.append("Stor skillnad mellan face och svingriktning → jobba neutralare face‑till‑path.")
+    if not tips: tips = ["Värdena ser rimliga ut. Fortsätt!"]
+    if mode=="Avancerad": tips.append("Avancerat: filma från bakom (Down The Line) och framifrån (Face On) och jämför sekvens/release med drillen.")
+    return tips
+
+# rutnät runt varje tröskel (ideal launch 12/14/15.5 ± marginalerna, spinngränserna, face/path ±2/2.5 …)
+GRID = {
+    "ball_speed": [0, 149.9, 150, 165, 180],
+    "launch": [9.9, 10, 12, 13.5, 15, 17.1, 18.5, 22, 22.1],
+    "spin": [0, 1599, 1600, 3000, 3001, 5000],
+    "height": [17.9, 18],
+    "aoa": [-1.1, -1],
+    "path": [-2.1, 0, 2.1],
+    "face_to_path": [-2.6, -2.1, 2.1, 2.5, 2.6],
+}
+CLUBS = ["Driver", "7i"]
+MODES = ["Auto", "Enkel", "Avancerad"]
+
+def _records(shots):
+    # formuläret skickar None för tomma fält; tabellen har NaN på samma plats
+    return [{k: (None if v != v else v) for k, v in r.items()} for r in shots.to_dict("records")]
+
+def _shots():
+    rows = [dict(zip(GRID, vals), klubba=club) for club in CLUBS for vals in itertools.product(*GRID.values())]
+    # saknade värden räknas som 0 i båda vägarna
+    rows += [{"klubba": club, "ball_speed": None, "launch": float("nan")} for club in CLUBS]
+    return pd.DataFrame(rows)
+
+# -----------------------------
+# Regeltabellen ger samma tips, i samma ordning, som de gamla if-kedjorna
+# -----------------------------
+def test_scalar_feedback_matches_old_if_chains():
+    shots = _shots()
+    for data in _records(shots):
+        for mode in MODES:
+            assert trackman_feedback(data, data["klubba"], mode) == old_feedback_app(data, data["klubba"], mode), (data, mode)
+            assert trackman_feedback(data, data["klubba"], mode, tips=CLEAR_TIPS) == old_feedback_app5(data, data["klubba"], mode), (data, mode)
+
+def test_feedback_table_matches_scalar_feedback_row_by_row():
+    shots = _shots()
+    records = _records(shots)
+    for mode in MODES:
+        long = feedback_table(shots, mode)
+        per_shot = long.groupby("slag", sort=True)["tips"].agg(list)
+        assert list(per_shot.index) == list(range(len(shots)))   # varje slag har minst ett tips
+        for i, data in enumerate(records):
+            assert per_shot[i] == trackman_feedback(data, data["klubba"], mode), (data, mode)
+        assert tips_per_shot(shots, mode).tolist() == per_shot.tolist()
+
+def test_feedback_table_with_fixed_club_and_empty_frame():
+    shots = _shots().drop(columns="klubba").head(200)
+    long = feedback_table(shots, "Enkel", klubba="Driver")
+    for i, data in enumerate(shots.to_dict("records")):
+        assert long.loc[long["slag"] == i, "tips"].tolist() == old_feedback_app(data, "Driver", "Enkel")
+    empty = pd.DataFrame(columns=["klubba"] + list(GRID))
+    assert feedback_table(empty).empty and tips_per_shot(empty).empty
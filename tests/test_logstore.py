@@ -0,0 +1,60 @@
+import os
+import pandas as pd
+from golflog import logstore
+from golflog.logstore import FSYNC_EVERY, CsvAppender, atomic_write_csv, read_csv_cached
+from golflog.storage import COLUMNS
+
+def _rows(n, start=0):
+    return [{"datum": "2026-10-01", "pass": "Range", "kategori": "Längdkontroll", "moment": "Carry",
+             "klubba": "7i", "värde": 140 + i, "anteckning": ""} for i in range(start, start + n)]
+
+# -----------------------------
+# CsvAppender: O_APPEND, batchad fsync, ny fil efter omskrivning
+# -----------------------------
+def test_appends_are_fsynced_in_batches(tmp_path, monkeypatch):
+    path = str(tmp_path / "logg.csv")
+    synced = []
+    real = os.fsync
+    monkeypatch.setattr(logstore.os, "fsync", lambda fd: (synced.append(fd), real(fd)))
+    monkeypatch.setattr(logstore, "FSYNC_INTERVAL", 3600.0)
+    a = CsvAppender(path, COLUMNS)
+    for r in _rows(FSYNC_EVERY - 1): a.append(r)
+    assert synced == []
+    a.append(_rows(1)[0])
+    assert len(synced) == 1
+    a.append_many(_rows(3)); a.close()   # close synkar resten
+    assert len(synced) == 2
+    assert len(pd.read_csv(path)) == FSYNC_EVERY + 3
+
+def test_appender_follows_atomic_rewrite(tmp_path):
+    path = str(tmp_path / "logg.csv")
+    a = CsvAppender(path, COLUMNS)
+    a.append_many(_rows(3))
+    atomic_write_csv(pd.read_csv(path).head(1), path)   # som en helomskrivning i en annan process
+    a.append_many(_rows(2, 10)); a.close()
+    assert pd.read_csv(path)["värde"].tolist() == [140, 150, 151]
+
+def test_appender_completes_old_header_and_last_line(tmp_path):
+    path = str(tmp_path / "logg.csv")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("datum,pass,kategori,moment,klubba,värde\n2026-01-01,Range,Längdkontroll,Carry,7i,130")
+    a = CsvAppender(path, COLUMNS)
+    a.append_many(_rows(1)); a.close()
+    df = pd.read_csv(path, keep_default_na=False)
+    assert list(df.columns) == COLUMNS and df["värde"].tolist() == [130, 140]
+
+# -----------------------------
+# read_csv_cached: bara svansen läses, halva rader väntar
+# -----------------------------
+def test_cached_read_picks_up_appended_tail_only_when_complete(tmp_path):
+    path = str(tmp_path / "logg.csv")
+    a = CsvAppender(path, COLUMNS)
+    a.append_many(_rows(2))
+    first = read_csv_cached(path, COLUMNS)
+    assert len(first) == 2 and read_csv_cached(path, COLUMNS) is first
+    with open(path, "ab") as f: f.write(b"2026-10-02,Range,L")   # halvskriven rad
+    assert len(read_csv_cached(path, COLUMNS)) == 2
+    with open(path, "ab") as f: f.write("ängdkontroll,Carry,7i,160,\n".encode("utf-8"))
+    df = read_csv_cached(path, COLUMNS)
+    assert df["värde"].tolist() == [140, 141, 160]
+    a.close()
@@ -0,0 +1,115 @@
+import math
+import numpy as np
+import pandas as pd
+import pytest
+from golflog.bench import synth_log
+from golflog.metrics import MIN_CARRY_SHOTS, aggregate, club_metrics, global_metrics, metrics_table, table_from_aggregate
+from golflog.recommend import CLUBS
+from golflog.storage import COLUMNS, SqliteBackend
+
+# -----------------------------
+# Gamla compute_metrics / compute_club_metrics_for (före groupby-motorn) som referens.
+# Enda avsiktliga skillnaden: carry std kräver MIN_CARRY_SHOTS numeriska carries även per klubba.
+# -----------------------------
+def old_compute_metrics(df):
+    res = {"clean_rate":None,"driver_slice_rate":None,"driver_hook_rate":None,
+           "carry_std_7i":None,"carry_std_driver":None,"short_putt_make":None,"chip_within2_rate":None}
+    if df.empty: return res
+    tb = df[(df["pass"]=="Range") & (df["kategori"]=="Träffbild")]
+    if not tb.empty: res["clean_rate"] = (tb["moment"]=="Mitt i").sum()/len(tb)
+    dv = df[(df["pass"]=="Range") & (df["kategori"]=="Driver")]
+    if not dv.empty:
+        res["driver_slice_rate"] = (dv["moment"]=="Slice").sum()/len(dv)
+        res["driver_hook_rate"]  = (dv["moment"]=="Hook").sum()/len(dv)
+    lc = df[(df["pass"]=="Range") & (df["kategori"]=="Längdkontroll") & (df["moment"]=="Carry")].copy()
+    if not lc.empty:
+        lc["värde"] = pd.to_numeric(lc["värde"], errors="coerce")
+        c7 = lc[lc["klubba"]=="7i"]["värde"].dropna()
+        cd = lc[lc["klubba"]=="Driver"]["värde"].dropna()
+        res["carry_std_7i"] = float(c7.std()) if len(c7)>=3 else None
+        res["carry_std_driver"] = float(cd.std()) if len(cd)>=3 else None
+    ch = df[(df["pass"]=="Närspel") & (df["kategori"]=="Chippar")]
+    if not ch.empty: res["chip_within2_rate"] = (ch["moment"]=="Inom 2m").sum()/len(ch)
+    pt = df[(df["kategori"]=="Puttning")]
+    if not pt.empty:
+        makes = (pt["moment"]=="Kortputt i hål").sum()
+        res["short_putt_make"] = None if makes==0 else 1.0
+    return res
+
+def old_compute_club_metrics_for(df, klubba):
+    r = df.copy()
+    m = {"center":None, "toe":None, "heel":None, "thin":None, "fat":None, "flush":None, "carry_std":None, "slice":None, "hook":None}
+    if r.empty: return m
+    tb = r[(r["pass"]=="Range") & (r["kategori"]=="Träffbild") & (r["klubba"]==klubba)]
+    if not tb.empty:
+        tot = len(tb); m["center"] = (tb["moment"]=="Mitt i").sum()/tot
+        m["toe"] = (tb["moment"]=="Tåträff").sum()/tot; m["heel"] = (tb["moment"]=="Hälträff").sum()/tot
+    kt = r[(r["pass"]=="Range") & (r["kategori"]=="Kontakt") & (r["klubba"]==klubba)]
+    if not kt.empty:
+        tot = len(kt); m["thin"] = (kt["moment"]=="Topp").sum()/tot; m["fat"] = (kt["moment"]=="Duff").sum()/tot; m["flush"] = (kt["moment"]=="Flush").sum()/tot
+    lc = r[(r["pass"]=="Range") & (r["kategori"]=="Längdkontroll") & (r["moment"]=="Carry") & (r["klubba"]==klubba)].copy()
+    if not lc.empty:
+        lc["värde"] = pd.to_numeric(lc["värde"], errors="coerce")
+        carries = lc["värde"].dropna()
+        m["carry_std"] = float(carries.std()) if len(carries)>=MIN_CARRY_SHOTS else None
+    if klubba=="Driver":
+        dv = r[(r["pass"]=="Range") & (r["kategori"]=="Driver")]
+        if not dv.empty:
+            tot = len(dv); m["slice"] = (dv["moment"]=="Slice").sum()/tot; m["hook"] = (dv["moment"]=="Hook").sum()/tot
+    return m
+
+def _same(new: dict, old: dict):
+    assert new.keys() == old.keys()
+    for k in old:
+        if old[k] is None or new[k] is None:
+            assert new[k] is old[k] is None, (k, new[k], old[k])
+        else:
+            assert math.isclose(new[k], old[k], rel_tol=1e-9, abs_tol=1e-12), (k, new[k], old[k])
+
+def _carries(klubba, values):
+    return pd.DataFrame([{"datum": "2026-10-01", "pass": "Range", "kategori": "Längdkontroll", "moment": "Carry",
+                          "klubba": klubba, "värde": v, "anteckning": ""} for v in values])[COLUMNS]
+
+def _logs():
+    big = synth_log(5000, seed=3)
+    small = synth_log(60, seed=7)   # få rader -> klubbor med 0–2 carries och tomma kategorier
+    # carry med för få numeriska värden (raderna räcker, värdena inte), tomma/icke-numeriska värden
+    few = pd.concat([_carries("7i", [140, "", 150, "x"]), _carries("Driver", [230, 240, 250]),
+                     _carries("5i", [170, 171])], ignore_index=True)
+    mixed = pd.concat([small, few], ignore_index=True)
+    mixed.loc[mixed.index[::11], "klubba"] = np.nan   # rader utan klubba räknas bara i totalerna
+    return {"synth": big, "small": small, "few_carries": few, "mixed": mixed,
+            "empty": pd.DataFrame(columns=COLUMNS)}
+
+# -----------------------------
+# Groupby-motorn ger samma nyckeltal som de gamla filtren
+# -----------------------------
+@pytest.mark.parametrize("name", list(_logs()))
+def test_metrics_match_old_engine(name):
+    df = _logs()[name]
+    table = table_from_aggregate(aggregate(df))
+    _same(global_metrics(table), old_compute_metrics(df))
+    for klubba in CLUBS + ["5i", "Finns inte"]:
+        _same(club_metrics(table, klubba), old_compute_club_metrics_for(df, klubba))
+
+def test_carry_std_needs_min_numeric_shots():
+    table = metrics_table(_logs()["few_carries"])
+    assert club_metrics(table, "7i")["carry_std"] is None        # 4 rader men bara 2 tal
+    assert club_metrics(table, "5i")["carry_std"] is None
+    assert club_metrics(table, "Driver")["carry_std"] == pytest.approx(10.0)
+    assert global_metrics(table)["carry_std_driver"] == pytest.approx(10.0)
+
+def test_empty_log_gives_empty_table_and_no_metrics():
+    table = metrics_table(pd.DataFrame(columns=COLUMNS))
+    assert table.empty
+    assert all(v is None for v in global_metrics(table).values())
+    assert all(v is None for v in club_metrics(table, "7i").values())
+
+def test_sqlite_aggregate_matches_frame(tmp_path):
+    df = _logs()["mixed"]
+    db = SqliteBackend(str(tmp_path)); db.init()
+    db.append_many(df.to_dict("records"))
+    table = table_from_aggregate(db.aggregate())
+    _same(global_metrics(table), old_compute_metrics(df))
+    for klubba in CLUBS:
+        _same(club_metrics(table, klubba), old_compute_club_metrics_for(df, klubba))
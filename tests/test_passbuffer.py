@@ -0,0 +1,71 @@
+import json, os
+from golflog.logstore import close_appender, file_lock
+from golflog.passbuffer import PassBuffer, _written, replay_journal, replay_journals_once
+from golflog.storage import CsvBackend
+
+def _rows(n, klubba="7i"):
+    return [{"datum": "2026-10-01", "pass": "Range", "kategori": "Träffbild", "moment": "Mitt i",
+             "klubba": klubba, "värde": 1, "anteckning": ""} for _ in range(n)]
+
+def _log(tmp_path):
+    log = CsvBackend(str(tmp_path)); log.init()
+    return log
+
+def _sink(log):
+    def sink(rows, mark):
+        mark(log.count())
+        log.append_many(rows)
+        close_appender(log.path)   # som en process som dör: raderna står i filen
+    return sink
+
+def _journal(path, rows, marker=None):
+    with open(path, "w", encoding="utf-8") as f:
+        for i, r in enumerate(rows, start=1): f.write(json.dumps({"seq": i, "row": r}, ensure_ascii=False) + "\n")
+        if marker is not None: f.write(json.dumps(marker) + "\n")
+
+# -----------------------------
+# Uppspelning efter krasch mitt i en flush
+# -----------------------------
+def test_written_treats_empty_club_like_csv_nan(tmp_path):
+    log = _log(tmp_path)
+    rows = _rows(2, klubba="") + _rows(1, klubba=None)
+    _sink(log)(rows, lambda at: None)
+    assert log.read()["klubba"].isna().all()
+    assert _written(log, 0, rows)
+    assert not _written(log, 0, _rows(3))
+
+def test_replay_skips_batch_that_reached_the_log(tmp_path):
+    log = _log(tmp_path)
+    rows = _rows(3, klubba="")
+    _sink(log)(rows, lambda at: None)                   # batchen hann skrivas ...
+    path = str(tmp_path / "s.jsonl")
+    _journal(path, rows + _rows(1), {"flushing": 3, "at": 0})   # ... men inte {"flushed"}
+    assert replay_journal(path, _sink(log), log) == 1      # bara slaget efter batchen
+    assert len(log.read()) == 4 and not os.path.exists(path)
+
+def test_replay_writes_batch_that_never_reached_the_log(tmp_path):
+    log = _log(tmp_path)
+    path = str(tmp_path / "s.jsonl")
+    _journal(path, _rows(3, klubba=""), {"flushing": 3, "at": 0})
+    assert replay_journal(path, _sink(log), log) == 3
+    assert len(log.read()) == 3
+
+def test_replay_skips_journals_held_by_a_live_buffer(tmp_path):
+    log = _log(tmp_path)
+    jdir = tmp_path / "journal"; jdir.mkdir()
+    _journal(str(jdir / "dead.jsonl"), _rows(2))
+    held = str(jdir / "live.jsonl")
+    _journal(held, _rows(5))
+    with file_lock(held):   # en buffert i en annan process
+        assert replay_journals_once(str(jdir), _sink(log), log) == 2
+    assert os.path.exists(held) and not os.path.exists(jdir / "dead.jsonl")
+    assert len(log.read()) == 2
+
+def test_buffer_flushes_in_batches_and_clears_journal(tmp_path):
+    log = _log(tmp_path)
+    path = str(tmp_path / "journal" / "s.jsonl")
+    buf = PassBuffer(path, _sink(log), flush_every=3)
+    for r in _rows(4): buf.add(r)
+    assert len(log.read()) == 3 and buf.pending == 1
+    assert buf.close() == 1
+    assert len(log.read()) == 4 and not os.path.exists(path)
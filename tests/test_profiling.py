@@ -0,0 +1,26 @@
+import pstats, threading
+from golflog import profiling
+
+def _work():
+    return sum(range(1000))
+
+def _calls(profiler, name):
+    return sum(v[1] for k, v in pstats.Stats(profiler).stats.items() if k[2] == name)
+
+def test_rerun_cut_short_does_not_leave_profiler_running(tmp_path):
+    profiling.begin_rerun("avbruten", profile=True)   # st.rerun()/st.stop(): end_rerun körs aldrig
+    cut = profiling._local.run.profiler
+    profiling.begin_rerun("nästa", profile=True)
+    _work()
+    rec = profiling.end_rerun(str(tmp_path))
+    assert rec["profile"] and not profiling._profilers
+    cut.create_stats()
+    assert _calls(cut, "_work") == 0   # den gamla profileraren slutade samla när nästa rerun började
+
+def test_profiler_from_finished_thread_is_stopped(tmp_path):
+    t = threading.Thread(target=profiling.begin_rerun, args=("tråd",), kwargs={"profile": True})
+    t.start(); t.join()
+    assert t.ident in profiling._profilers
+    profiling.begin_rerun("huvud", profile=True)
+    assert t.ident not in profiling._profilers
+    profiling.end_rerun(str(tmp_path))
@@ -0,0 +1,74 @@
+import glob, os
+import pandas as pd
+import pytest
+from golflog import shots
+from golflog.shots import COMPACT_PARTS, ShotTable, backfill
+from golflog.storage import COLUMNS
+
+def _log():
+    rows = [{"datum": "2026-09-0%d" % (1 + i % 3), "pass": "Range", "kategori": "LM", "moment": "launch/spin",
+             "klubba": "Driver" if i % 2 else "7i", "värde": 12.5 + i,
+             "anteckning": f"spin {2500 + 10 * i} rpm; bs {150 + i}.0 mph; img bild{i}.png"} for i in range(5)]
+    rows.append({"datum": "2026-09-01", "pass": "Range", "kategori": "Längdkontroll", "moment": "Carry",
+                 "klubba": "7i", "värde": 150, "anteckning": ""})
+    return pd.DataFrame(rows)[COLUMNS]
+
+def _marker(t): return os.path.join(t.root, "_backfilled.json")
+
+# -----------------------------
+# Backfill: en gång, även om processen dör halvvägs
+# -----------------------------
+def test_backfill_parses_lm_rows_once(tmp_path):
+    t = ShotTable(str(tmp_path / "shots"))
+    assert backfill(t, _log()) == 5
+    df = t.read()
+    assert df["spin"].tolist() == [2500, 2510, 2520, 2530, 2540]
+    assert df["ball_speed"].tolist() == [150, 151, 152, 153, 154]
+    assert df["img"].tolist()[0] == "bild0.png" and set(df["källa"]) == {"backfill"}
+    assert backfill(t, _log()) == 0 and len(t.read()) == 5
+
+def test_backfill_crash_before_marker_is_not_repeated(tmp_path, monkeypatch):
+    t = ShotTable(str(tmp_path / "shots"))
+    def crash(path, obj): raise KeyboardInterrupt
+    monkeypatch.setattr(shots, "atomic_write_json", crash)
+    with pytest.raises(KeyboardInterrupt): backfill(t, _log())
+    monkeypatch.undo()
+    assert len(t.read()) == 5 and not os.path.exists(_marker(t))
+    fresh = ShotTable(t.root)   # ny process
+    assert backfill(fresh, _log()) == 0
+    assert len(fresh.read()) == 5 and os.path.exists(_marker(t))
+
+def test_backfill_crash_while_writing_part_starts_over(tmp_path, monkeypatch):
+    t = ShotTable(str(tmp_path / "shots"))
+    def crash(src, dst): raise KeyboardInterrupt
+    monkeypatch.setattr(shots.os, "replace", crash)
+    with pytest.raises(KeyboardInterrupt): backfill(t, _log())
+    monkeypatch.undo()
+    assert t.read().empty and not os.path.exists(_marker(t))
+    assert backfill(ShotTable(t.root), _log()) == 5
+
+# -----------------------------
+# Kompaktering: basen ersätter segmenten, ett avbrott ger inga dubbletter
+# -----------------------------
+def _one(i):
+    return pd.DataFrame([{"ts": "2026-09-01 10:00:%02d" % i, "datum": "2026-09-01", "klubba": "7i", "launch": float(i)}])
+
+def test_compaction_replaces_parts(tmp_path):
+    t = ShotTable(str(tmp_path / "shots"))
+    for i in range(COMPACT_PARTS + 1): t.append(_one(i))
+    files = glob.glob(os.path.join(t.root, "*.parquet"))
+    assert len(files) == 1 and os.path.basename(files[0]).startswith("base-")
+    assert t.read()["launch"].tolist() == [float(i) for i in range(COMPACT_PARTS + 1)]
+
+def test_interrupted_compaction_keeps_rows_once(tmp_path, monkeypatch):
+    t = ShotTable(str(tmp_path / "shots"))
+    for i in range(3): t.append(_one(i))
+    def crash(path): raise KeyboardInterrupt
+    monkeypatch.setattr(shots.os, "remove", crash)
+    with pytest.raises(KeyboardInterrupt): t.compact()   # basen skriven, segmenten kvar
+    monkeypatch.undo()
+    assert len(glob.glob(os.path.join(t.root, "*.parquet"))) == 4
+    fresh = ShotTable(t.root)
+    assert fresh.read()["launch"].tolist() == [0.0, 1.0, 2.0]
+    fresh.append(_one(3))
+    assert fresh.read()["launch"].tolist() == [0.0, 1.0, 2.0, 3.0]
@@ -0,0 +1,46 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from golflog.storage import COLUMNS, ParquetBackend, SqliteBackend, to_csv_frame
+
+def _row(note, datum="2026-02-01", **kw):
+    return {"datum": datum, "pass": "Range", "kategori": "Längdkontroll", "moment": "Carry", "klubba": "7i",
+            "värde": 150, "anteckning": note, **kw}
+
+# -----------------------------
+# ParquetBackend.write: katalogbytet är två rename
+# -----------------------------
+def test_parquet_write_interrupted_between_renames_keeps_new_rows(tmp_path, monkeypatch):
+    d = str(tmp_path)
+    pd.DataFrame([_row("gammal", "2026-01-01")]).to_csv(os.path.join(d, "logg.csv"), index=False)
+    b = ParquetBackend(d)
+    b.append_many([_row("ny")])   # efter migreringen – finns inte i logg.csv
+    df = b.read()
+    real = os.replace
+    def crash(src, dst):
+        if src.endswith(".new"): raise KeyboardInterrupt   # processen dör efter det första bytet
+        real(src, dst)
+    monkeypatch.setattr(os, "replace", crash)
+    with pytest.raises(KeyboardInterrupt): b.write(df)
+    monkeypatch.setattr(os, "replace", real)
+    assert not os.path.exists(b.root)
+    assert ParquetBackend(d).read()["anteckning"].tolist() == ["gammal", "ny"]   # ingen ny migrering
+    assert not os.path.exists(b.root + ".new") and not os.path.exists(b.root + ".old")
+
+# -----------------------------
+# SqliteBackend.write/append med typade ramar (datetime-datum, kategorier)
+# -----------------------------
+def test_sqlite_write_accepts_typed_frame_from_parquet(tmp_path):
+    src = ParquetBackend(str(tmp_path))
+    src.append_many([_row("a"), _row("", "2026-02-02", klubba="", värde=""), _row("c", "2026-02-03", värde=151.5)])
+    typed = src.read()
+    assert pd.api.types.is_datetime64_any_dtype(typed["datum"]) and isinstance(typed["klubba"].dtype, pd.CategoricalDtype)
+    db = SqliteBackend(str(tmp_path))
+    db.write(typed)
+    db.append({**typed.iloc[0].to_dict(), "värde": np.int64(152)})
+    back = db.read()
+    assert back["datum"].tolist() == ["2026-02-01", "2026-02-02", "2026-02-03", "2026-02-01"]
+    assert back["klubba"].isna().tolist() == [False, True, False, False]
+    assert back["anteckning"].tolist() == ["a", None, "c", "a"]
+    assert back["värde"].fillna(-1).tolist() == [150, -1, 151.5, 152]
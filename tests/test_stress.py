@@ -0,0 +1,23 @@
+import pytest
+from golflog import stress
+from golflog.storage import BACKENDS
+
+# samma kontroll som python -m golflog.stress, i mindre skala: loggen, ackumulatorerna, rollups och
+# pass-journalerna ska stämma efter samtidiga skrivningar från trådar och processer
+
+@pytest.mark.parametrize("storage", sorted(BACKENDS))
+def test_concurrent_writes_keep_derived_state(tmp_path, storage):
+    r = stress.run(str(tmp_path), storage, threads=4, processes=2, rows=240, batch=2)
+    assert stress.ok(r), r
+    assert r["rader_i_loggen"] == r["skrivna"] == 240
+
+@pytest.mark.parametrize("storage", sorted(BACKENDS))
+def test_concurrent_backend_appends(tmp_path, storage):
+    r = stress.run(str(tmp_path), storage, threads=4, processes=2, rows=240, batch=2, via="backend")
+    assert stress.ok(r), r
+
+def test_parquet_rewrite_while_processes_append(tmp_path):
+    # update() skriver om hela katalogen (write) medan andra processer lägger till i deltan
+    r = stress.run(str(tmp_path), "parquet", threads=0, processes=4, rows=400, batch=2, via="backend")
+    assert stress.ok(r), r
+    assert r["omskrivningar"] > 0
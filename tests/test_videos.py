@@ -0,0 +1,46 @@
+import os
+import numpy as np
+import pytest
+from golflog import videos
+
+cv2 = pytest.importorskip("cv2")
+pytest.importorskip("PIL")
+
+def _clip(path, frames=12):
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10.0, (64, 48))
+    for i in range(frames):
+        img = np.zeros((48, 64, 3), np.uint8)
+        img[:, (i * 5) % 64:(i * 5) % 64 + 8] = 255   # ett streck som rör sig
+        out.write(img)
+    out.release()
+    return path
+
+def _outputs(out_dir, stem):
+    return [os.path.join(out_dir, stem + ext) for ext in (".poster.jpg", ".kf.jpg", ".gif", ".json")]
+
+# -----------------------------
+# extract: alla förhandsvisningar, inga temp-filer kvar
+# -----------------------------
+def test_extract_writes_previews_without_leftover_temp_files(tmp_path):
+    path = _clip(str(tmp_path / "sving.avi"))
+    out = str(tmp_path / "_preview")
+    info = videos.extract(path, out)
+    assert info["bilder"] == 12 and all(os.path.exists(p) for p in _outputs(out, "sving.avi"))
+    assert not [f for f in os.listdir(out) if f.endswith(".tmp")]
+
+def test_extract_when_frame_count_promises_more_than_decodes(tmp_path, monkeypatch):
+    # behållaren lovar 100 bilder, första bilden är trasig och bara 10 finns – ingen nyckelbild avkodas
+    path = _clip(str(tmp_path / "kort.avi"), frames=10)
+    real = cv2.VideoCapture
+    class Lying:
+        def __init__(self, p): self.cap, self.i = real(p), 0
+        def get(self, prop): return 100 if prop == cv2.CAP_PROP_FRAME_COUNT else self.cap.get(prop)
+        def retrieve(self):
+            self.i += 1
+            return (False, None) if self.i == 1 else self.cap.retrieve()
+        def __getattr__(self, name): return getattr(self.cap, name)
+    monkeypatch.setattr(cv2, "VideoCapture", Lying)
+    out = str(tmp_path / "_preview")
+    info = videos.extract(path, out)
+    assert info["nyckelbilder"] == [0, 20, 40, 59, 79, 99]
+    assert all(os.path.exists(p) for p in _outputs(out, "kort.avi"))